@@ -1,21 +1,40 @@
 import json
 import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Iterator
 
-import requests
-from data import (get_item_info, get_shopify_one_item, get_items_list_from_query,
-                  save_json, save_csv, save_shopify_csv_one_item, save_shopify_csv_list_items)
-from hosting import upload_photos
+import jobs
+import metrics
+from api_cache import cache as response_cache
+from concurrency import DEFAULT_WORKERS, submit_in_context
+from rate_limit import (ApiKeyPool, TokenBucket, AdaptiveLimiter, CircuitBreaker, HedgePolicy, load_api_keys,
+                        RAPID_API_RPS, RAPID_API_BURST, API_HEDGE, API_HEDGE_ENDPOINTS)
+from data import (get_items_list_from_query, save_json, save_csv, save_shopify_csv_one_item,
+                  StreamExporter)
 from dotenv import load_dotenv
 load_dotenv()
 
+API_KEYS = load_api_keys()
+
 headers = {
-    "x-rapidapi-key": os.getenv("RAPID_API_KEY"),
+    "x-rapidapi-key": API_KEYS[0] if API_KEYS else os.getenv("RAPID_API_KEY"),
     "x-rapidapi-host": "aliexpress-datahub.p.rapidapi.com"
 }
 
+# Спільні для всіх запитів ротація ключів і обмеження частоти запитів
+key_pool = ApiKeyPool(API_KEYS)
+_default_bucket = TokenBucket(RAPID_API_RPS, RAPID_API_BURST)
+
 def get_item_id_from_url(link: str) -> str:
-    """Повертає ID товару з посилання."""
+    """Повертає ID товару з посилання (або сам ID, якщо передано лише число)."""
+    if link.isdigit():
+        return link
     try:
         segment = link.split('/')[4]
         return segment.split('.')[0]
@@ -30,94 +49,513 @@ def get_query_from_url(link: str) -> str:
     except IndexError:
         return ""
 
-def parse_item(headers: dict, item_id: str) -> tuple[dict, dict] | None:
-    """Повертає дані про товар за ID із сайту."""
-    url = "https://aliexpress-datahub.p.rapidapi.com/item_detail_7"
-    url_reviews = "https://aliexpress-datahub.p.rapidapi.com/item_review"
-    querystring = {"itemId": item_id, "region": "US"}
-    querystring_reviews = {"itemId": item_id, "page": "1", "sort": "default", "filter": "allReviews"}
-    try:
-        response = requests.get(url, headers=headers, params=querystring, timeout=10)
-        if response.status_code == 200:
-            data_item = response.json()
-            if data_item.get("result", {}).get("status", {}).get("data") == "error":
+# Адреса API (для навантажувальних тестів — локальний замінник, див. benchmarks/fake_api.py)
+API_BASE_URL = os.getenv("API_BASE_URL", "https://aliexpress-datahub.p.rapidapi.com").rstrip("/")
+
+# Тайм-аути (секунди) для кожного ендпоінта RapidAPI
+API_TIMEOUTS = {
+    "item_detail_7": float(os.getenv("API_TIMEOUT_ITEM_DETAIL", "10")),
+    "item_review": float(os.getenv("API_TIMEOUT_ITEM_REVIEW", "10")),
+    "item_search_4": float(os.getenv("API_TIMEOUT_ITEM_SEARCH", "10")),
+}
+API_MAX_RETRIES = int(os.getenv("API_MAX_RETRIES", "3"))
+API_BACKOFF_BASE = float(os.getenv("API_BACKOFF_BASE", "0.5"))
+API_BACKOFF_MAX = float(os.getenv("API_BACKOFF_MAX", "30"))
+API_POOL_SIZE = int(os.getenv("API_POOL_SIZE", "32"))
+# Максимальна кількість сторінок item_search_4 для одного пошукового запиту
+SEARCH_MAX_PAGES = int(os.getenv("SEARCH_MAX_PAGES", "50"))
+# Фото з відгуків: REVIEW_PHOTOS=0 — не запитувати item_review взагалі
+REVIEW_PHOTOS = os.getenv("REVIEW_PHOTOS", "1") == "1"
+# Скільки сторінок відгуків читати для одного товару (кожна — окремий запит item_review)
+# і скільки з них завантажувати одночасно; за замовчуванням лише перша сторінка
+REVIEW_MAX_PAGES = max(1, int(os.getenv("REVIEW_MAX_PAGES", "1")))
+REVIEW_PAGE_WORKERS = max(1, int(os.getenv("REVIEW_PAGE_WORKERS", "3")))
+# Не більше стількох фото з відгуків на товар (0 — без обмеження); щойно їх набрано, сторінки більше не запитуються
+REVIEW_PHOTO_CAP = int(os.getenv("REVIEW_PHOTO_CAP", "50"))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Скільки секунд запит може чекати, поки ендпоінт призупинено запобіжником (0 = без обмеження)
+API_BREAKER_MAX_WAIT = float(os.getenv("API_BREAKER_MAX_WAIT", "600"))
+
+# Для кожного ендпоінта: адаптивний ліміт одночасних запитів і запобіжник
+_limiters = {}
+_breakers = {}
+_guards_lock = threading.Lock()
+# Перцентилі затримок і бюджет дублюючих запитів для ендпоінтів з API_HEDGE_ENDPOINTS
+_hedge_policies = {endpoint: HedgePolicy() for endpoint in API_HEDGE_ENDPOINTS} if API_HEDGE else {}
+
+_session = None
+_session_lock = threading.Lock()
+
+# Фоновий пул для запитів, що виконуються паралельно з основним (наприклад, відгуки)
+_api_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="rapidapi")
+# Пул для самих HTTP-запитів з хеджуванням (основний запит і його дубль)
+_hedge_executor = ThreadPoolExecutor(max_workers=API_POOL_SIZE * 2, thread_name_prefix="rapidapi-hedge")
+# Пул для сторінок відгуків (2-га і далі), які збирач відгуків завантажує одночасно
+_review_executor = ThreadPoolExecutor(max_workers=API_POOL_SIZE, thread_name_prefix="rapidapi-reviews")
+
+
+def set_review_photos(enabled: bool) -> None:
+    """Вмикає або вимикає збір фото з відгуків (без нього item_review не запитується)."""
+    global REVIEW_PHOTOS
+    REVIEW_PHOTOS = enabled
+
+
+def get_session() -> "requests.Session":
+    """
+    Повертає спільну HTTP-сесію з пулом з'єднань (keep-alive).
+    Сесія створюється один раз і використовується всіма потоками,
+    тому TCP/TLS з'єднання з RapidAPI не встановлюється для кожного запиту заново.
+    Бібліотека requests імпортується лише під час першого запиту.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=API_POOL_SIZE, max_retries=0)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def _endpoint_guards(endpoint: str) -> tuple[AdaptiveLimiter, CircuitBreaker]:
+    """Повертає адаптивний ліміт і запобіжник ендпоінта (створюються під час першого запиту)."""
+    with _guards_lock:
+        if endpoint not in _limiters:
+            _limiters[endpoint] = AdaptiveLimiter()
+            _breakers[endpoint] = CircuitBreaker()
+        return _limiters[endpoint], _breakers[endpoint]
+
+
+def _wait_for_breaker(endpoint: str, breaker: CircuitBreaker) -> bool:
+    """
+    Чекає, поки запобіжник ендпоінта дозволить запит (товари стоять у черзі, а не витрачають тайм-аути).
+    False, якщо ендпоінт недоступний довше за API_BREAKER_MAX_WAIT.
+    """
+    wait = breaker.try_acquire()
+    if not wait:
+        return True
+    metrics.incr("api_breaker_waits", endpoint=endpoint)
+    started = time.monotonic()
+    while wait:
+        if API_BREAKER_MAX_WAIT and time.monotonic() - started >= API_BREAKER_MAX_WAIT:
+            jobs.log(f"RapidAPI {endpoint}: ендпоінт недоступний довше за {API_BREAKER_MAX_WAIT:.0f} с.")
+            return False
+        jobs.sleep(min(wait, 1.0))
+        wait = breaker.try_acquire()
+    return True
+
+
+def _record_outcome(endpoint: str, outcome: bool | None) -> None:
+    """Передає результат запиту запобіжнику та пише в лог зміну його стану."""
+    limiter, breaker = _endpoint_guards(endpoint)
+    state = breaker.record(outcome)
+    if state == "open":
+        metrics.incr("api_breaker_opened", endpoint=endpoint)
+        jobs.log(f"RapidAPI {endpoint}: {breaker.failures} збоїв поспіль, запити призупинено "
+                 f"на {breaker.cooldown:.0f} с (одночасних запитів: {int(limiter.limit)}).")
+    elif state == "closed":
+        jobs.log(f"RapidAPI {endpoint}: ендпоінт знову відповідає, запити відновлено.")
+
+
+def _timed_get(policy: HedgePolicy, url: str, headers: dict, params: dict, timeout: float):
+    """GET через спільну сесію; затримка успішної відповіді йде у вікно вимірів policy."""
+    started = time.monotonic()
+    response = get_session().get(url, headers=headers, params=params, timeout=timeout)
+    if response.status_code == 200:
+        policy.observe(time.monotonic() - started)
+    return response
+
+
+def _response_outcome(future) -> bool | None:
+    """Результат завершеного запиту для адаптивного ліміту (як у _request_with_retries)."""
+    if future.cancelled():
+        return None
+    if future.exception() is not None:
+        return False
+    return future.result().status_code not in RETRY_STATUSES
+
+
+def _hedged_get(endpoint: str, policy: HedgePolicy, limiter: AdaptiveLimiter,
+                url: str, headers: dict, params: dict, timeout: float):
+    """
+    Надсилає запит і, якщо відповіді немає довше за перцентиль недавніх затримок, — один дубль
+    (якщо дозволяють бюджет дублів, адаптивний ліміт і обмеження частоти). Повертає першу успішну відповідь.
+    Запит, що програв, завершується у фоні, а його відповідь відкидається.
+    """
+    job = jobs.current()
+    started = time.monotonic()
+    futures = [submit_in_context(_hedge_executor, _timed_get, policy, url, headers, params, timeout)]
+    hedge_delay = policy.delay()
+    hedge_future = None
+    while True:
+        elapsed = time.monotonic() - started
+        wait_for = jobs.CANCEL_POLL_INTERVAL
+        if hedge_delay is not None:
+            wait_for = min(wait_for, max(0.0, hedge_delay - elapsed))
+        done, _ = wait(futures, timeout=wait_for, return_when=FIRST_COMPLETED)
+        for future in done:
+            futures.remove(future)
+            # Помилка одного із запитів не перериває очікування другого
+            if not futures or future.exception() is None and future.result().status_code == 200:
+                if future is hedge_future and future.exception() is None:
+                    metrics.incr("api_hedge_wins", endpoint=endpoint)
+                return future.result()
+        if job is not None and job.is_cancelled():
+            for future in futures:
+                future.cancel()
+            job.check()
+        if hedge_delay is not None and time.monotonic() - started >= hedge_delay:
+            hedge_delay = None
+            if not limiter.acquire(timeout=0):
+                continue
+            if not policy.try_fire():
+                limiter.release(0.0, None)
+                continue
+            hedge_headers = headers
+            if key_pool.keys:
+                key = key_pool.acquire()
+                if key is None:
+                    limiter.release(0.0, None)
+                    continue
+                hedge_headers = {**headers, "x-rapidapi-key": key}
+            else:
+                _default_bucket.acquire()
+            metrics.incr("api_calls", endpoint=endpoint)
+            metrics.incr("api_hedges", endpoint=endpoint)
+            hedge_started = time.monotonic()
+            hedge_future = submit_in_context(_hedge_executor, _timed_get, policy, url, hedge_headers, params,
+                                             max(0.1, timeout - (hedge_started - started)))
+            # Місце дубля в адаптивному ліміті звільняється, коли дубль завершиться
+            hedge_future.add_done_callback(
+                lambda future: limiter.release(time.monotonic() - hedge_started, _response_outcome(future)))
+            futures.append(hedge_future)
+
+
+def _retry_delay(attempt: int, response=None) -> float:
+    """Повертає паузу перед повтором: Retry-After або експоненційна затримка з jitter."""
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            return min(API_BACKOFF_MAX, max(0.0, float(retry_after)))
+        except ValueError:
+            try:
+                retry_at = parsedate_to_datetime(retry_after)
+                return min(API_BACKOFF_MAX, max(0.0, retry_at.timestamp() - time.time()))
+            except (TypeError, ValueError):
+                pass
+    return random.uniform(0, min(API_BACKOFF_MAX, API_BACKOFF_BASE * 2 ** attempt))
+
+
+def _is_quota_exhausted(response) -> bool:
+    """Чи означає відповідь, що місячну квоту ключа вичерпано (лише явна ознака у відповіді 429)."""
+    if response.status_code == 429:
+        if response.headers.get("X-RateLimit-Requests-Remaining") == "0":
+            return True
+        return "quota" in response.text.lower()
+    return False
+
+
+def api_get(endpoint: str, headers: dict, params: dict) -> dict | None:
+    """
+    Виконує GET-запит до ендпоінта RapidAPI через спільну сесію.
+    Спочатку шукає відповідь у дисковому кеші; успішні відповіді зберігаються в кеш.
+    Повторює запит при 429/5xx та обриві з'єднання з експоненційною затримкою.
+    Повертає JSON-відповідь або None, якщо дані отримати не вдалося.
+    """
+    cached = response_cache.get(endpoint, params)
+    if cached is not None:
+        metrics.incr("api_cache_hits", endpoint=endpoint)
+        return cached
+    if response_cache.mode == "use":
+        metrics.incr("api_cache_misses", endpoint=endpoint)
+    data = _request_with_retries(endpoint, headers, params)
+    if data is None:
+        metrics.incr("api_failures", endpoint=endpoint)
+    else:
+        response_cache.put(endpoint, params, data)
+    return data
+
+
+def _request_with_retries(endpoint: str, headers: dict, params: dict) -> dict | None:
+    """
+    Виконує запит до RapidAPI з ротацією ключів, обмеженням частоти та повторами.
+    Кількість одночасних запитів до ендпоінта підлаштовується під його затримку та помилки,
+    а після серії збоїв запобіжник призупиняє запити до ендпоінта.
+    """
+    from requests import ConnectionError as RequestsConnectionError, Timeout
+    from requests.exceptions import ChunkedEncodingError, ContentDecodingError
+    url = f"{API_BASE_URL}/{endpoint}"
+    job = jobs.current()
+    limiter, breaker = _endpoint_guards(endpoint)
+    for attempt in range(API_MAX_RETRIES + 1):
+        jobs.check_cancelled()
+        if not _wait_for_breaker(endpoint, breaker):
+            return None
+        timeout = API_TIMEOUTS.get(endpoint, 10)
+        remaining = job.remaining() if job is not None else None
+        if remaining is not None:
+            # Запит не може тривати довше, ніж залишилося часу завданню
+            timeout = max(0.1, min(timeout, remaining))
+        if attempt:
+            metrics.incr("api_retries", endpoint=endpoint)
+        key = None
+        request_headers = headers
+        if key_pool.keys:
+            key = key_pool.acquire()
+            if key is None:
+                _record_outcome(endpoint, None)
+                jobs.log("Немає доступних ключів RapidAPI: місячну квоту вичерпано або ключі відхилено (401/403).")
                 return None
+            request_headers = {**headers, "x-rapidapi-key": key}
         else:
+            _default_bucket.acquire()
+
+        try:
+            while not limiter.acquire(timeout=jobs.CANCEL_POLL_INTERVAL):
+                jobs.check_cancelled()
+        except jobs.JobCancelled:
+            _record_outcome(endpoint, None)
+            raise
+        metrics.incr("api_calls", endpoint=endpoint)
+        outcome = breaker_outcome = error = None
+        started = time.monotonic()
+        try:
+            with metrics.timer(f"api_{endpoint}"):
+                if endpoint in _hedge_policies:
+                    response = _hedged_get(endpoint, _hedge_policies[endpoint], limiter,
+                                           url, request_headers, params, timeout)
+                else:
+                    response = jobs.call_cancellable(get_session().get, url, headers=request_headers,
+                                                     params=params, timeout=timeout)
+            # 5xx — збій API; 429 — перевантаження: зменшує ліміт, але не вмикає запобіжник
+            outcome = response.status_code not in RETRY_STATUSES
+            breaker_outcome = None if response.status_code == 429 else outcome
+        except jobs.JobCancelled:
+            raise
+        except (RequestsConnectionError, Timeout, ChunkedEncodingError, ContentDecodingError) as e:
+            outcome = breaker_outcome = False
+            error = e
+        except Exception:
             return None
-    except Exception as e:
+        finally:
+            if limiter.release(time.monotonic() - started, outcome):
+                metrics.incr("api_concurrency_decreases", endpoint=endpoint)
+            _record_outcome(endpoint, breaker_outcome)
+
+        if error is not None:
+            if attempt == API_MAX_RETRIES:
+                jobs.log(f"RapidAPI {endpoint}: помилка з'єднання після {attempt + 1} спроб ({error}).")
+                return None
+            jobs.sleep(_retry_delay(attempt))
+            continue
+        if response.status_code == 200:
+            try:
+                data = response.json()
+            except ValueError:
+                return None
+            if data.get("result", {}).get("status", {}).get("data") == "error":
+                return None
+            return data
+        if key is not None and _is_quota_exhausted(response):
+            key_pool.mark_exhausted(key)
+            if attempt == API_MAX_RETRIES:
+                return None
+            continue
+        if key is not None and response.status_code in (401, 403):
+            # Ключ недійсний або без підписки: знімається з ротації лише в цьому процесі й на час
+            jobs.log(f"RapidAPI {endpoint}: ключ відхилено з кодом {response.status_code}.")
+            key_pool.mark_rejected(key)
+            if attempt == API_MAX_RETRIES:
+                return None
+            continue
+        if response.status_code in RETRY_STATUSES:
+            if attempt == API_MAX_RETRIES:
+                jobs.log(f"RapidAPI {endpoint}: код {response.status_code} після {attempt + 1} спроб.")
+                return None
+            delay = _retry_delay(attempt, response)
+            if key is not None and response.status_code == 429:
+                # Ключ відпочиває, а повтор іде через інший ключ (або чекає в key_pool.acquire)
+                key_pool.mark_throttled(key, delay)
+                continue
+            jobs.sleep(delay)
+            continue
         return None
+    return None
+
+
+def _get_item_detail(headers: dict, item_id: str) -> dict | None:
+    """Повертає дані товару з item_detail_7 або None у разі помилки."""
+    return api_get("item_detail_7", headers, {"itemId": item_id, "region": "US"})
+
 
+def _get_item_reviews(headers: dict, item_id: str, page: int = 1) -> dict | None:
+    """Повертає сторінку відгуків з item_review або None у разі помилки."""
+    querystring_reviews = {"itemId": item_id, "page": str(page), "sort": "default", "filter": "allReviews"}
+    return api_get("item_review", headers, querystring_reviews)
+
+
+def _review_page_entries(page_data: dict | None) -> list:
     try:
-        response_reviews = requests.get(url_reviews, headers=headers, params=querystring_reviews, timeout=10)
-        if response_reviews.status_code == 200:
-            data_reviews = response_reviews.json()
-            if data_reviews.get("result", {}).get("status", {}).get("data") == "error":
-                data_reviews = None
-        else:
-            data_reviews = None
-    except Exception:
-        data_reviews = None
+        return page_data["result"]["resultList"] or []
+    except (KeyError, TypeError):
+        return []
+
 
+def collect_reviews(headers: dict, item_id: str, max_pages: int = REVIEW_MAX_PAGES,
+                    photo_cap: int = REVIEW_PHOTO_CAP, workers: int = REVIEW_PAGE_WORKERS) -> dict | None:
+    """
+    Збирає відгуки з кількох сторінок item_review: спершу першу сторінку (з неї відома кількість сторінок),
+    далі до workers сторінок одночасно. Щойно набрано photo_cap фото, наступні сторінки не запитуються,
+    а зайві фото відкидаються. Повертає відповідь у форматі item_review з відгуками всіх прочитаних сторінок
+    або None, якщо не вдалося отримати першу сторінку.
+    """
+    first_page = _get_item_reviews(headers, item_id, 1)
+    if first_page is None:
+        return None
+    entries = list(_review_page_entries(first_page))
+    photos = sum(len(entry.get("review", {}).get("reviewImages") or []) for entry in entries)
+    try:
+        total_pages = int(first_page["result"]["base"]["totalPages"])
+    except (KeyError, TypeError, ValueError):
+        total_pages = 1
+    last_page = min(total_pages, max_pages)
+    next_page = 2
+    pending = deque()
+    try:
+        while photo_cap <= 0 or photos < photo_cap:
+            while next_page <= last_page and len(pending) < workers:
+                pending.append(submit_in_context(_review_executor, _get_item_reviews, headers, item_id, next_page))
+                next_page += 1
+            if not pending:
+                break
+            # Сторінки додаються по порядку, тому обмеження фото відкидає найпізніші відгуки
+            page_entries = _review_page_entries(pending.popleft().result())
+            entries.extend(page_entries)
+            photos += sum(len(entry.get("review", {}).get("reviewImages") or []) for entry in page_entries)
+    finally:
+        for future in pending:
+            future.cancel()
+    if photo_cap > 0 and photos > photo_cap:
+        entries = _cap_review_photos(entries, photo_cap)
+    result = dict(first_page["result"])
+    result["resultList"] = entries
+    return {**first_page, "result": result}
+
+
+def _cap_review_photos(entries: list, photo_cap: int) -> list:
+    """Копія відгуків, у яких сумарно не більше photo_cap фото."""
+    capped = []
+    remaining = photo_cap
+    for entry in entries:
+        images = entry.get("review", {}).get("reviewImages") or []
+        if len(images) > remaining:
+            entry = {**entry, "review": {**entry["review"], "reviewImages": images[:remaining]}}
+            images = images[:remaining]
+        remaining -= len(images)
+        capped.append(entry)
+    return capped
+
+
+def parse_item(headers: dict, item_id: str) -> tuple[dict, dict | None] | None:
+    """
+    Повертає дані про товар за ID із сайту.
+    Запити на товар і на відгуки виконуються одночасно, тому час очікування
+    дорівнює повільнішому з двох запитів. Помилка відгуків не скасовує дані товару.
+    Якщо збір фото з відгуків вимкнено (REVIEW_PHOTOS=0), item_review не запитується.
+    """
+    if not REVIEW_PHOTOS:
+        data_item = _get_item_detail(headers, item_id)
+        return (data_item, None) if data_item is not None else None
+    reviews_future = submit_in_context(_api_executor, collect_reviews, headers, item_id)
+    data_item = _get_item_detail(headers, item_id)
+    if data_item is None:
+        reviews_future.cancel()
+        return None
+    data_reviews = reviews_future.result()
     return data_item, data_reviews
 
 
-def parse_query(headers: dict, query: str) -> dict:
-    """Повертає дані про товари за пошуковим запитом."""
-    url_query = "https://aliexpress-datahub.p.rapidapi.com/item_search_4"
-    querystring = {"q": query, "page": "1", "sort": "default", "region": "US"}
-    try:
-        response = requests.get(url_query, headers=headers, params=querystring, timeout=10)
-        if response.status_code == 200:
-            query_items = response.json()
-            if query_items.get("result", {}).get("status", {}).get("data") == "error":
-                return {}
-            return query_items
-        else:
-            return {}
-    except Exception:
-        return {}
+def parse_query(headers: dict, query: str, page: int = 1) -> dict:
+    """Повертає дані про товари за пошуковим запитом (одна сторінка результатів)."""
+    querystring = {"q": query, "page": str(page), "sort": "default", "region": "US"}
+    return api_get("item_search_4", headers, querystring) or {}
+
+
+def iter_query_item_ids(headers: dict, query: str, limit: int,
+                        max_pages: int = SEARCH_MAX_PAGES) -> Iterator[str]:
+    """
+    Ліниво повертає ID товарів за пошуковим запитом, сторінка за сторінкою.
+    Наступна сторінка завантажується у фоні, поки обробляються товари поточної.
+    Зупиняється, щойно набрано limit товарів; ID, що повторюються на різних сторінках, пропускаються.
+    """
+    if limit <= 0:
+        return
+    seen = set()
+    remaining = limit
+    page = 1
+    future = submit_in_context(_api_executor, parse_query, headers, query, page)
+    while future is not None:
+        query_items = future.result()
+        try:
+            page_ids = get_items_list_from_query(query_items)
+        except (KeyError, TypeError):
+            page_ids = []
+        new_ids = []
+        for item_id in page_ids:
+            if item_id not in seen:
+                seen.add(item_id)
+                new_ids.append(item_id)
+        if not new_ids:
+            return
+        new_ids = new_ids[:remaining]
+        remaining -= len(new_ids)
+        page += 1
+        # Попередньо завантажуємо наступну сторінку, лише якщо поточної не вистачить до ліміту
+        future = None
+        if remaining > 0 and page <= max_pages:
+            future = submit_in_context(_api_executor, parse_query, headers, query, page)
+        yield from new_ids
 
 
 def parse_item_from_link(link: str) -> None:
     """Парсинг та збереження одного товару за посиланням."""
     item_id = get_item_id_from_url(link)
-    item_data = parse_item(headers, item_id)
-    if item_data:
-        item_dict = get_item_info(item_data)
+    result = process_item(headers, item_id)
+    if result:
+        item_dict, shopify_info = result
         save_json(item_dict, item_id)
         save_csv(item_dict.copy(), item_id)
-        main_photos_url = upload_photos(item_dict["MainPhotoLinks"], f"{item_id}/MainPhotos")
-        upload_photos(item_dict["ReviewsPhotoLinks"], f"{item_id}/PhotoReview")
-        shopify_info = get_shopify_one_item(item_dict, main_photos_url)
         save_shopify_csv_one_item(shopify_info, item_id)
 
 
-def parse_items_from_links(headers: dict, items_id: list, filename: str = "list_items") -> None:
-    """Парсинг та збереження багатьох товарів із списку."""
-    items = []
-    shopify_list = []
-    for item_id in items_id:
-        item_data = parse_item(headers, item_id)
-        if item_data:
-            item_dict = get_item_info(item_data)
-            items.append(item_dict)
-            main_photos_url = upload_photos(item_dict["MainPhotoLinks"], f"{item_id}/MainPhotos") if item_dict["MainPhotoLinks"] else []
-            if item_dict["ReviewsPhotoLinks"]:
-                upload_photos(item_dict["ReviewsPhotoLinks"], f"{item_id}/PhotoReview")
-            shopify_info = get_shopify_one_item(item_dict, main_photos_url)
-            shopify_list.append(shopify_info)
-    if items and shopify_list:
-        save_json(items, filename)
-        save_csv(items, filename)
-        save_shopify_csv_list_items(shopify_list, filename)
-
-
-def parse_items_from_query(headers: dict, query: str, items_count: int) -> None:
-    """Парсинг багатьох товарів за пошуковим запитом (не більше 60)."""
-    links_list = parse_query(headers, query)
-    if links_list:
-        items_list = get_items_list_from_query(links_list)
-        if items_count:
-            parse_items_from_links(headers, items_list[:items_count], "list_items_from_query")
+def process_item(headers: dict, item_id: str) -> tuple[dict, list[tuple]] | None:
+    """Отримує дані одного товару, завантажує фото та формує дані для Shopify (етапи pipeline.py)."""
+    import pipeline
+    return pipeline.process_item(item_id, headers=headers).result
+
+
+def parse_items_from_links(headers: dict, items_id: list, filename: str = "list_items",
+                           workers: int = DEFAULT_WORKERS) -> None:
+    """
+    Парсинг та збереження багатьох товарів із списку (конвеєр pipeline.py, workers потоків на мережевий етап).
+    Кожен товар дописується у файли одразу після обробки.
+    """
+    from pipeline import process_items
+    with StreamExporter(filename) as exporter:
+        for task in process_items(items_id, workers, headers=headers):
+            if task.ok:
+                exporter.write(task.item_dict, task.shopify_rows)
+
+
+def parse_items_from_query(headers: dict, query: str, items_count: int,
+                           workers: int = DEFAULT_WORKERS) -> None:
+    """Парсинг багатьох товарів за пошуковим запитом (з усіх сторінок, не більше items_count)."""
+    if items_count:
+        items_ids = iter_query_item_ids(headers, query, items_count)
+        parse_items_from_links(headers, items_ids, "list_items_from_query", workers)
 
 
@@ -0,0 +1,140 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import urlencode
+
+from dotenv import load_dotenv
+load_dotenv()
+
+API_CACHE_PATH = os.getenv("API_CACHE_PATH", ".api_cache.sqlite3")
+# use — читати й записувати, refresh — лише записувати (оновити дані), bypass — не використовувати кеш
+API_CACHE_MODE = os.getenv("API_CACHE_MODE", "use")
+API_CACHE_MAX_MB = float(os.getenv("API_CACHE_MAX_MB", "200"))
+# Час життя (секунди) відповідей кожного ендпоінта
+API_CACHE_TTLS = {
+    "item_detail_7": float(os.getenv("API_CACHE_TTL_ITEM_DETAIL", str(24 * 3600))),
+    "item_review": float(os.getenv("API_CACHE_TTL_ITEM_REVIEW", str(72 * 3600))),
+    "item_search_4": float(os.getenv("API_CACHE_TTL_ITEM_SEARCH", str(6 * 3600))),
+}
+
+CACHE_MODES = ("use", "refresh", "bypass")
+
+
+def make_cache_key(endpoint: str, params: dict) -> str:
+    """Ключ кешу: ендпоінт + відсортовані параметри запиту (itemId/q, region, page ...)."""
+    return f"{endpoint}?{urlencode(sorted((str(k), str(v)) for k, v in params.items()))}"
+
+
+class ResponseCache:
+    """
+    Дисковий кеш відповідей RapidAPI у SQLite.
+    Кожен ендпоінт має власний TTL; при перевищенні max_bytes видаляються
+    записи, до яких найдовше не зверталися (LRU).
+    """
+
+    def __init__(self, path: str = API_CACHE_PATH, mode: str = API_CACHE_MODE,
+                 max_bytes: int = int(API_CACHE_MAX_MB * 1024 * 1024), ttls: dict | None = None):
+        self.path = path
+        self.mode = mode if mode in CACHE_MODES else "use"
+        self.max_bytes = max_bytes
+        self.ttls = ttls if ttls is not None else dict(API_CACHE_TTLS)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._total_bytes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, endpoint TEXT NOT NULL, created REAL NOT NULL, "
+                "accessed REAL NOT NULL, size INTEGER NOT NULL, body BLOB NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed)")
+            conn.commit()
+            self._total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def set_mode(self, mode: str) -> None:
+        """Перемикає режим кешу: use, refresh або bypass."""
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Невідомий режим кешу: {mode}")
+        self.mode = mode
+
+    def get(self, endpoint: str, params: dict) -> dict | None:
+        """Повертає збережену відповідь або None, якщо її немає чи вона застаріла."""
+        if self.mode != "use":
+            return None
+        key = make_cache_key(endpoint, params)
+        now = time.time()
+        try:
+            with self.lock:
+                conn = self._connect()
+                row = conn.execute("SELECT created, body FROM responses WHERE key = ?", (key,)).fetchone()
+                if row and now - row[0] <= self.ttls.get(endpoint, 0):
+                    conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                    conn.commit()
+                    self.hits += 1
+                    return json.loads(zlib.decompress(row[1]))
+                self.misses += 1
+        except (sqlite3.Error, zlib.error, ValueError):
+            pass
+        return None
+
+    def put(self, endpoint: str, params: dict, data: dict) -> None:
+        """Зберігає успішну відповідь і за потреби звільняє місце (LRU)."""
+        if self.mode == "bypass" or not self.ttls.get(endpoint):
+            return
+        key = make_cache_key(endpoint, params)
+        body = zlib.compress(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+        now = time.time()
+        try:
+            with self.lock:
+                conn = self._connect()
+                old = conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, endpoint, created, accessed, size, body) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, endpoint, now, now, len(body), body),
+                )
+                self._total_bytes += len(body) - (old[0] if old else 0)
+                if self._total_bytes > self.max_bytes:
+                    self._evict(conn)
+                conn.commit()
+        except sqlite3.Error:
+            pass
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Видаляє найстаріші за доступом записи, доки кеш не займе 90% ліміту."""
+        target = self.max_bytes * 0.9
+        rows = conn.execute("SELECT key, size FROM responses ORDER BY accessed ASC")
+        to_delete = []
+        for key, size in rows:
+            if self._total_bytes <= target:
+                break
+            to_delete.append((key,))
+            self._total_bytes -= size
+        conn.executemany("DELETE FROM responses WHERE key = ?", to_delete)
+
+    def clear(self) -> None:
+        """Видаляє всі записи кешу."""
+        with self.lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+            self._total_bytes = 0
+
+    def stats(self) -> dict:
+        """Повертає кількість влучань і промахів кешу з моменту запуску."""
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+cache = ResponseCache()
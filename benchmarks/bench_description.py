@@ -0,0 +1,72 @@
+"""
+Бенчмарк очищення опису товару: старий ланцюжок re.sub проти sanitize_description.
+
+Запуск:
+    python benchmarks/bench_description.py                  # синтетичні описи різного розміру
+    python benchmarks/bench_description.py desc1.html ...   # власні (реальні) HTML описи
+"""
+import os
+import re
+import sys
+import time
+from html import unescape
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data import sanitize_description
+
+
+def legacy_clean(raw_html: str) -> str:
+    """Попередня реалізація з get_item_info (шість проходів re.sub)."""
+    text = re.sub(r'<[^>]*>', '', raw_html).strip()
+    text = re.sub(r'window\.adminAccountId=\d+;', '', text)
+    text = re.sub(r'with\(document\).*?src="[^"]+"', '', text, flags=re.DOTALL)
+    text = re.sub(r'&bull;', '', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return unescape(text)
+
+
+def make_description(blocks: int, document_writes: int = 20) -> str:
+    """Формує HTML, схожий на опис продавця AliExpress: таблиці, фото, скрипти, сутності."""
+    parts = ['<div class="detailmodule_html"><script>window.adminAccountId=6000091325;</script>']
+    for i in range(blocks):
+        parts.append(
+            f'<p style="margin:0;padding:0"><span style="font-size:14px">&bull; Feature {i}: '
+            f'high&nbsp;quality material &amp; durable design &quot;model-{i}&quot;</span></p>\n'
+            f'<img src="//ae01.alicdn.com/kf/H{i:08d}.jpg" width="750" height="750">\n'
+        )
+    # Фрагменти with(document) без src="..." — найгірший випадок для .*? з DOTALL
+    for _ in range(document_writes):
+        parts.append('<p>with(document) var x = 1;</p>')
+    parts.append('</div>')
+    return "".join(parts)
+
+
+def bench(func, text: str, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(text)
+    return (time.perf_counter() - start) / repeat
+
+
+def main() -> None:
+    if len(sys.argv) > 1:
+        samples = []
+        for path in sys.argv[1:]:
+            with open(path, encoding="utf-8") as file:
+                samples.append((os.path.basename(path), file.read()))
+    else:
+        samples = [(f"{blocks} блоків", make_description(blocks)) for blocks in (100, 1000, 5000)]
+        # Багато фрагментів with(document) без src — кожен змушує .*? сканувати опис до кінця
+        samples.append(("2000 with(document)", make_description(1000, document_writes=2000)))
+
+    print(f"{'опис':<22}{'розмір, КБ':>12}{'re.sub, мс':>14}{'sanitizer, мс':>16}{'прискорення':>14}")
+    for name, text in samples:
+        repeat = 3 if len(text) > 500_000 else 10
+        old = bench(legacy_clean, text, repeat)
+        new = bench(sanitize_description, text, repeat)
+        print(f"{name:<22}{len(text) / 1024:>12.1f}{old * 1000:>14.2f}{new * 1000:>16.2f}{old / new:>13.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Офлайн-бенчмарк повного конвеєра без мережі.
+
+Відповіді RapidAPI (item_detail_7, item_review, item_search_4) відтворюються із
+записаних файлів benchmarks/fixtures, а Cloudinary замінено фейковим завантажувачем
+із заданою затримкою. Товари проходять конвеєр pipeline.py
+(fetch → transform → upload → shopify) і зберігаються через StreamExporter.
+
+Звіт: товарів за секунду, перцентилі затримки кожного етапу, піковий RSS.
+
+Запуск:
+    python benchmarks/bench_pipeline.py --items 200 --workers 8 --api-latency 0.05 --upload-latency 0.02
+
+Оновити записані відповіді з реального API: python benchmarks/record_fixtures.py <item_id> <query>
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from functools import partial
+from urllib.parse import urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures")
+sys.path.insert(0, ROOT)
+
+# Вимикаємо все, що звертається до мережі або зберігає стан між запусками
+os.environ.update({
+    "RAPID_API_KEYS": "", "RAPID_API_KEY": "", "RAPID_API_RPS": "0", "RAPID_API_STATE_PATH": "",
+    "API_CACHE_MODE": "bypass", "PHOTO_INDEX_ENABLED": "0", "PHOTO_INDEX_RECONCILE": "0",
+})
+
+import ali_parse
+import hosting
+import metrics
+import pipeline
+from data import StreamExporter
+from pipeline import process_items
+
+
+def load_fixtures() -> dict[str, bytes]:
+    fixtures = {}
+    for endpoint in ("item_detail_7", "item_review", "item_search_4"):
+        with open(os.path.join(FIXTURES, f"{endpoint}.json"), "rb") as file:
+            fixtures[endpoint] = file.read()
+    return fixtures
+
+
+def sample_latency(mean: float, jitter: float) -> float:
+    return max(0.0, random.gauss(mean, mean * jitter)) if mean else 0.0
+
+
+class ReplayResponse:
+    """Відповідь, що поводиться як requests.Response для api_get."""
+
+    def __init__(self, body: bytes, endpoint: str, params: dict):
+        self.status_code = 200
+        self.headers = {}
+        self.text = ""
+        self._body = body
+        self._endpoint = endpoint
+        self._params = params
+
+    def json(self) -> dict:
+        data = json.loads(self._body)
+        result = data["result"]
+        if self._endpoint == "item_detail_7":
+            result["item"]["itemId"] = self._params["itemId"]
+        elif self._endpoint == "item_search_4":
+            offset = (int(self._params.get("page", 1)) - 1) * len(result["resultList"])
+            for index, entry in enumerate(result["resultList"]):
+                entry["item"]["itemId"] = str(1005006000000000 + offset + index)
+        return data
+
+
+class ReplaySession:
+    """Замінник requests.Session: відтворює записані відповіді із затримкою."""
+
+    def __init__(self, fixtures: dict[str, bytes], latency: float, jitter: float):
+        self.fixtures = fixtures
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def get(self, url, headers=None, params=None, timeout=None):
+        endpoint = urlparse(url).path.rsplit("/", 1)[-1]
+        with self.lock:
+            self.calls[endpoint] += 1
+        time.sleep(sample_latency(self.latency, self.jitter))
+        return ReplayResponse(self.fixtures[endpoint], endpoint, params or {})
+
+
+class FakeUploader:
+    """Замінник cloudinary.uploader.upload із заданою затримкою."""
+
+    def __init__(self, latency: float, jitter: float):
+        self.latency = latency
+        self.jitter = jitter
+        self.uploads = 0
+        self.lock = threading.Lock()
+
+    def upload(self, source, folder=None, public_id=None, **kwargs):
+        time.sleep(sample_latency(self.latency, self.jitter))
+        with self.lock:
+            self.uploads += 1
+            number = self.uploads
+        public_id = f"{folder}/{public_id or number}"
+        return {"public_id": public_id, "etag": f"{number:032x}", "bytes": 150_000,
+                "secure_url": f"https://res.cloudinary.com/bench/image/upload/{public_id}.jpg"}
+
+
+def peak_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux повертає КБ, macOS — байти
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run(args) -> None:
+    random.seed(args.seed)
+    session = ReplaySession(load_fixtures(), args.api_latency, args.jitter)
+    uploader = FakeUploader(args.upload_latency, args.jitter)
+    ali_parse.get_session = lambda: session
+    hosting.cloudinary_upload = uploader.upload
+    pipeline.upload_photos = partial(hosting.upload_photos, workers=args.upload_workers)
+    job_metrics = metrics.Metrics("bench")
+
+    output_dir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    cwd = os.getcwd()
+    os.chdir(output_dir)
+    try:
+        with metrics.use(job_metrics):
+            start = time.perf_counter()
+            item_ids = ali_parse.iter_query_item_ids(ali_parse.headers, "wireless earbuds", args.items)
+            with StreamExporter("bench_items") as exporter:
+                for task in process_items(item_ids, args.workers, log_callback=lambda message: None):
+                    if task.ok:
+                        with metrics.timer("save"):
+                            exporter.write(task.item_dict, task.shopify_rows)
+            elapsed = time.perf_counter() - start
+    finally:
+        os.chdir(cwd)
+
+    stages = job_metrics.report()["stages"]
+    print(f"Товарів: {exporter.count} за {elapsed:.2f} с — {exporter.count / elapsed:.1f} товарів/с "
+          f"(workers={args.workers}, upload_workers={args.upload_workers})")
+    print(f"Запитів API: {dict(session.calls)}, завантажень фото: {uploader.uploads}")
+    print(f"{'етап':<16}{'к-сть':>8}{'p50, мс':>10}{'p95, мс':>10}{'p99, мс':>10}{'max, мс':>10}")
+    for stage in ("fetch", "transform", "upload_main", "upload_reviews", "shopify", "save"):
+        values = stages.get(stage)
+        if not values:
+            continue
+        print(f"{stage:<16}{values['count']:>8}" + "".join(
+            f"{values[key] * 1000:>10.2f}" for key in ("p50", "p95", "p99", "max")))
+    print(f"Піковий RSS: {peak_rss_mb():.1f} МБ")
+    print(f"Файли: {output_dir}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Офлайн-бенчмарк конвеєра парсингу")
+    parser.add_argument("--items", type=int, default=200, help="кількість товарів")
+    parser.add_argument("--workers", type=int, default=8, help="товарів одночасно")
+    parser.add_argument("--upload-workers", type=int, default=8, help="фото одного товару одночасно")
+    parser.add_argument("--api-latency", type=float, default=0.05, help="середня затримка RapidAPI, с")
+    parser.add_argument("--upload-latency", type=float, default=0.02, help="середня затримка Cloudinary, с")
+    parser.add_argument("--jitter", type=float, default=0.3, help="відносне відхилення затримки")
+    parser.add_argument("--seed", type=int, default=1)
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
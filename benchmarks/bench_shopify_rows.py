@@ -0,0 +1,205 @@
+"""
+Мікробенчмарк формування та запису рядків Shopify CSV.
+
+Порівнює попередній шлях через словники (legacy_shopify_one_item — дослівна копія старого
+get_shopify_one_item, і csv.DictWriter з {"Handle": n, **row}) зі шляхом через кортежі
+(get_shopify_rows + csv.writer) і перевіряє, що вихідні байти однакові.
+
+Запуск:
+    python benchmarks/bench_shopify_rows.py [кількість товарів] [фото на товар]
+"""
+import csv
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data import SHOPIFY_HEADER, get_range_price, get_shopify_rows
+
+
+def legacy_shopify_one_item(items: dict, photos_url: list[str]) -> list[dict]:
+    """
+    Попередня реалізація get_shopify_one_item (словник на кожен рядок), скопійована без змін.
+    Формує дані для Shopify.
+    Поле Body (HTML) формується як об'єднання Specifications і Description.
+    Для цін:
+      - DiscountPrice використовується для колонок Price / International і Variant Price,
+      - OriginalPrice – для колонок Compare At Price / International і Variant Compare At Price.
+    """
+    body_html = (items.get("Specifications", "") + "\n" + items.get("Description", "")).strip()
+    shopify_items = []
+    price = get_range_price(items)
+    
+    main_row = {
+        "Title": items.get("Title", ""),
+        "Body (HTML)": body_html,
+        "Vendor": "",
+        "Product Category": "Uncategorized",
+        "Type": "",
+        "Tags": items.get("Title", ""),
+        "Published": False,
+        "Option1 Name": "",
+        "Option1 Value": "",
+        "Option2 Name": "",
+        "Option2 Value": "",
+        "Option3 Name": "",
+        "Option3 Value": "",
+        "Variant SKU": "",
+        "Variant Grams": "",
+        "Variant Inventory Tracker": "shopify",
+        "Variant Inventory Qty": 100,
+        "Variant Inventory Policy": "continue",
+        "Variant Fulfillment Service": "manual",
+        "Variant Price": price,
+        "Variant Compare At Price": "",
+        "Variant Requires Shipping": "",
+        "Variant Taxable": "",
+        "Variant Barcode": "",
+        "Image Src": photos_url[0] if photos_url else "",
+        "Image Position": 1,
+        "Image Alt Text": "",
+        "Gift Card": "",
+        "SEO Title": "",
+        "SEO Description": "",
+        "Google Shopping / Google Product Category": "",
+        "Google Shopping / Gender": "",
+        "Google Shopping / Age Group": "",
+        "Google Shopping / MPN": "",
+        "Google Shopping / AdWords Grouping": "",
+        "Google Shopping / AdWords Labels": "",
+        "Google Shopping / Condition": "",
+        "Google Shopping / Custom Product": "",
+        "Google Shopping / Custom Label 0": "",
+        "Google Shopping / Custom Label 1": "",
+        "Google Shopping / Custom Label 2": "",
+        "Google Shopping / Custom Label 3": "",
+        "Google Shopping / Custom Label 4": "",
+        "Variant Image": "",
+        "Variant Weight Unit": "",
+        "Variant Tax Code": "",
+        "Cost per item": "",
+        "Price / International": "",
+        "Compare At Price / International": "",
+        "Status": "draft"
+    }
+    shopify_items.append(main_row)
+    
+    for i in range(1, len(photos_url)):
+        extra_row = {
+            "Title": "",
+            "Body (HTML)": "",
+            "Vendor": "",
+            "Product Category": "",
+            "Type": "",
+            "Tags": "",
+            "Published": "",
+            "Option1 Name": "",
+            "Option1 Value": "",
+            "Option2 Name": "",
+            "Option2 Value": "",
+            "Option3 Name": "",
+            "Option3 Value": "",
+            "Variant SKU": "",
+            "Variant Grams": "",
+            "Variant Inventory Tracker": "",
+            "Variant Inventory Qty": "",
+            "Variant Inventory Policy": "",
+            "Variant Fulfillment Service": "",
+            "Variant Price": "",
+            "Variant Compare At Price": "",
+            "Variant Requires Shipping": "",
+            "Variant Taxable": "",
+            "Variant Barcode": "",
+            "Image Src": photos_url[i],
+            "Image Position": i + 1,
+            "Image Alt Text": "",
+            "Gift Card": "",
+            "SEO Title": "",
+            "SEO Description": "",
+            "Google Shopping / Google Product Category": "",
+            "Google Shopping / Gender": "",
+            "Google Shopping / Age Group": "",
+            "Google Shopping / MPN": "",
+            "Google Shopping / AdWords Grouping": "",
+            "Google Shopping / AdWords Labels": "",
+            "Google Shopping / Condition": "",
+            "Google Shopping / Custom Product": "",
+            "Google Shopping / Custom Label 0": "",
+            "Google Shopping / Custom Label 1": "",
+            "Google Shopping / Custom Label 2": "",
+            "Google Shopping / Custom Label 3": "",
+            "Google Shopping / Custom Label 4": "",
+            "Variant Image": "",
+            "Variant Weight Unit": "",
+            "Variant Tax Code": "",
+            "Cost per item": "",
+            "Price / International": "",
+            "Compare At Price / International": "",
+            "Status": ""
+        }
+        shopify_items.append(extra_row)
+    return shopify_items
+
+
+def make_item(i: int) -> dict:
+    return {
+        "Title": f"Product {i} wireless earbuds, \"pro\" edition",
+        "Specifications": "Brand Name: Generic\nMaterial: Plastic\nColor: Black",
+        "Description": "High quality product with long battery life. " * 20,
+        "DiscountPrice": "12.50 - 18.90",
+        "OriginalPrice": "25.00 - 37.80",
+    }
+
+
+def write_dicts(products: list[tuple[dict, list[str]]]) -> str:
+    buffer = io.StringIO(newline='')
+    writer = csv.DictWriter(buffer, fieldnames=list(SHOPIFY_HEADER))
+    writer.writeheader()
+    for count, (item, photos) in enumerate(products, start=1):
+        for row in legacy_shopify_one_item(item, photos):
+            writer.writerow({"Handle": count, **row})
+    return buffer.getvalue()
+
+
+def write_tuples(products: list[tuple[dict, list[str]]]) -> str:
+    buffer = io.StringIO(newline='')
+    writer = csv.writer(buffer)
+    writer.writerow(SHOPIFY_HEADER)
+    for count, (item, photos) in enumerate(products, start=1):
+        handle = (count,)
+        writer.writerows(handle + row for row in get_shopify_rows(item, photos))
+    return buffer.getvalue()
+
+
+def bench(func, products, repeat: int = 5) -> tuple[float, str]:
+    best = float("inf")
+    output = ""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = func(products)
+        best = min(best, time.perf_counter() - start)
+    return best, output
+
+
+def main() -> None:
+    products_count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    photos_count = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    products = [
+        (make_item(i), [f"https://res.cloudinary.com/demo/{i}/MainPhotos/{j}.jpg" for j in range(photos_count)])
+        for i in range(products_count)
+    ]
+    rows = products_count * photos_count
+
+    dict_time, dict_output = bench(write_dicts, products)
+    tuple_time, tuple_output = bench(write_tuples, products)
+
+    print(f"Товарів: {products_count}, фото на товар: {photos_count}, рядків: {rows}")
+    print(f"словники + DictWriter: {rows / dict_time:>12,.0f} рядків/с")
+    print(f"кортежі + csv.writer:  {rows / tuple_time:>12,.0f} рядків/с ({dict_time / tuple_time:.1f}x)")
+    print(f"Вихід однаковий: {dict_output == tuple_output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+Локальний замінник RapidAPI (aliexpress-datahub) і Cloudinary Upload API з внесенням збоїв.
+
+Відповідає у форматі item_detail_7, item_review та item_search_4 (на основі
+benchmarks/fixtures) і приймає завантаження фото у стилі Cloudinary
+(POST /v1_1/<cloud>/image/upload). Затримка кожної відповіді береться з заданого
+розподілу; частина запитів навмисно отримує 429, 5xx, повільне тіло відповіді
+або розірване з'єднання (RST).
+
+Службові адреси: GET /__stats — лічильники запитів і внесених збоїв, POST /__reset — обнулити їх.
+
+Запуск окремо (парсер направляється на нього змінними середовища):
+    python benchmarks/fake_api.py --port 8765 --p429 0.02 --p5xx 0.02 --reset 0.01
+    API_BASE_URL=http://127.0.0.1:8765 CLOUDINARY_UPLOAD_PREFIX=http://127.0.0.1:8765 python cli.py multiple --file ids.txt
+
+Навантажувальний тест із цим замінником: python benchmarks/load_test.py
+"""
+import argparse
+import json
+import math
+import os
+import random
+import re
+import socket
+import struct
+import sys
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures")
+
+API_ENDPOINTS = ("item_detail_7", "item_review", "item_search_4")
+LATENCY_DISTRIBUTIONS = ("const", "normal", "lognormal", "pareto")
+
+
+class FaultProfile:
+    """Затримка та ймовірності збоїв для однієї групи адрес (api або upload)."""
+
+    def __init__(self, latency: float = 0.05, distribution: str = "lognormal", jitter: float = 0.5,
+                 p429: float = 0.0, p5xx: float = 0.0, slow: float = 0.0, slow_seconds: float = 5.0,
+                 reset: float = 0.0):
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Невідомий розподіл затримки: {distribution}")
+        self.latency = latency
+        self.distribution = distribution
+        self.jitter = jitter
+        self.p429 = p429
+        self.p5xx = p5xx
+        self.slow = slow
+        self.slow_seconds = slow_seconds
+        self.reset = reset
+
+    def sample_latency(self) -> float:
+        """Затримка відповіді (с) із середнім latency."""
+        mean = self.latency
+        if mean <= 0:
+            return 0.0
+        if self.distribution == "const" or self.jitter <= 0:
+            return mean
+        if self.distribution == "normal":
+            return max(0.0, random.gauss(mean, mean * self.jitter))
+        if self.distribution == "lognormal":
+            sigma = self.jitter
+            return random.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma)
+        # pareto: важкий хвіст, чим більший jitter, тим довші рідкісні затримки
+        alpha = 1 + 1 / self.jitter
+        return mean * (alpha - 1) / alpha * random.paretovariate(alpha)
+
+    def pick_fault(self, allow_429: bool = True) -> str | None:
+        """Вибирає збій для запиту: reset, 429, 5xx, slow або None."""
+        roll = random.random()
+        for fault, probability in (("reset", self.reset), ("429", self.p429 if allow_429 else 0.0),
+                                   ("5xx", self.p5xx), ("slow", self.slow)):
+            if roll < probability:
+                return fault
+            roll -= probability
+        return None
+
+
+class FakeApiState:
+    """Записані відповіді, профілі збоїв і лічильники (спільні для всіх потоків сервера)."""
+
+    def __init__(self, api: FaultProfile, upload: FaultProfile, cloud_name: str = "bench"):
+        self.api = api
+        self.upload = upload
+        self.cloud_name = cloud_name
+        self.fixtures = {}
+        for endpoint in API_ENDPOINTS:
+            with open(os.path.join(FIXTURES, f"{endpoint}.json"), encoding="utf-8") as file:
+                self.fixtures[endpoint] = json.load(file)
+        self.counters = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def count(self, name: str) -> None:
+        with self.lock:
+            self.counters[name] += 1
+
+    def stats(self) -> dict:
+        with self.lock:
+            return dict(self.counters)
+
+    def reset_stats(self) -> None:
+        with self.lock:
+            self.counters.clear()
+
+    def api_body(self, endpoint: str, params: dict) -> bytes:
+        """Відповідь ендпоінта з ID товарів, узятими з параметрів запиту."""
+        data = json.loads(json.dumps(self.fixtures[endpoint]))
+        result = data["result"]
+        if endpoint == "item_detail_7":
+            result["item"]["itemId"] = params.get("itemId", "0")
+        elif endpoint == "item_review":
+            result["base"]["page"] = int(params.get("page", 1))
+        elif endpoint == "item_search_4":
+            offset = (int(params.get("page", 1)) - 1) * len(result["resultList"])
+            for index, entry in enumerate(result["resultList"]):
+                entry["item"]["itemId"] = str(1005006000000000 + offset + index)
+        return json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+    def upload_body(self, fields: dict) -> bytes:
+        with self.lock:
+            self.counters["uploads_stored"] += 1
+            number = self.counters["uploads_stored"]
+        public_id = "/".join(part for part in (fields.get("folder"), fields.get("public_id") or str(number)) if part)
+        return json.dumps({
+            "public_id": public_id, "etag": f"{number:032x}", "bytes": 150_000, "format": "jpg",
+            "secure_url": f"https://res.cloudinary.com/{self.cloud_name}/image/upload/{public_id}.jpg",
+        }).encode("utf-8")
+
+
+_FORM_FIELD_RE = re.compile(rb'name="([^"]+)"\r\n\r\n(.*?)\r\n--', re.S)
+
+
+class FakeApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "FakeApi/1.0"
+
+    @property
+    def state(self) -> FakeApiState:
+        return self.server.state
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, headers: dict | None = None, slow_seconds: float = 0.0) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if not slow_seconds:
+            self.wfile.write(body)
+            return
+        # Повільне тіло: відповідь надходить частинами протягом slow_seconds
+        chunks = 10
+        size = max(1, math.ceil(len(body) / chunks))
+        for start in range(0, len(body), size):
+            self.wfile.write(body[start:start + size])
+            self.wfile.flush()
+            time.sleep(slow_seconds / chunks)
+
+    def _reset_connection(self) -> None:
+        """Розриває з'єднання без відповіді (RST замість FIN)."""
+        self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+        self.connection.close()
+        self.close_connection = True
+
+    def _respond(self, kind: str, profile: FaultProfile, body_factory, allow_429: bool = True) -> None:
+        self.state.count(f"{kind}_requests")
+        fault = profile.pick_fault(allow_429)
+        time.sleep(profile.sample_latency())
+        if fault:
+            self.state.count(f"{kind}_fault_{fault}")
+        if fault == "reset":
+            self._reset_connection()
+        elif fault == "429":
+            self._send(429, b'{"message":"Too many requests"}', {"Retry-After": "1"})
+        elif fault == "5xx":
+            status = random.choice((500, 502, 503, 504))
+            self._send(status, json.dumps({"error": {"message": f"Injected {status}"}}).encode("utf-8"))
+        else:
+            self._send(200, body_factory(), slow_seconds=profile.slow_seconds if fault == "slow" else 0.0)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/__stats":
+            self._send(200, json.dumps(self.state.stats()).encode("utf-8"))
+            return
+        endpoint = url.path.rsplit("/", 1)[-1]
+        if endpoint in API_ENDPOINTS:
+            params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+            self._respond("api", self.state.api, lambda: self.state.api_body(endpoint, params))
+        elif "/resources/" in url.path:
+            self._send(200, b'{"resources": []}')
+        else:
+            self._send(404, b'{"message":"Endpoint does not exist"}')
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if url.path == "/__reset":
+            self.state.reset_stats()
+            self._send(200, b"{}")
+            return
+        if url.path.endswith("/upload"):
+            fields = {name.decode(): value.decode("utf-8", "replace") for name, value in _FORM_FIELD_RE.findall(body)}
+            self._respond("upload", self.state.upload, lambda: self.state.upload_body(fields), allow_429=False)
+        else:
+            self._send(404, b'{"error":{"message":"Not found"}}')
+
+
+class FakeApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address: tuple[str, int], state: FakeApiState):
+        super().__init__(address, FakeApiHandler)
+        self.state = state
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def add_fault_arguments(parser: argparse.ArgumentParser) -> None:
+    """Параметри затримок і збоїв (спільні для fake_api.py та load_test.py)."""
+    parser.add_argument("--api-latency", type=float, default=0.2, help="середня затримка RapidAPI, с")
+    parser.add_argument("--upload-latency", type=float, default=0.1, help="середня затримка Cloudinary, с")
+    parser.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--jitter", type=float, default=0.5, help="розкид затримки (sigma / відносне відхилення)")
+    parser.add_argument("--p429", type=float, default=0.0, help="частка відповідей 429 (лише RapidAPI)")
+    parser.add_argument("--p5xx", type=float, default=0.0, help="частка відповідей 500/502/503/504")
+    parser.add_argument("--slow", type=float, default=0.0, help="частка відповідей з повільним тілом")
+    parser.add_argument("--slow-seconds", type=float, default=5.0, help="тривалість повільного тіла, с")
+    parser.add_argument("--reset", type=float, default=0.0, help="частка розірваних з'єднань")
+    parser.add_argument("--faults-on", choices=("api", "upload", "both"), default="both",
+                        help="де вносити збої")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def state_from_args(args) -> FakeApiState:
+    faults = {"p429": args.p429, "p5xx": args.p5xx, "slow": args.slow,
+              "slow_seconds": args.slow_seconds, "reset": args.reset}
+    common = {"distribution": args.latency_dist, "jitter": args.jitter}
+    api = FaultProfile(args.api_latency, **common, **(faults if args.faults_on in ("api", "both") else {}))
+    upload = FaultProfile(args.upload_latency, **common, **(faults if args.faults_on in ("upload", "both") else {}))
+    return FakeApiState(api, upload)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Локальний замінник RapidAPI і Cloudinary зі збоями")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="0 — вільний порт")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+    if args.seed is not None:
+        random.seed(args.seed)
+    server = FakeApiServer((args.host, args.port), state_from_args(args))
+    # Перший рядок виводу — адреса сервера (його читає load_test.py)
+    print(server.url, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
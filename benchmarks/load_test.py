@@ -0,0 +1,157 @@
+"""
+Навантажувальний тест повного конвеєра (funcionality.start_parsing, режим multiple)
+проти локального замінника RapidAPI і Cloudinary (benchmarks/fake_api.py) — без витрати квоти.
+
+Для кожного рівня паралельності (кількість товарів одночасно) запускається окреме завдання
+з тими самими ID товарів. Звіт: товарів за секунду, p95 отримання товару, запити до API,
+повтори, помилки, внесені сервером збої (429 / 5xx / повільне тіло / розірване з'єднання),
+спрацювання запобіжника, зменшення адаптивного ліміту, дублюючі запити, невдалі завантаження фото.
+
+Запуск:
+    python benchmarks/load_test.py --items 2000 --concurrency 4,16,64 --api-latency 0.3 --p429 0.02 --p5xx 0.02 --reset 0.01
+    python benchmarks/load_test.py --items 500 --concurrency 8,32 --latency-dist pareto --jitter 1 --hedge
+
+Налаштування парсера (API_CONCURRENCY_MAX, API_BREAKER_*, UPLOAD_WORKERS, ...) беруться з середовища як зазвичай.
+"""
+import argparse
+import glob
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.request import Request, urlopen
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from fake_api import add_fault_arguments
+
+
+def start_server(args) -> tuple[subprocess.Popen, str]:
+    """Запускає fake_api.py в окремому процесі (щоб сервер не ділив GIL з парсером); повертає процес і адресу."""
+    command = [sys.executable, os.path.join(ROOT, "benchmarks", "fake_api.py"), "--port", "0",
+               "--api-latency", str(args.api_latency), "--upload-latency", str(args.upload_latency),
+               "--latency-dist", args.latency_dist, "--jitter", str(args.jitter),
+               "--p429", str(args.p429), "--p5xx", str(args.p5xx), "--slow", str(args.slow),
+               "--slow-seconds", str(args.slow_seconds), "--reset", str(args.reset), "--faults-on", args.faults_on]
+    if args.seed is not None:
+        command += ["--seed", str(args.seed)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    url = process.stdout.readline().strip()
+    if not url:
+        process.kill()
+        raise SystemExit("Не вдалося запустити fake_api.py")
+    return process, url
+
+
+def server_call(url: str, path: str, post: bool = False) -> dict:
+    request = Request(f"{url}{path}", data=b"" if post else None, method="POST" if post else "GET")
+    with urlopen(request, timeout=10) as response:
+        return json.loads(response.read())
+
+
+def configure_environment(url: str, args) -> None:
+    """Направляє парсер на замінник і вимикає все, що зберігає стан між рівнями."""
+    os.environ.update({
+        "API_BASE_URL": url, "CLOUDINARY_UPLOAD_PREFIX": url,
+        "CLOUD_NAME": "bench", "API_KEY": "bench", "API_SECRET": "bench",
+        "RAPID_API_KEYS": "", "RAPID_API_KEY": "bench", "RAPID_API_STATE_PATH": "",
+        "API_CACHE_MODE": "bypass", "PHOTO_INDEX_ENABLED": "0", "PHOTO_INDEX_RECONCILE": "0",
+        "PHOTO_INDEX_HASH_CONTENT": "0", "CATALOG_ENABLED": "0", "JOURNAL_FSYNC": "0",
+    })
+    os.environ.setdefault("RAPID_API_RPS", "0")
+    if args.hedge:
+        os.environ["API_HEDGE"] = "1"
+
+
+def counter(counters: dict, name: str) -> int:
+    """Сума лічильника за всіма мітками (api_calls{endpoint="..."})."""
+    return sum(value for key, value in counters.items() if key == name or key.startswith(name + "{"))
+
+
+def run_level(workers: int, ids_path: str, level_dir: str, url: str) -> dict:
+    import ali_parse
+    import data
+    from funcionality import start_parsing
+
+    # Кожен рівень починає з чистого адаптивного ліміту і закритих запобіжників
+    ali_parse._limiters.clear()
+    ali_parse._breakers.clear()
+    server_call(url, "/__reset", post=True)
+    data.set_output_dir(level_dir)
+    log_lines = []
+    start = time.perf_counter()
+    ok = start_parsing("multiple", "", 0, log_lines.append, None, workers=workers, sources=[ids_path])
+    elapsed = time.perf_counter() - start
+    reports = glob.glob(os.path.join(level_dir, "*", "run_report.json"))
+    report = json.load(open(reports[0], encoding="utf-8")) if reports else {"counters": {}, "stages": {}}
+    return {"workers": workers, "ok": ok, "elapsed": elapsed, "report": report,
+            "server": server_call(url, "/__stats"), "log_lines": log_lines}
+
+
+def print_table(results: list[dict], items: int) -> None:
+    columns = ("workers", "готово", "товар/с", "fetch p95", "API", "повтори", "помилки",
+               "429", "5xx", "slow", "reset", "breaker", "ліміт↓", "hedge", "фото✗")
+    print("".join(f"{name:>10}" for name in columns))
+    for result in results:
+        counters = result["report"].get("counters", {})
+        server = result["server"]
+        done = counter(counters, "items_processed")
+        fetch = result["report"].get("stages", {}).get("fetch", {})
+        row = (result["workers"], f"{done}/{items}", f"{done / result['elapsed']:.1f}",
+               f"{fetch.get('p95', 0):.2f}s", counter(counters, "api_calls"), counter(counters, "api_retries"),
+               counter(counters, "api_failures"), server.get("api_fault_429", 0),
+               server.get("api_fault_5xx", 0) + server.get("upload_fault_5xx", 0),
+               server.get("api_fault_slow", 0) + server.get("upload_fault_slow", 0),
+               server.get("api_fault_reset", 0) + server.get("upload_fault_reset", 0),
+               counter(counters, "api_breaker_opened"), counter(counters, "api_concurrency_decreases"),
+               counter(counters, "api_hedges"), counter(counters, "upload_failures"))
+        print("".join(f"{str(value):>10}" for value in row))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Навантажувальний тест конвеєра проти локального замінника API")
+    parser.add_argument("--items", type=int, default=1000, help="кількість товарів на кожному рівні")
+    parser.add_argument("--concurrency", default="1,4,16,64", help="рівні паралельності через кому")
+    parser.add_argument("--target", help="адреса вже запущеного fake_api.py (інакше запускається власний)")
+    parser.add_argument("--hedge", action="store_true", help="увімкнути дублюючі запити (API_HEDGE=1)")
+    parser.add_argument("--keep-output", action="store_true", help="не видаляти файли результатів")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+
+    process = None
+    url = args.target
+    if not url:
+        process, url = start_server(args)
+    output_dir = tempfile.mkdtemp(prefix="load_test_")
+    try:
+        configure_environment(url, args)
+        ids_path = os.path.join(output_dir, "ids.txt")
+        with open(ids_path, "w", encoding="utf-8") as file:
+            file.writelines(f"{1005007000000000 + index}\n" for index in range(args.items))
+        print(f"Замінник API: {url}; товарів: {args.items}; рівні: {levels}")
+        results = []
+        for workers in levels:
+            result = run_level(workers, ids_path, os.path.join(output_dir, f"workers_{workers}"), url)
+            results.append(result)
+            print(f"workers={workers}: {result['elapsed']:.1f} с, "
+                  f"{'результат збережено' if result['ok'] else 'результат не збережено'}")
+        print()
+        print_table(results, args.items)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+        if args.keep_output:
+            print(f"Файли: {output_dir}")
+        else:
+            shutil.rmtree(output_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Записує реальні відповіді RapidAPI у benchmarks/fixtures для офлайн-бенчмарків.
+Потребує ключа RapidAPI у .env (витрачає три запити квоти).
+
+Запуск:
+    python benchmarks/record_fixtures.py <item_id> <пошуковий запит>
+"""
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ["API_CACHE_MODE"] = "refresh"
+
+from ali_parse import api_get, headers
+
+
+def main() -> None:
+    if len(sys.argv) < 3:
+        print(__doc__)
+        sys.exit(1)
+    item_id, query = sys.argv[1], sys.argv[2]
+    requests_to_record = {
+        "item_detail_7": {"itemId": item_id, "region": "US"},
+        "item_review": {"itemId": item_id, "page": "1", "sort": "default", "filter": "allReviews"},
+        "item_search_4": {"q": query, "page": "1", "sort": "default", "region": "US"},
+    }
+    for endpoint, params in requests_to_record.items():
+        data = api_get(endpoint, headers, params)
+        if data is None:
+            print(f"{endpoint}: не вдалося отримати відповідь, файл не змінено.")
+            continue
+        path = os.path.join(ROOT, "benchmarks", "fixtures", f"{endpoint}.json")
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(data, file, ensure_ascii=False, indent=1)
+        print(f"{endpoint}: збережено {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Iterator
+
+import jobs
+import metrics
+from data import StreamExporter
+
+from dotenv import load_dotenv
+load_dotenv()
+
+CATALOG_PATH = os.getenv("CATALOG_PATH", "catalog.sqlite3")
+# Записувати кожен оброблений товар у каталог
+CATALOG_ENABLED = os.getenv("CATALOG_ENABLED", "1") == "1"
+
+_PRICE_RE = re.compile(r"\d+(?:[.,]\d+)?")
+ORDER_COLUMNS = ("parsed_at", "price", "rating", "item_id")
+
+
+def parse_price(value) -> float | None:
+    """Перше число з ціни ("6.70", "6.70 - 7.06", "US $6,70") або None."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _PRICE_RE.search(str(value or ""))
+    return float(match.group().replace(",", ".")) if match else None
+
+
+class Catalog:
+    """
+    Каталог товарів у SQLite: по одному рядку на ID товару (повторний парсинг оновлює рядок),
+    з індексами за ціною, рейтингом і часом парсингу. Зберігає повний словник get_item_info
+    та рядки Shopify, тому JSON / CSV / Shopify CSV можна вивантажити запитом без повторного парсингу.
+    """
+
+    def __init__(self, path: str = CATALOG_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS products ("
+                "item_id TEXT PRIMARY KEY, title TEXT, price REAL, original_price REAL, rating REAL, "
+                "likes INTEGER, first_parsed_at REAL NOT NULL, parsed_at REAL NOT NULL, "
+                "data TEXT NOT NULL, shopify TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_products_price ON products(price)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_products_rating ON products(rating)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_products_parsed_at ON products(parsed_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @metrics.timed("catalog")
+    def upsert(self, item_id: str, item_dict: dict, shopify_rows: list[tuple] | None = None,
+               parsed_at: float | None = None) -> None:
+        """Додає товар або оновлює його рядок (дата першого парсингу зберігається)."""
+        parsed_at = parsed_at or time.time()
+        likes = item_dict.get("Likes")
+        row = (
+            item_id,
+            item_dict.get("Title"),
+            parse_price(item_dict.get("DiscountPrice")) or parse_price(item_dict.get("OriginalPrice")),
+            parse_price(item_dict.get("OriginalPrice")),
+            item_dict.get("Rating"),
+            int(likes) if str(likes or "").isdigit() else None,
+            parsed_at,
+            parsed_at,
+            json.dumps(item_dict, ensure_ascii=False),
+            json.dumps(shopify_rows, ensure_ascii=False) if shopify_rows is not None else None,
+        )
+        with self.lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT INTO products (item_id, title, price, original_price, rating, likes, "
+                "first_parsed_at, parsed_at, data, shopify) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(item_id) DO UPDATE SET title = excluded.title, price = excluded.price, "
+                "original_price = excluded.original_price, rating = excluded.rating, likes = excluded.likes, "
+                "parsed_at = excluded.parsed_at, data = excluded.data, "
+                "shopify = COALESCE(excluded.shopify, products.shopify)", row)
+            conn.commit()
+
+    def _where(self, min_price=None, max_price=None, min_rating=None, since=None, until=None,
+               title=None, item_ids=None) -> tuple[str, list]:
+        conditions, params = [], []
+        for column, operator, value in (("price", ">=", min_price), ("price", "<=", max_price),
+                                         ("rating", ">=", min_rating), ("parsed_at", ">=", since),
+                                         ("parsed_at", "<", until)):
+            if value is not None:
+                conditions.append(f"{column} {operator} ?")
+                params.append(value)
+        if title:
+            conditions.append("title LIKE ?")
+            params.append(f"%{title}%")
+        if item_ids:
+            conditions.append(f"item_id IN ({','.join('?' * len(item_ids))})")
+            params.extend(item_ids)
+        return (" WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+    def query(self, order_by: str = "parsed_at", descending: bool = True, limit: int = 0,
+              **filters) -> Iterator[tuple[str, dict, list[tuple]]]:
+        """
+        Повертає (item_id, item_dict, shopify_rows) товарів за фільтрами:
+        min_price, max_price, min_rating, since / until (unix-час парсингу), title (підрядок), item_ids.
+        """
+        if order_by not in ORDER_COLUMNS:
+            raise ValueError(f"Невідоме поле сортування: {order_by}")
+        where, params = self._where(**filters)
+        sql = f"SELECT item_id, data, shopify FROM products{where} ORDER BY {order_by} {'DESC' if descending else 'ASC'}"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self.lock:
+            self._connect()
+        # Окреме з'єднання для читання: рядки читаються потоково, запис у каталог не блокується
+        conn = sqlite3.connect(self.path)
+        try:
+            for item_id, data, shopify in conn.execute(sql, params):
+                yield item_id, json.loads(data), [tuple(row) for row in json.loads(shopify)] if shopify else []
+        finally:
+            conn.close()
+
+    def count(self, **filters) -> int:
+        where, params = self._where(**filters)
+        with self.lock:
+            return self._connect().execute(f"SELECT COUNT(*) FROM products{where}", params).fetchone()[0]
+
+    def export(self, folder: str, **query) -> int:
+        """Вивантажує товари за запитом у JSON, CSV та Shopify CSV (як у режимі multiple); повертає кількість."""
+        with StreamExporter(folder, files=True) as exporter:
+            for _, item_dict, shopify_rows in self.query(**query):
+                exporter.write(item_dict, shopify_rows)
+        return exporter.count
+
+
+catalog = Catalog()
+
+
+def record_item(item_id: str, item_dict: dict, shopify_rows: list[tuple] | None = None) -> None:
+    """Записує оброблений товар у каталог (якщо він увімкнений); помилки каталогу не зупиняють парсинг."""
+    if not CATALOG_ENABLED:
+        return
+    try:
+        catalog.upsert(item_id, item_dict, shopify_rows)
+    except sqlite3.Error as e:
+        jobs.log(f"Не вдалося записати товар {item_id} у каталог: {e}")
@@ -0,0 +1,305 @@
+"""
+Консольний запуск парсера без графічного інтерфейсу (для серверів і cron).
+
+Приклади:
+    python cli.py single https://www.aliexpress.com/item/1005001234567890.html
+    python cli.py multiple --file links.txt --output-dir results
+    cat links.txt | python cli.py multiple -
+    python cli.py query "https://www.aliexpress.com/w/wholesale-phone-case.html" --limit 20
+    python cli.py multiple --resume results/list_items_12_30_00
+
+Черга задач для кількох процесів / машин (спільний файл JOB_QUEUE_PATH):
+    python cli.py enqueue --file links.txt --queue catalog
+    python cli.py worker --queue catalog --workers 8      # запустити в кількох процесах
+    python cli.py queue-status --queue catalog
+
+Каталог товарів (CATALOG_PATH): вибірка та вивантаження у JSON / CSV / Shopify CSV:
+    python cli.py catalog --max-price 10 --min-rating 4.5 --since 7d
+    python cli.py catalog --title "phone case" --export-name phone_cases -o results
+
+Звірка індексу фото зі списком фото у Cloudinary (один прохід, 500 фото за запит Admin API):
+    python cli.py reconcile
+    python cli.py reconcile 1005001234567890/
+
+Повернути в ротацію ключі RapidAPI, позначені як вичерпані цього місяця або поставлені на паузу
+(спільний файл RAPID_API_STATE_PATH):
+    python cli.py reset-keys
+
+PyQt5 тут не імпортується; requests і cloudinary завантажуються лише під час першого запиту.
+"""
+import argparse
+import json
+import os
+import signal
+import sys
+
+MODES = ("single", "multiple", "query", "enqueue", "worker", "queue-status", "catalog", "reconcile",
+         "reset-keys")
+
+
+def read_inputs(values: list[str], files: list[str]) -> list[str]:
+    """
+    Збирає посилання з аргументів, файлів і stdin ("-").
+    Підтримуються як рядки по одному посиланню, так і списки через кому;
+    порожні рядки та рядки, що починаються з #, пропускаються.
+    """
+    chunks = []
+    for value in values:
+        if value == "-":
+            chunks.extend(sys.stdin.read().splitlines())
+        else:
+            chunks.append(value)
+    for path in files:
+        if path == "-":
+            chunks.extend(sys.stdin.read().splitlines())
+            continue
+        with open(path, encoding="utf-8") as file:
+            chunks.extend(file.read().splitlines())
+    links = []
+    for chunk in chunks:
+        chunk = chunk.strip()
+        if not chunk or chunk.startswith("#"):
+            continue
+        links.extend(part.strip() for part in chunk.split(",") if part.strip())
+    return links
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="cli.py",
+        description="AliExpress Parser — пакетний запуск без графічного інтерфейсу.",
+    )
+    parser.add_argument("mode", choices=MODES, help="режим парсингу")
+    parser.add_argument("inputs", nargs="*", metavar="LINK",
+                        help="посилання на товар / пошук (або '-' для читання зі stdin)")
+    parser.add_argument("-f", "--file", action="append", default=[], dest="files",
+                        help="файл зі списком посилань (можна вказати кілька разів, '-' — stdin)")
+    parser.add_argument("-l", "--limit", type=int, default=1,
+                        help="кількість товарів для режиму query (за замовчуванням 1)")
+    parser.add_argument("-o", "--output-dir", default=None,
+                        help="папка для результатів (за замовчуванням OUTPUT_DIR або поточна папка)")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="кількість товарів, що обробляються одночасно (PARSER_WORKERS)")
+    parser.add_argument("--cache", choices=("use", "refresh", "bypass"), default=None,
+                        help="режим кешу відповідей API (API_CACHE_MODE)")
+    parser.add_argument("--resume", metavar="FOLDER", default=None,
+                        help="продовжити перерване завдання query/multiple з його папки результатів")
+    parser.add_argument("--deadline", type=float, default=None,
+                        help="обмеження часу завдання в секундах (після нього завдання зупиняється)")
+    parser.add_argument("--queue", default="default",
+                        help="назва черги для enqueue / worker / queue-status")
+    parser.add_argument("--max-items", type=int, default=0,
+                        help="воркер: обробити не більше стількох товарів (0 — до спорожніння черги)")
+    parser.add_argument("--wait", action="store_true",
+                        help="воркер: не завершуватися на порожній черзі, чекати нових задач")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="queue-status: повернути задачі зі статусом failed у чергу")
+    parser.add_argument("--catalog-only", action="store_true",
+                        help="записувати товари лише в каталог, без файлів JSON / CSV / Shopify CSV")
+    parser.add_argument("--no-review-photos", action="store_true",
+                        help="не збирати фото з відгуків (item_review не запитується)")
+    parser.add_argument("--min-price", type=float, default=None, help="catalog: мінімальна ціна")
+    parser.add_argument("--max-price", type=float, default=None, help="catalog: максимальна ціна")
+    parser.add_argument("--min-rating", type=float, default=None, help="catalog: мінімальний рейтинг")
+    parser.add_argument("--since", default=None,
+                        help="catalog: товари, спарсені після дати (YYYY-MM-DD) або за період (7d, 12h)")
+    parser.add_argument("--title", default=None, help="catalog: підрядок у назві товару")
+    parser.add_argument("--export-name", default=None,
+                        help="catalog: назва папки для вивантаження (без неї — лише кількість товарів)")
+    parser.add_argument("--progress", action="store_true",
+                        help="виводити прогрес у stderr")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="не виводити лог виконання")
+    return parser
+
+
+def split_sources(args) -> tuple[list[str], list[str]]:
+    """
+    Для великих списків (multiple, enqueue): файли та stdin читаються потоково модулем ingest,
+    а посилання з аргументів передаються як є. Повертає (файли, посилання).
+    """
+    sources = list(args.files)
+    if "-" in args.inputs and "-" not in sources:
+        sources.append("-")
+    return sources, [value for value in args.inputs if value != "-"]
+
+
+def run_queue_command(args) -> int:
+    """Команди черги enqueue та queue-status."""
+    from job_queue import JobQueue
+    job_queue = JobQueue()
+    if args.mode == "queue-status":
+        if args.retry_failed:
+            print(f"Повернуто в чергу: {job_queue.retry_failed(args.queue)}")
+        print(json.dumps(job_queue.stats(args.queue), ensure_ascii=False))
+        return 0
+    from ingest import iter_item_ids_from_sources
+    added = job_queue.enqueue(iter_item_ids_from_sources(*split_sources(args)), args.queue)
+    print(f"Додано в чергу {args.queue}: {added}; {job_queue.stats(args.queue)}")
+    return 0
+
+
+def parse_since(value: str) -> float:
+    """Перетворює "7d" / "12h" / "YYYY-MM-DD" на unix-час."""
+    import time
+    from datetime import datetime
+    units = {"d": 86400, "h": 3600, "m": 60}
+    if value[-1:] in units and value[:-1].replace(".", "", 1).isdigit():
+        return time.time() - float(value[:-1]) * units[value[-1]]
+    return datetime.fromisoformat(value).timestamp()
+
+
+def run_catalog_command(args) -> int:
+    """Вибірка з каталогу товарів і (за наявності --export-name) вивантаження у файли."""
+    try:
+        since = parse_since(args.since) if args.since else None
+    except ValueError:
+        print(f"Некоректне значення --since: {args.since}", file=sys.stderr)
+        return 2
+    import data
+    from catalog import catalog
+    if args.output_dir:
+        data.set_output_dir(args.output_dir)
+    filters = {"min_price": args.min_price, "max_price": args.max_price, "min_rating": args.min_rating,
+               "since": since, "title": args.title}
+    print(f"Товарів у каталозі за запитом: {catalog.count(**filters)}")
+    if args.export_name:
+        count = catalog.export(args.export_name, limit=args.max_items, **filters)
+        print(f"Вивантажено товарів: {count} → {data.output_folder(args.export_name)}")
+    return 0
+
+
+def run_reconcile_command(args) -> int:
+    """Одноразова звірка індексу фото з Cloudinary (за префіксами з аргументів або весь обліковий запис)."""
+    import hosting
+    for prefix in args.inputs or [hosting.PHOTO_INDEX_RECONCILE_PREFIX]:
+        try:
+            count = hosting.reconcile(prefix)
+        except Exception as e:
+            print(f"Не вдалося звірити індекс фото з Cloudinary: {e}", file=sys.stderr)
+            return 1
+        print(f"Додано до індексу фото{f' з префіксом {prefix}' if prefix else ''}: {count}")
+    return 0
+
+
+def run_reset_keys_command(args) -> int:
+    """Знімає зі спільного стану ключів позначки вичерпаної місячної квоти та паузи."""
+    import rate_limit
+    pool = rate_limit.ApiKeyPool(rate_limit.load_api_keys())
+    count = pool.reset()
+    usage = pool.state.usage(pool._month())
+    print(f"Скинуто позначок і пауз ключів: {count}")
+    for key_id in pool.key_ids:
+        print(f"  {key_id}: запитів цього місяця {usage.get(key_id, 0)}")
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_intermixed_args(argv)
+    if args.mode in ("multiple", "enqueue"):
+        sources, links = split_sources(args)
+        if not sources and not links and not args.resume:
+            print("Не вказано жодного посилання.", file=sys.stderr)
+            return 2
+    elif args.mode not in ("queue-status", "catalog", "reconcile", "reset-keys"):
+        sources, links = [], read_inputs(args.inputs, args.files)
+    if args.mode in ("enqueue", "queue-status"):
+        return run_queue_command(args)
+    if args.mode == "catalog":
+        return run_catalog_command(args)
+    if args.mode == "reconcile":
+        return run_reconcile_command(args)
+    if args.mode == "reset-keys":
+        return run_reset_keys_command(args)
+    resume_folder = None
+    if args.resume:
+        meta_path = os.path.join(args.resume, "job.json")
+        try:
+            with open(meta_path, encoding="utf-8") as file:
+                job_mode = json.load(file).get("mode")
+        except (OSError, ValueError):
+            print(f"Не знайдено журнал завдання: {meta_path}", file=sys.stderr)
+            return 2
+        if job_mode != args.mode:
+            print(f"Завдання {args.resume} створене в режимі {job_mode}, а не {args.mode}.", file=sys.stderr)
+            return 2
+        # Завдання продовжується у тій самій папці: її батьківська папка стає папкою результатів
+        args.output_dir = os.path.dirname(os.path.abspath(args.resume))
+        resume_folder = os.path.basename(os.path.abspath(args.resume))
+    elif not links and not sources and args.mode != "worker":
+        print("Не вказано жодного посилання.", file=sys.stderr)
+        return 2
+    if args.mode == "query" and args.limit < 1:
+        print("Ліміт має бути не менше 1.", file=sys.stderr)
+        return 2
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    # Імпорт після розбору аргументів: --help та помилки аргументів не завантажують парсер
+    import data
+    import jobs
+    from api_cache import cache as response_cache
+    from concurrency import DEFAULT_WORKERS
+
+    if args.output_dir:
+        data.set_output_dir(args.output_dir)
+    if args.catalog_only:
+        data.set_output_files(False)
+    if args.no_review_photos:
+        import ali_parse
+        ali_parse.set_review_photos(False)
+    if args.cache:
+        response_cache.set_mode(args.cache)
+    workers = max(1, args.workers) if args.workers else DEFAULT_WORKERS
+
+    def log_callback(msg: str):
+        if not args.quiet:
+            sys.stdout.write(f"{msg}\n")
+            sys.stdout.flush()
+    def progress_callback(value: int):
+        if args.progress:
+            sys.stderr.write(f"\rПрогрес: {value}%")
+            sys.stderr.flush()
+
+    # Ctrl+C / SIGTERM зупиняють завдання коректно (файли й журнал закриваються); повторний Ctrl+C — одразу
+    job = jobs.Job(0, args.mode, log_callback, progress_callback, args.deadline)
+    def stop(signum, frame):
+        log_callback("Зупинка завдання...")
+        job.cancel()
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    with jobs.use(job):
+        try:
+            results = run_jobs(args, links, sources, resume_folder, workers, log_callback, progress_callback)
+        finally:
+            job.close()
+    if args.progress:
+        sys.stderr.write("\n")
+    return 0 if all(results) else 1
+
+
+def run_jobs(args, links, sources, resume_folder, workers, log_callback, progress_callback) -> list[bool]:
+    """Виконує вибраний режим у поточному завданні; повертає успішність кожного запуску."""
+    import jobs
+    from funcionality import run_queue_worker, start_parsing
+    results = []
+    if args.mode == "worker":
+        results.append(run_queue_worker(args.queue, log_callback, workers, args.max_items, args.wait))
+    elif resume_folder:
+        results.append(start_parsing(args.mode, "", args.limit, log_callback, progress_callback, workers,
+                                     resume_folder))
+    elif args.mode == "multiple":
+        results.append(start_parsing("multiple", ",".join(links), 0, log_callback, progress_callback, workers,
+                                     sources=sources))
+    else:
+        for link in links:
+            if jobs.current().is_cancelled():
+                results.append(False)
+                break
+            results.append(start_parsing(args.mode, link, args.limit, log_callback, progress_callback, workers))
+    return results
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+import os
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Callable, Iterable, Iterator
+
+from dotenv import load_dotenv
+load_dotenv()
+
+# Кількість товарів, що обробляються одночасно (1 = послідовний режим)
+DEFAULT_WORKERS = max(1, int(os.getenv("PARSER_WORKERS", "4")))
+
+
+def submit_in_context(executor: Executor, func: Callable, *args, **kwargs) -> Future:
+    """
+    Запускає func у пулі з копією поточного контексту (contextvars),
+    щоб потоки пулу бачили метрики та налаштування завдання, яке їх створило.
+    """
+    return executor.submit(copy_context().run, func, *args, **kwargs)
+
+
+def ordered_map(func: Callable, items: Iterable, workers: int = DEFAULT_WORKERS) -> Iterator:
+    """
+    Виконує func для кожного елемента у пулі потоків і повертає результати
+    у порядку вхідних даних. Одночасно в роботі не більше workers * 2 задач,
+    тому пам'ять не зростає разом із розміром вхідного списку.
+    """
+    workers = max(1, int(workers or 1))
+    if workers == 1:
+        for item in items:
+            yield func(item)
+        return
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        try:
+            for item in items:
+                pending.append(submit_in_context(executor, func, item))
+                if len(pending) >= workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # Помилка, скасування завдання або зупинка споживача: задачі, що ще не почалися, не запускаємо
+            for future in pending:
+                future.cancel()
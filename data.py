@@ -1,9 +1,39 @@
+import io
 import json
 import csv
 import os
 import re
 from html import unescape
 
+import jobs
+import metrics
+from dotenv import load_dotenv
+load_dotenv()
+
+# Формат JSON для списків товарів: масив (за замовчуванням) або NDJSON (один товар на рядок)
+EXPORT_NDJSON = os.getenv("EXPORT_NDJSON", "0") == "1"
+# Коренева папка для результатів (порожньо — поточна папка)
+OUTPUT_DIR = os.getenv("OUTPUT_DIR", "")
+# 0 — не записувати JSON / CSV / Shopify CSV товарів (лише каталог, див. catalog.py)
+OUTPUT_FILES = os.getenv("OUTPUT_FILES", "1") == "1"
+
+
+def set_output_dir(path: str) -> None:
+    """Змінює кореневу папку для всіх файлів результатів."""
+    global OUTPUT_DIR
+    OUTPUT_DIR = path
+
+
+def set_output_files(enabled: bool) -> None:
+    """Вмикає або вимикає запис файлів JSON / CSV / Shopify CSV товарів."""
+    global OUTPUT_FILES
+    OUTPUT_FILES = enabled
+
+
+def output_folder(folder: str) -> str:
+    """Повертає шлях до папки результатів folder з урахуванням OUTPUT_DIR."""
+    return os.path.join(OUTPUT_DIR, folder) if OUTPUT_DIR else folder
+
 
 def get_range_price(items: dict) -> float:
     if isinstance(items["DiscountPrice"], str) and isinstance(items["OriginalPrice"], str):
@@ -26,6 +56,80 @@ def get_range_price(items: dict) -> float:
         else:
             return float(["OriginalPrice"])
 
+def _remove_admin_account_id(text: str) -> str:
+    """Видаляє фрагменти window.adminAccountId=<цифри>; без регулярних виразів."""
+    marker = "window.adminAccountId="
+    start = text.find(marker)
+    if start == -1:
+        return text
+    parts = []
+    pos = 0
+    while start != -1:
+        end = start + len(marker)
+        digits_end = end
+        while digits_end < len(text) and text[digits_end].isdigit():
+            digits_end += 1
+        if digits_end > end and digits_end < len(text) and text[digits_end] == ";":
+            parts.append(text[pos:start])
+            pos = digits_end + 1
+            start = text.find(marker, pos)
+        else:
+            start = text.find(marker, end)
+    parts.append(text[pos:])
+    return "".join(parts)
+
+
+def _remove_document_writes(text: str) -> str:
+    """
+    Видаляє блоки від "with(document)" до першого src="..." з непорожнім значенням.
+    Кожен символ переглядається не більше одного разу (на відміну від regex з .*?).
+    """
+    marker = "with(document)"
+    start = text.find(marker)
+    if start == -1:
+        return text
+    parts = []
+    pos = 0
+    while start != -1:
+        src = text.find('src="', start + len(marker))
+        end = -1
+        while src != -1:
+            quote = text.find('"', src + 5)
+            if quote == -1:
+                break
+            if quote > src + 5:
+                end = quote + 1
+                break
+            src = text.find('src="', src + 5)
+        if end == -1:
+            break
+        parts.append(text[pos:start])
+        pos = end
+        start = text.find(marker, pos)
+    parts.append(text[pos:])
+    return "".join(parts)
+
+
+# Теги та блоки <script>/<style> з вмістом. Жодна гілка, крім вмісту script/style, не виходить
+# за межі наступного "<", тому заміна лінійна за часом. У незакритого <script>/<style> видаляється
+# лише відкривальний тег, а текст після нього залишається.
+_TAGS_RE = re.compile(r"<(script|style)\b[^<>]*>.*?</\1\s*>|<[^<>]*>", re.IGNORECASE | re.DOTALL)
+
+
+def sanitize_description(raw: str, html: bool = True) -> str:
+    """
+    Повертає очищений текст опису товару: без сміття window.adminAccountId / with(document),
+    зайвих пробілів і з розшифрованими HTML-сутностями. Теги та скрипти видаляються лише
+    з HTML-опису (html=True); текстовий опис залишається без змін.
+    """
+    if not raw:
+        return ""
+    text = _TAGS_RE.sub("", raw) if html else raw
+    text = _remove_document_writes(_remove_admin_account_id(text))
+    text = " ".join(text.replace("&bull;", "").split())
+    return unescape(text)
+
+
 def get_item_info(item_data: tuple) -> dict:
     """
     Повертає інформацію про товар у вигляді словника.
@@ -81,29 +185,13 @@ def get_item_info(item_data: tuple) -> dict:
     # Отримання фото відгуків
     reviews_photo_links = ["https:" + image for image in reviews_photo]
     
-    # Отримання текстового опису: спочатку ключ "text", інакше очищення HTML з "html"
+    # Отримання текстового опису: спочатку ключ "text", інакше HTML з "html"
     description_text = description_obj.get("text", "").strip()
-    if not description_text:
-        raw_html = description_obj.get("html", "")
-        description_text = re.sub(r'<[^>]*>', '', raw_html).strip()
-
-    # Видалення небажаних фрагментів із опису
-    # Видаляємо JavaScript-код, наприклад: window.adminAccountId=6000091325;
-    description_text = re.sub(r'window\.adminAccountId=\d+;', '', description_text)
-    # Видаляємо блоки, що починаються з "with(document)" і до першого знайденого src="
-    description_text = re.sub(r'with\(document\).*?src="[^"]+"', '', description_text, flags=re.DOTALL)
-    # Видаляємо HTML-сутність &bull; та інші подібні (за потребою можна додати додаткові сутності)
-    description_text = re.sub(r'&bull;', '', description_text)
-    # Видаляємо зайві пробіли та перенос рядків
-    description_text = re.sub(r'\s+', ' ', description_text).strip()
-    # Розшифровуємо HTML-сутності (наприклад, &quot; -> ")
-    description_text = unescape(description_text)
-
-    if not description_text:
-        description_text = ""
+    if description_text:
+        description_text = sanitize_description(description_text, html=False)
     else:
-        description_text = description_text
-
+        # Очищення HTML-опису від тегів, скриптів та сміття
+        description_text = sanitize_description(description_obj.get("html", ""))
 
     original_price = item.get('result', {}).get("item", {}).get("sku", {}).get("def", {}).get("price", "")
     discount_price = item.get('result', {}).get("item", {}).get("sku", {}).get("def", {}).get("promotionPrice", "")
@@ -130,148 +218,89 @@ def get_items_list_from_query(items: dict):
     """Повертає список ID товарів із результатів пошукового запиту."""
     return [item['item']['itemId'] for item in items['result']['resultList']]
 
-def get_shopify_one_item(items: dict, photos_url: list[str]) -> list[dict]:
+# Колонки Shopify CSV (без Handle) у порядку запису
+SHOPIFY_COLUMNS = (
+    "Title", "Body (HTML)", "Vendor", "Product Category", "Type", "Tags", "Published",
+    "Option1 Name", "Option1 Value", "Option2 Name", "Option2 Value", "Option3 Name", "Option3 Value",
+    "Variant SKU", "Variant Grams", "Variant Inventory Tracker", "Variant Inventory Qty",
+    "Variant Inventory Policy", "Variant Fulfillment Service", "Variant Price",
+    "Variant Compare At Price", "Variant Requires Shipping", "Variant Taxable", "Variant Barcode",
+    "Image Src", "Image Position", "Image Alt Text", "Gift Card", "SEO Title", "SEO Description",
+    "Google Shopping / Google Product Category", "Google Shopping / Gender",
+    "Google Shopping / Age Group", "Google Shopping / MPN", "Google Shopping / AdWords Grouping",
+    "Google Shopping / AdWords Labels", "Google Shopping / Condition", "Google Shopping / Custom Product",
+    "Google Shopping / Custom Label 0", "Google Shopping / Custom Label 1",
+    "Google Shopping / Custom Label 2", "Google Shopping / Custom Label 3",
+    "Google Shopping / Custom Label 4", "Variant Image", "Variant Weight Unit", "Variant Tax Code",
+    "Cost per item", "Price / International", "Compare At Price / International", "Status",
+)
+SHOPIFY_HEADER = ("Handle",) + SHOPIFY_COLUMNS
+
+_IMAGE_SRC_INDEX = SHOPIFY_COLUMNS.index("Image Src")
+# Шаблон додаткового рядка з фото: усі колонки порожні, крім Image Src та Image Position
+_EXTRA_ROW_PREFIX = ("",) * _IMAGE_SRC_INDEX
+_EXTRA_ROW_SUFFIX = ("",) * (len(SHOPIFY_COLUMNS) - _IMAGE_SRC_INDEX - 2)
+
+
+def get_shopify_rows(items: dict, photos_url: list[str]) -> list[tuple]:
     """
-    Формує дані для Shopify.
+    Формує рядки Shopify у вигляді кортежів у порядку SHOPIFY_COLUMNS.
     Поле Body (HTML) формується як об'єднання Specifications і Description.
-    Для цін:
-      - DiscountPrice використовується для колонок Price / International і Variant Price,
-      - OriginalPrice – для колонок Compare At Price / International і Variant Compare At Price.
+    Перший рядок містить дані товару та головне фото, наступні — лише додаткові фото.
     """
     body_html = (items.get("Specifications", "") + "\n" + items.get("Description", "")).strip()
-    shopify_items = []
     price = get_range_price(items)
-    
-    main_row = {
-        "Title": items.get("Title", ""),
-        "Body (HTML)": body_html,
-        "Vendor": "",
-        "Product Category": "Uncategorized",
-        "Type": "",
-        "Tags": items.get("Title", ""),
-        "Published": False,
-        "Option1 Name": "",
-        "Option1 Value": "",
-        "Option2 Name": "",
-        "Option2 Value": "",
-        "Option3 Name": "",
-        "Option3 Value": "",
-        "Variant SKU": "",
-        "Variant Grams": "",
-        "Variant Inventory Tracker": "shopify",
-        "Variant Inventory Qty": 100,
-        "Variant Inventory Policy": "continue",
-        "Variant Fulfillment Service": "manual",
-        "Variant Price": price,
-        "Variant Compare At Price": "",
-        "Variant Requires Shipping": "",
-        "Variant Taxable": "",
-        "Variant Barcode": "",
-        "Image Src": photos_url[0] if photos_url else "",
-        "Image Position": 1,
-        "Image Alt Text": "",
-        "Gift Card": "",
-        "SEO Title": "",
-        "SEO Description": "",
-        "Google Shopping / Google Product Category": "",
-        "Google Shopping / Gender": "",
-        "Google Shopping / Age Group": "",
-        "Google Shopping / MPN": "",
-        "Google Shopping / AdWords Grouping": "",
-        "Google Shopping / AdWords Labels": "",
-        "Google Shopping / Condition": "",
-        "Google Shopping / Custom Product": "",
-        "Google Shopping / Custom Label 0": "",
-        "Google Shopping / Custom Label 1": "",
-        "Google Shopping / Custom Label 2": "",
-        "Google Shopping / Custom Label 3": "",
-        "Google Shopping / Custom Label 4": "",
-        "Variant Image": "",
-        "Variant Weight Unit": "",
-        "Variant Tax Code": "",
-        "Cost per item": "",
-        "Price / International": "",
-        "Compare At Price / International": "",
-        "Status": "draft"
-    }
-    shopify_items.append(main_row)
-    
+    title = items.get("Title", "")
+    main_row = (
+        title, body_html, "", "Uncategorized", "", title, False,
+        "", "", "", "", "", "",
+        "", "", "shopify", 100,
+        "continue", "manual", price,
+        "", "", "", "",
+        photos_url[0] if photos_url else "", 1,
+    ) + ("",) * (len(SHOPIFY_COLUMNS) - _IMAGE_SRC_INDEX - 3) + ("draft",)
+    shopify_rows = [main_row]
     for i in range(1, len(photos_url)):
-        extra_row = {
-            "Title": "",
-            "Body (HTML)": "",
-            "Vendor": "",
-            "Product Category": "",
-            "Type": "",
-            "Tags": "",
-            "Published": "",
-            "Option1 Name": "",
-            "Option1 Value": "",
-            "Option2 Name": "",
-            "Option2 Value": "",
-            "Option3 Name": "",
-            "Option3 Value": "",
-            "Variant SKU": "",
-            "Variant Grams": "",
-            "Variant Inventory Tracker": "",
-            "Variant Inventory Qty": "",
-            "Variant Inventory Policy": "",
-            "Variant Fulfillment Service": "",
-            "Variant Price": "",
-            "Variant Compare At Price": "",
-            "Variant Requires Shipping": "",
-            "Variant Taxable": "",
-            "Variant Barcode": "",
-            "Image Src": photos_url[i],
-            "Image Position": i + 1,
-            "Image Alt Text": "",
-            "Gift Card": "",
-            "SEO Title": "",
-            "SEO Description": "",
-            "Google Shopping / Google Product Category": "",
-            "Google Shopping / Gender": "",
-            "Google Shopping / Age Group": "",
-            "Google Shopping / MPN": "",
-            "Google Shopping / AdWords Grouping": "",
-            "Google Shopping / AdWords Labels": "",
-            "Google Shopping / Condition": "",
-            "Google Shopping / Custom Product": "",
-            "Google Shopping / Custom Label 0": "",
-            "Google Shopping / Custom Label 1": "",
-            "Google Shopping / Custom Label 2": "",
-            "Google Shopping / Custom Label 3": "",
-            "Google Shopping / Custom Label 4": "",
-            "Variant Image": "",
-            "Variant Weight Unit": "",
-            "Variant Tax Code": "",
-            "Cost per item": "",
-            "Price / International": "",
-            "Compare At Price / International": "",
-            "Status": ""
-        }
-        shopify_items.append(extra_row)
-    return shopify_items
+        shopify_rows.append(_EXTRA_ROW_PREFIX + (photos_url[i], i + 1) + _EXTRA_ROW_SUFFIX)
+    return shopify_rows
+
 
+def get_shopify_one_item(items: dict, photos_url: list[str]) -> list[dict]:
+    """
+    Формує дані для Shopify у вигляді словників (ключі — колонки SHOPIFY_COLUMNS).
+    Для запису у CSV швидше використовувати get_shopify_rows.
+    """
+    return [dict(zip(SHOPIFY_COLUMNS, row)) for row in get_shopify_rows(items, photos_url)]
+
+
+def _shopify_row_values(row: tuple | dict) -> tuple:
+    """Повертає значення рядка Shopify у порядку SHOPIFY_COLUMNS."""
+    if isinstance(row, dict):
+        return tuple(row.get(column, "") for column in SHOPIFY_COLUMNS)
+    return row
 
+
+@metrics.timed("save_json")
 def save_json(items: dict | list[dict], folder: str) -> None:
     """
     Зберігає дані у JSON файл у вказаній папці.
     Якщо папки не існує, вона буде створена.
     """
-    os.makedirs(folder, exist_ok=True)
-    file_path = f"{folder}/{folder}.json"
+    os.makedirs(output_folder(folder), exist_ok=True)
+    file_path = os.path.join(output_folder(folder), f"{folder}.json")
     with open(file_path, 'w', encoding='utf-8') as file:
         json.dump(items, file, ensure_ascii=False, indent=4)
-    print("JSON файл успішно збережено!")
+    jobs.log("JSON файл успішно збережено!")
 
 
+@metrics.timed("save_csv")
 def save_csv(items: dict | list[dict], folder: str) -> None:
     """
     Зберігає дані у CSV файл у вказаній папці.
     Якщо папки не існує, вона буде створена.
     """
-    os.makedirs(folder, exist_ok=True)
-    file_path = f"{folder}/{folder}.csv"
+    os.makedirs(output_folder(folder), exist_ok=True)
+    file_path = os.path.join(output_folder(folder), f"{folder}.csv")
     if isinstance(items, dict):
         items["MainPhotoLinks"] = ",".join(items["MainPhotoLinks"])
         items["ReviewsPhotoLinks"] = ",".join(items["ReviewsPhotoLinks"])
@@ -297,44 +326,249 @@ def save_csv(items: dict | list[dict], folder: str) -> None:
                 writer.writerow({"Handle": count, **item})
                 step = len(item.get("MainPhotoLinks", "1"))
                 count += 1
-    print("CSV файл успішно збережено!")
+    jobs.log("CSV файл успішно збережено!")
 
-def save_shopify_csv_one_item(items: list[dict] | dict, folder: str) -> None:
+@metrics.timed("save_shopify_csv")
+def save_shopify_csv_one_item(items: list[tuple | dict] | dict, folder: str) -> None:
     """
     Зберігає дані для Shopify (один товар) у CSV файл у вказаній папці.
     Усі рядки одного товару отримують однаковий Handle.
     """
     if isinstance(items, dict):
         items = [items]
-    fieldnames = ["Handle"] + list(items[0].keys())
-    os.makedirs(folder, exist_ok=True)
-    file_path = f"{folder}/{folder}_shopify.csv"
+    os.makedirs(output_folder(folder), exist_ok=True)
+    file_path = os.path.join(output_folder(folder), f"{folder}_shopify.csv")
     with open(file_path, 'w', newline='', encoding='utf-8') as file:
-        writer = csv.DictWriter(file, fieldnames=fieldnames)
-        writer.writeheader()
+        writer = csv.writer(file)
+        writer.writerow(SHOPIFY_HEADER)
         count = 1
         for item in items:
-            writer.writerow({"Handle": count, **item})
-    print("Shopify CSV файл успішно збережено!")
+            writer.writerow((count,) + _shopify_row_values(item))
+    jobs.log("Shopify CSV файл успішно збережено!")
 
 
-def save_shopify_csv_list_items(items: list[list[dict]], folder: str) -> None:
+@metrics.timed("save_shopify_csv")
+def save_shopify_csv_list_items(items: list[list[tuple | dict]], folder: str) -> None:
     """
     Зберігає дані для Shopify (список товарів) у один CSV файл у вказаній папці.
     """
-    os.makedirs(folder, exist_ok=True)
-    fieldnames = ["Handle"] + list(items[0][0].keys())
-    file_path = f"{folder}/{folder}_shopify.csv"
+    os.makedirs(output_folder(folder), exist_ok=True)
+    file_path = os.path.join(output_folder(folder), f"{folder}_shopify.csv")
     with open(file_path, 'w', newline='', encoding='utf-8') as file:
-        writer = csv.DictWriter(file, fieldnames=fieldnames)
-        writer.writeheader()
+        writer = csv.writer(file)
+        writer.writerow(SHOPIFY_HEADER)
         count = 1
         for product_items in items:
             for item in product_items:
-                writer.writerow({"Handle": count, **item})
+                writer.writerow((count,) + _shopify_row_values(item))
             count += 1
-    print("Shopify CSV файл успішно збережено!")
+    jobs.log("Shopify CSV файл успішно збережено!")
+
+
+def _file_checkpoint(file, count: int, sync: bool) -> tuple[int, int]:
+    if file is None:
+        return 0, 0
+    file.flush()
+    if sync:
+        os.fsync(file.fileno())
+    return os.fstat(file.fileno()).st_size, count
+
+
+def _reopen_truncated(file_path: str, size: int):
+    """Відкриває існуючий файл для дописування, обрізавши його до size байтів."""
+    file = open(file_path, 'r+b')
+    file.truncate(size)
+    file.seek(0, os.SEEK_END)
+    return file
+
+
+class JsonStreamWriter:
+    """
+    Поступово дописує товари у JSON-масив (або NDJSON) у вказаній папці.
+    Після кожного товару файл залишається коректним JSON, тому збій посеред
+    запуску не втрачає вже оброблені товари. Вміст файлу збігається з save_json.
+    """
+
+    def __init__(self, folder: str, ndjson: bool = False):
+        self.folder = output_folder(folder)
+        self.ndjson = ndjson
+        self.file_path = os.path.join(self.folder, f"{folder}.ndjson" if ndjson else f"{folder}.json")
+        self.file = None
+        self.count = 0
+
+    @metrics.timed("save_json")
+    def write(self, item: dict) -> None:
+        if self.file is None:
+            os.makedirs(self.folder, exist_ok=True)
+            self.file = open(self.file_path, 'wb')
+        if self.ndjson:
+            self.file.write(json.dumps(item, ensure_ascii=False).encode('utf-8') + b"\n")
+        else:
+            body = json.dumps(item, ensure_ascii=False, indent=4).replace("\n", "\n    ")
+            if self.count:
+                # Замінюємо завершальне "\n]" попереднього запису на роздільник
+                self.file.seek(-2, os.SEEK_END)
+                self.file.write(b",\n    " + body.encode('utf-8') + b"\n]")
+            else:
+                self.file.write(b"[\n    " + body.encode('utf-8') + b"\n]")
+        self.file.flush()
+        self.count += 1
+
+    def checkpoint(self, sync: bool = False) -> tuple[int, int]:
+        """Повертає (розмір файлу, кількість товарів) для відновлення через resume."""
+        return _file_checkpoint(self.file, self.count, sync)
+
+    def resume(self, size: int, count: int) -> None:
+        """Продовжує файл попереднього запуску: обрізає його до size (відкидає недописаний хвіст)."""
+        if size:
+            self.file = _reopen_truncated(self.file_path, size)
+            self.count = count
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            jobs.log("JSON файл успішно збережено!")
+
+
+class CsvStreamWriter:
+    """
+    Поступово дописує товари у CSV файл (формат як у save_csv для списку товарів).
+    Файл залишається відкритим весь запуск, кожен рядок одразу записується на диск.
+    """
+
+    def __init__(self, folder: str):
+        self.folder = output_folder(folder)
+        self.file_path = os.path.join(self.folder, f"{folder}.csv")
+        self.file = None
+        self.writer = None
+        self.count = 0
+
+    @metrics.timed("save_csv")
+    def write(self, item: dict) -> None:
+        row = dict(item)
+        if isinstance(row.get("MainPhotoLinks"), list):
+            row["MainPhotoLinks"] = ",".join(row["MainPhotoLinks"])
+        if isinstance(row.get("ReviewsPhotoLinks"), list):
+            row["ReviewsPhotoLinks"] = ",".join(row["ReviewsPhotoLinks"])
+        if self.writer is None:
+            os.makedirs(self.folder, exist_ok=True)
+            self.file = open(self.file_path, 'w', newline='', encoding='utf-8')
+            self.writer = csv.DictWriter(self.file, fieldnames=["Handle"] + list(row.keys()))
+            self.writer.writeheader()
+        self.count += 1
+        self.writer.writerow({"Handle": self.count, **row})
+        self.file.flush()
+
+    def checkpoint(self, sync: bool = False) -> tuple[int, int]:
+        return _file_checkpoint(self.file, self.count, sync)
+
+    def resume(self, size: int, count: int) -> None:
+        if size:
+            self.file = io.TextIOWrapper(_reopen_truncated(self.file_path, size), newline='', encoding='utf-8')
+            with open(self.file_path, newline='', encoding='utf-8') as file:
+                fieldnames = next(csv.reader(file))
+            self.writer = csv.DictWriter(self.file, fieldnames=fieldnames)
+            self.count = count
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            jobs.log("CSV файл успішно збережено!")
+
+
+class ShopifyCsvStreamWriter:
+    """
+    Поступово дописує рядки Shopify (формат як у save_shopify_csv_list_items).
+    Усі рядки одного товару отримують однаковий Handle.
+    """
+
+    def __init__(self, folder: str):
+        self.folder = output_folder(folder)
+        self.file_path = os.path.join(self.folder, f"{folder}_shopify.csv")
+        self.file = None
+        self.writer = None
+        self.count = 0
+
+    @metrics.timed("save_shopify_csv")
+    def write(self, product_items: list[tuple | dict]) -> None:
+        if not product_items:
+            return
+        if self.writer is None:
+            os.makedirs(self.folder, exist_ok=True)
+            self.file = open(self.file_path, 'w', newline='', encoding='utf-8')
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(SHOPIFY_HEADER)
+        self.count += 1
+        handle = (self.count,)
+        self.writer.writerows(handle + _shopify_row_values(item) for item in product_items)
+        self.file.flush()
+
+    def checkpoint(self, sync: bool = False) -> tuple[int, int]:
+        return _file_checkpoint(self.file, self.count, sync)
+
+    def resume(self, size: int, count: int) -> None:
+        if size:
+            self.file = io.TextIOWrapper(_reopen_truncated(self.file_path, size), newline='', encoding='utf-8')
+            self.writer = csv.writer(self.file)
+            self.count = count
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            jobs.log("Shopify CSV файл успішно збережено!")
+
+
+class StreamExporter:
+    """
+    Записує JSON, CSV та Shopify CSV для списку товарів по мірі обробки,
+    не накопичуючи товари в пам'яті. Використовується як контекстний менеджер.
+    """
+
+    def __init__(self, folder: str, ndjson: bool = EXPORT_NDJSON, files: bool | None = None):
+        self.json_writer = JsonStreamWriter(folder, ndjson)
+        self.csv_writer = CsvStreamWriter(folder)
+        self.shopify_writer = ShopifyCsvStreamWriter(folder)
+        self.files = OUTPUT_FILES if files is None else files
+        self.skipped = 0
+
+    @property
+    def count(self) -> int:
+        return self.json_writer.count + self.skipped
+
+    def write(self, item_dict: dict, shopify_info: list[tuple | dict]) -> None:
+        if not self.files:
+            self.skipped += 1
+            return
+        self.json_writer.write(item_dict)
+        self.csv_writer.write(item_dict)
+        self.shopify_writer.write(shopify_info)
+
+    def checkpoint(self, sync: bool = False) -> dict:
+        """Стан усіх файлів після останнього записаного товару (для журналу завдання)."""
+        return {
+            "json": self.json_writer.checkpoint(sync),
+            "csv": self.csv_writer.checkpoint(sync),
+            "shopify": self.shopify_writer.checkpoint(sync),
+        }
 
+    def resume(self, checkpoint: dict | None) -> None:
+        """Продовжує файли попереднього запуску зі стану checkpoint (None — почати заново)."""
+        if not checkpoint:
+            return
+        self.json_writer.resume(*checkpoint["json"])
+        self.csv_writer.resume(*checkpoint["csv"])
+        self.shopify_writer.resume(*checkpoint["shopify"])
 
+    def close(self) -> None:
+        self.json_writer.close()
+        self.csv_writer.close()
+        self.shopify_writer.close()
 
+    def __enter__(self):
+        return self
 
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -1,257 +1,440 @@
-import io
+import os
+import shutil
+import socket
 import sys
 import threading
+import time
 from datetime import datetime
+from itertools import chain
+import data
+import jobs
+import metrics
+from catalog import record_item
+from metrics import Metrics
+from concurrency import DEFAULT_WORKERS
+from ingest import count_source_values, iter_item_ids_from_sources
+from journal import JOB_STATE_DIR, JobJournal
+from job_queue import JOB_QUEUE_POLL, JobQueue
+from pipeline import ITEM_STEPS, ItemTask, process_item, process_items
 from ali_parse import (
     headers,
-    parse_item,
-    parse_query,
+    iter_query_item_ids,
     get_query_from_url,
     get_item_id_from_url,
-    get_items_list_from_query,
 )
 from data import (
-    get_item_info,
-    get_shopify_one_item,
+    EXPORT_NDJSON,
+    StreamExporter,
+    output_folder,
     save_json,
     save_csv,
     save_shopify_csv_one_item,
-    save_shopify_csv_list_items,
 )
-from hosting import upload_photos
 
 def log_message(msg: str, log_callback=None):
     if log_callback:
         log_callback(msg)
     else:
-        print(msg)
+        jobs.log(msg)
 
-class LogRedirect(io.StringIO):
-    def __init__(self, log_callback=None):
-        super().__init__()
-        self.log_callback = log_callback
+def _sum_counter(job_metrics: Metrics, name: str) -> int:
+    """Сума лічильника name з усіма мітками."""
+    report = job_metrics.report()
+    return sum(value for key, value in report["counters"].items() if key.partition("{")[0] == name)
 
-    def write(self, text):
-        super().write(text)
-        text = text.strip()
-        if text and self.log_callback:
-            self.log_callback(text)
+def save_run_report(job_metrics: Metrics, folder: str | None, log_callback=None):
+    """Виводить у лог підсумок завдання та зберігає звіт запуску (JSON/Prometheus) у папку (якщо вона задана)."""
+    job_metrics.finish()
+    hits = _sum_counter(job_metrics, "api_cache_hits")
+    misses = _sum_counter(job_metrics, "api_cache_misses")
+    log_message(f"Кеш API: влучань {hits}, промахів {misses}.", log_callback)
+    log_message(
+        f"Запитів API: {_sum_counter(job_metrics, 'api_calls')}, повторів: {_sum_counter(job_metrics, 'api_retries')}, "
+        f"помилок: {_sum_counter(job_metrics, 'api_failures')}; завантажено фото: {job_metrics.get('photos_uploaded')}.",
+        log_callback)
+    hedges = _sum_counter(job_metrics, "api_hedges")
+    if hedges:
+        log_message(f"Дублюючих запитів (hedging): {hedges}, з них відповіли першими: "
+                    f"{_sum_counter(job_metrics, 'api_hedge_wins')}.", log_callback)
+    if not folder:
+        return
+    try:
+        path = job_metrics.save(output_folder(folder))
+        log_message(f"Звіт запуску збережено: {path}", log_callback)
+    except OSError as e:
+        log_message(f"Не вдалося зберегти звіт запуску: {e}", log_callback)
 
-def parse_single_product(link: str, log_callback=None, progress_callback=None):
-    total_steps = 9
-    current_step = 0
-    def update_progress_step():
-        nonlocal current_step
-        current_step += 1
-        if progress_callback:
-            progress_callback(int((current_step/total_steps)*100))
-    saved_stdout = sys.stdout
+def parse_single_product(link: str, log_callback=None, progress_callback=None) -> bool:
+    update_progress = _make_progress(ITEM_STEPS + 1, progress_callback)
+    job_metrics = Metrics("single")
+    metrics_token = metrics.activate(job_metrics)
     try:
-        sys.stdout = LogRedirect(log_callback)
         log_message("=== Парсинг одного товару ===", log_callback)
-        # 1. Отримання ID товару
         item_id = get_item_id_from_url(link)
         log_message(f"Отримано ID: {item_id}", log_callback)
-        update_progress_step()
-        # 2. Отримання даних
-        item_data = parse_item(headers, item_id)
-        if not item_data:
+        update_progress()
+        # Отримання даних, фото та рядків Shopify — етапи конвеєра товарів (pipeline.py)
+        task = process_item(item_id, log_callback, update_progress)
+        if task.error:
+            raise RuntimeError(task.error)
+        if not task.ok:
             log_message("Помилка отримання даних з сайту.", log_callback)
             if progress_callback:
                 progress_callback(0)
-            return
-        log_message("Дані успішно отримано.", log_callback)
-        update_progress_step()
-        # 3. Формування словника
-        item_dict = get_item_info(item_data)
-        log_message("Сформовано дані товару.", log_callback)
-        update_progress_step()
-        # 4. Збереження JSON
-        save_json(item_dict, item_id)
-        log_message("JSON файл збережено.", log_callback)
-        update_progress_step()
-        # 5. Збереження CSV
-        save_csv(item_dict.copy(), item_id)
-        log_message("CSV файл збережено.", log_callback)
-        update_progress_step()
-        # 6. Завантаження основних фото
-        main_photos_url = []
-        if item_dict["MainPhotoLinks"]:
-            main_photos_url = upload_photos(item_dict["MainPhotoLinks"], f"{item_id}/MainPhotos")
-            log_message(f"Завантажено основних фото: {len(main_photos_url)}.", log_callback)
-        update_progress_step()
-        # 7. Завантаження фото відгуків
-        if item_dict["ReviewsPhotoLinks"]:
-            upload_photos(item_dict["ReviewsPhotoLinks"], f"{item_id}/PhotoReview")
-            log_message("Фото відгуків завантажено.", log_callback)
-        update_progress_step()
-        # 8. Генерація даних для Shopify
-        shopify_info = get_shopify_one_item(item_dict, main_photos_url)
-        log_message("Shopify дані сформовано.", log_callback)
-        update_progress_step()
-        # 9. Збереження Shopify CSV
-        save_shopify_csv_one_item(shopify_info, item_id)
-        log_message("Shopify CSV файл збережено.", log_callback)
-        update_progress_step()
+            return False
+        # Збереження JSON, CSV, Shopify CSV та запис у каталог
+        if data.OUTPUT_FILES:
+            save_json(task.item_dict, item_id)
+            save_csv(task.item_dict.copy(), item_id)
+            save_shopify_csv_one_item(task.shopify_rows, item_id)
+            log_message("JSON, CSV та Shopify CSV файли збережено.", log_callback)
+        record_item(item_id, task.item_dict, task.shopify_rows)
+        update_progress()
+        save_run_report(job_metrics, item_id if data.OUTPUT_FILES else None, log_callback)
         log_message("=== Парсинг одного товару завершено успішно! ===", log_callback)
+        return True
     except Exception as e:
         log_message(f"Помилка при парсингу: {e}", log_callback)
         if progress_callback:
             progress_callback(0)
+        return False
     finally:
-        sys.stdout = saved_stdout
+        metrics.deactivate(metrics_token)
 
-def parse_multiple_links(links_str: str, log_callback=None, progress_callback=None):
-    saved_stdout = sys.stdout
-    product_list = []
-    shopify_products = []
-    try:
-        sys.stdout = LogRedirect(log_callback)
-        links_list = [lnk.strip() for lnk in links_str.split(",") if lnk.strip()]
-        if not links_list:
-            log_message("Список лінків порожній.", log_callback)
-            if progress_callback:
-                progress_callback(0)
+def _make_progress(total_steps: int, progress_callback=None):
+    """Повертає потокобезпечну функцію для збільшення прогресу на один крок."""
+    lock = threading.Lock()
+    current_step = 0
+    def update_progress():
+        nonlocal current_step
+        with lock:
+            current_step += 1
+            value = int((current_step/total_steps)*100)
+        if progress_callback:
+            progress_callback(value)
+    return update_progress
+
+def _export_items(folder: str, journal: JobJournal, tasks, update_progress, log_callback=None) -> int:
+    """
+    Останній етап конвеєра: записує оброблені товари у файли списку товарів і в каталог.
+    Після кожного товару в журнал записується стан файлів, тому після збою
+    відновлений запуск продовжує файли без дублікатів і недописаних рядків.
+    Журнал і файли синхронізуються з диском пакетно (JOURNAL_FSYNC_EVERY / JOURNAL_FSYNC_INTERVAL).
+    """
+    with StreamExporter(folder, journal.meta.get("ndjson", EXPORT_NDJSON),
+                        journal.meta.get("files", data.OUTPUT_FILES)) as exporter:
+        exporter.resume(journal.last_checkpoint)
+        try:
+            for task in tasks:
+                if task.error:
+                    log_message(f"Товар {task.index} ({task.item_id}) не оброблено: {task.error}", log_callback)
+                if not task.ok:
+                    journal.record(task.item_id, "failed", task.index)
+                    continue
+                # Рядок каталогу записується до позначки "exported": після збою між ними
+                # відновлений запуск повторить товар, і каталог просто оновить той самий рядок
+                record_item(task.item_id, task.item_dict, task.shopify_rows)
+                with metrics.timer("save"):
+                    exporter.write(task.item_dict, task.shopify_rows)
+                    # Перед fsync журналу на диск записуються й файли, на стан яких посилається checkpoint
+                    sync = journal.sync_due()
+                    journal.record(task.item_id, "exported", task.index, sync,
+                                   checkpoint=exporter.checkpoint(sync=sync))
+                update_progress()
+                log_message(f"Товар {task.index} оброблено успішно.", log_callback)
+        finally:
+            if journal.fsync:
+                exporter.checkpoint(sync=True)
+                journal.sync()
+    if exporter.files:
+        log_message(f"Агреговані файли успішно збережено (товарів: {exporter.count}).", log_callback)
+    else:
+        log_message(f"Товарів записано в каталог: {exporter.count}.", log_callback)
+    return exporter.count
+
+def _pending_tasks(item_ids, journal: JobJournal, update_progress, log_callback=None):
+    """ItemTask для товарів, які ще не збережено попередніми запусками завдання."""
+    for idx, item_id in enumerate(item_ids, start=1):
+        if not _skip_done_item(idx, item_id, journal, update_progress, log_callback):
+            yield ItemTask(item_id, idx)
+
+def _skip_done_item(idx: int, item_id: str, journal: JobJournal, update_progress, log_callback=None) -> bool:
+    """Пропускає товар, уже збережений попереднім запуском завдання."""
+    if not journal.is_done(idx):
+        return False
+    log_message(f"Товар {idx} ({item_id}) уже збережено, пропускаємо.", log_callback)
+    for _ in range(ITEM_STEPS):
+        update_progress()
+    return True
+
+def _open_journal(folder: str, resume: bool, meta: dict, log_callback=None) -> JobJournal:
+    """Починає журнал нового завдання або відтворює журнал завдання, що відновлюється."""
+    journal = JobJournal(output_folder(folder))
+    if resume:
+        journal.load()
+        log_message(f"Відновлення завдання {folder}: уже збережено товарів {journal.exported}.", log_callback)
+    else:
+        journal.start(meta)
+    return journal
+
+def _job_folder(name: str) -> str:
+    """
+    Створює папку нового завдання списку товарів і повертає її назву. Якщо таку папку вже створило
+    інше завдання (зокрема одночасне, у цьому чи іншому процесі), до назви додається номер,
+    тому два завдання ніколи не пишуть в один журнал і ті самі файли.
+    Без файлів результатів (OUTPUT_FILES=0) журнал завдання зберігається в JOB_STATE_DIR,
+    а не в новій папці результатів на кожен запуск.
+    """
+    base = name if data.OUTPUT_FILES else os.path.join(JOB_STATE_DIR, name)
+    folder, number = base, 1
+    while True:
+        try:
+            # Створення папки атомарне: лише одне завдання отримає кожну назву
+            os.makedirs(output_folder(folder))
+            return folder
+        except FileExistsError:
+            number += 1
+            folder = f"{base}_{number}"
+
+def _finish_job(folder: str, journal: JobJournal, job_metrics: Metrics, log_callback=None) -> None:
+    """
+    Зберігає звіт запуску в папку результатів. Журнал завдання без файлів результатів
+    після завершення більше не потрібен і видаляється разом із папкою стану.
+    """
+    if journal.meta.get("files", True):
+        save_run_report(job_metrics, folder, log_callback)
+        return
+    save_run_report(job_metrics, None, log_callback)
+    shutil.rmtree(output_folder(folder), ignore_errors=True)
+
+def _spool_stdin(folder: str) -> str:
+    """Зберігає stdin у папку завдання, щоб перерване завдання можна було відновити."""
+    path = os.path.join(output_folder(folder), "input.txt")
+    os.makedirs(output_folder(folder), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        for line in sys.stdin:
+            file.write(line)
+    return path
+
+def _spool_query_ids(journal: JobJournal, spooled_ids: list[str], live_ids, limit: int):
+    """
+    ID товарів завдання query: спершу збережені попередніми запусками (у тому самому порядку),
+    потім нові з пошуку — кожен записується в журнал завдання перед обробкою.
+    Повторний пошук може повернути товари в іншому порядку, тому вже збережені ID з нього пропускаються.
+    """
+    yield from spooled_ids
+    seen = set(spooled_ids)
+    remaining = limit - len(spooled_ids)
+    for item_id in live_ids:
+        if remaining <= 0:
             return
+        if item_id in seen:
+            continue
+        seen.add(item_id)
+        remaining -= 1
+        journal.spool_id(item_id)
+        yield item_id
+
+def parse_multiple_links(links_str: str, log_callback=None, progress_callback=None,
+                         workers: int = DEFAULT_WORKERS, resume_folder: str | None = None,
+                         sources: list[str] | None = None) -> bool:
+    """
+    Парсинг списку товарів: посилання через кому (links_str) та/або файли sources
+    з посиланнями чи ID (текст, CSV, NDJSON; "-" — stdin). Файли читаються потоково,
+    дублікати відкидаються до запитів до API (див. ingest.py).
+    """
+    job_metrics = Metrics("multiple")
+    metrics_token = metrics.activate(job_metrics)
+    try:
+        if resume_folder:
+            folder = resume_folder
+            journal = _open_journal(folder, True, {}, log_callback)
+            links_list = journal.meta.get("links", [])
+            sources = journal.meta.get("sources", [])
+        else:
+            links_list = [lnk.strip() for lnk in links_str.split(",") if lnk.strip()]
+            sources = list(sources or [])
+            if not links_list and not sources:
+                log_message("Список лінків порожній.", log_callback)
+                if progress_callback:
+                    progress_callback(0)
+                return False
+            folder = _job_folder(f"list_items_{datetime.now().strftime('%H_%M_%S')}")
+            sources = [_spool_stdin(folder) if source == "-" else os.path.abspath(source) for source in sources]
+            journal = _open_journal(folder, False, {"mode": "multiple", "links": links_list, "sources": sources,
+                                                    "ndjson": EXPORT_NDJSON, "files": data.OUTPUT_FILES},
+                                    log_callback)
         total_links = len(links_list)
-        log_message(f"Початок парсингу {total_links} товарів.", log_callback)
-        total_steps = total_links * 9
-        current_step = 0
-        def update_progress():
-            nonlocal current_step
-            current_step += 1
+        if sources:
+            log_message(f"Початок парсингу товарів із файлів: {', '.join(sources)}.", log_callback)
+            # Кількість рядків у файлах рахуємо лише для прогрес-бару
             if progress_callback:
-                progress_callback(int((current_step/total_steps)*100))
-        for idx, link in enumerate(links_list, start=1):
-            log_message(f"--- Товар {idx} з {total_links} ---", log_callback)
-            item_id = get_item_id_from_url(link)
-            log_message(f"ID товару: {item_id}", log_callback)
-            update_progress()
-            item_data = parse_item(headers, item_id)
-            if not item_data:
-                log_message(f"Не вдалося отримати дані для товару {item_id}.", log_callback)
-                update_progress()
-                continue
-            update_progress()
-            item_dict = get_item_info(item_data)
-            product_list.append(item_dict)
-            update_progress()
-            log_message(f"Дані товару {item_id} сформовано.", log_callback)
-            main_photos_url = []
-            if item_dict["MainPhotoLinks"]:
-                main_photos_url = upload_photos(item_dict["MainPhotoLinks"], f"{item_id}/MainPhotos")
-                log_message(f"Завантажено фото товару {item_id}: {len(main_photos_url)}.", log_callback)
-            update_progress()
-            if item_dict["ReviewsPhotoLinks"]:
-                upload_photos(item_dict["ReviewsPhotoLinks"], f"{item_id}/PhotoReview")
-            update_progress()
-            shopify_info = get_shopify_one_item(item_dict, main_photos_url)
-            shopify_products.append(shopify_info)
-            update_progress()
-            log_message(f"Товар {idx} оброблено успішно.", log_callback)
-            update_progress()
-        log_message("Збереження агрегованих файлів.", log_callback)
-        timestamp = datetime.now().strftime("%H_%M_%S")
-        save_json(product_list, f"list_items_{timestamp}")
-        save_csv(product_list.copy(), f"list_items_{timestamp}")
-        save_shopify_csv_list_items(shopify_products, f"list_items_{timestamp}")
-        log_message("Агреговані файли успішно збережено.", log_callback)
+                total_links += count_source_values(sources)
+        else:
+            log_message(f"Початок парсингу {total_links} товарів.", log_callback)
+        update_progress = _make_progress(max(1, total_links) * ITEM_STEPS, progress_callback)
+        items_ids = iter_item_ids_from_sources(sources, links_list)
+        with journal:
+            tasks = _pending_tasks(items_ids, journal, update_progress, log_callback)
+            count = _export_items(folder, journal,
+                                  process_items(tasks, workers, log_callback, update_progress, total_links),
+                                  update_progress, log_callback)
+        duplicates = job_metrics.get("ingest_duplicates")
+        invalid = job_metrics.get("ingest_invalid")
+        if duplicates or invalid:
+            log_message(f"Пропущено дублікатів: {duplicates}, некоректних посилань: {invalid}.", log_callback)
+        _finish_job(folder, journal, job_metrics, log_callback)
         if progress_callback:
             progress_callback(100)
+        return count > 0
     except Exception as e:
         log_message(f"Помилка при парсингу списку лінків: {e}", log_callback)
         if progress_callback:
             progress_callback(0)
+        return False
     finally:
-        sys.stdout = saved_stdout
+        metrics.deactivate(metrics_token)
 
-def parse_search_query(link: str, limit: int, log_callback=None, progress_callback=None):
-    saved_stdout = sys.stdout
-    product_list = []
-    shopify_products = []
+def parse_search_query(link: str, limit: int, log_callback=None, progress_callback=None,
+                       workers: int = DEFAULT_WORKERS, resume_folder: str | None = None) -> bool:
+    job_metrics = Metrics("query")
+    metrics_token = metrics.activate(job_metrics)
     try:
-        sys.stdout = LogRedirect(log_callback)
         log_message("=== Парсинг за пошуковим запитом ===", log_callback)
-        query = get_query_from_url(link)
-        if not query:
-            log_message("Не вдалося отримати query з посилання.", log_callback)
-            if progress_callback:
-                progress_callback(0)
-            return
+        if resume_folder:
+            folder = resume_folder
+            journal = _open_journal(folder, True, {}, log_callback)
+            query, limit = journal.meta["query"], journal.meta["limit"]
+            spooled_ids = journal.read_ids()
+        else:
+            query = get_query_from_url(link)
+            if not query:
+                log_message("Не вдалося отримати query з посилання.", log_callback)
+                if progress_callback:
+                    progress_callback(0)
+                return False
+            journal, spooled_ids = None, []
         log_message(f"Пошуковий запит: {query}", log_callback)
-        query_items = parse_query(headers, query)
-        if not query_items:
-            log_message("Не вдалося отримати дані з пошукового запиту.", log_callback)
-            if progress_callback:
-                progress_callback(0)
-            return
-        all_items_id = get_items_list_from_query(query_items)
-        if not all_items_id:
-            log_message("Немає товарів за даним запитом.", log_callback)
-            if progress_callback:
-                progress_callback(0)
-            return
-        items_id_list = all_items_id[:limit]
-        total_count = len(items_id_list)
-        log_message(f"Буде оброблено {total_count} товарів.", log_callback)
-        total_steps = total_count * 9
-        current_step = 0
-        def update_progress():
-            nonlocal current_step
-            current_step += 1
-            if progress_callback:
-                progress_callback(int((current_step/total_steps)*100))
-        for idx, item_id in enumerate(items_id_list, start=1):
-            log_message(f"--- Товар {idx} з {total_count}, ID: {item_id} ---", log_callback)
-            item_data = parse_item(headers, item_id)
-            if not item_data:
-                log_message(f"Не вдалося отримати дані для товару {item_id}.", log_callback)
-                update_progress()
-                continue
-            update_progress()
-            item_dict = get_item_info(item_data)
-            product_list.append(item_dict)
-            update_progress()
-            log_message(f"Дані товару {item_id} сформовано.", log_callback)
-            main_photos_url = []
-            if item_dict["MainPhotoLinks"]:
-                main_photos_url = upload_photos(item_dict["MainPhotoLinks"], f"{item_id}/MainPhotos")
-                log_message(f"Завантажено фото товару {item_id}: {len(main_photos_url)}.", log_callback)
-            update_progress()
-            if item_dict["ReviewsPhotoLinks"]:
-                upload_photos(item_dict["ReviewsPhotoLinks"], f"{item_id}/PhotoReview")
-            update_progress()
-            shopify_info = get_shopify_one_item(item_dict, main_photos_url)
-            shopify_products.append(shopify_info)
-            update_progress()
-            log_message(f"Товар {idx} оброблено успішно.", log_callback)
-            update_progress()
-        log_message("Збереження агрегованих файлів.", log_callback)
-        save_json(product_list, f"list_items_from_{query}")
-        save_csv(product_list.copy(), f"list_items_from_{query}")
-        save_shopify_csv_list_items(shopify_products, f"list_items_from_{query}")
-        log_message("Агреговані файли успішно збережено.", log_callback)
+        # Пошук ліниво: після відновлення він потрібен, лише якщо збережених ID менше за limit
+        items_ids = iter_query_item_ids(headers, query, limit + len(spooled_ids))
+        if journal is None:
+            first_id = next(items_ids, None)
+            if first_id is None:
+                log_message("Не вдалося отримати товари за пошуковим запитом.", log_callback)
+                if progress_callback:
+                    progress_callback(0)
+                return False
+            folder = _job_folder(f"list_items_from_{query}")
+            journal = _open_journal(folder, False, {"mode": "query", "query": query, "limit": limit,
+                                                    "ndjson": EXPORT_NDJSON, "files": data.OUTPUT_FILES},
+                                    log_callback)
+            items_ids = chain([first_id], items_ids)
+        log_message(f"Буде оброблено до {limit} товарів.", log_callback)
+        update_progress = _make_progress(limit * ITEM_STEPS, progress_callback)
+        items_ids = _spool_query_ids(journal, spooled_ids, items_ids, limit)
+        with journal:
+            tasks = _pending_tasks(items_ids, journal, update_progress, log_callback)
+            count = _export_items(folder, journal,
+                                  process_items(tasks, workers, log_callback, update_progress),
+                                  update_progress, log_callback)
+        _finish_job(folder, journal, job_metrics, log_callback)
         if progress_callback:
             progress_callback(100)
+        return count > 0
     except Exception as e:
         log_message(f"Помилка при парсингу за пошуковим запитом: {e}", log_callback)
         if progress_callback:
             progress_callback(0)
+        return False
     finally:
-        sys.stdout = saved_stdout
+        metrics.deactivate(metrics_token)
 
 
+def run_queue_worker(queue_name: str = "default", log_callback=None, workers: int = DEFAULT_WORKERS,
+                     max_items: int = 0, wait: bool = False, job_queue: JobQueue | None = None) -> bool:
+    """
+    Воркер черги: бере ID товарів із job_queue, обробляє їх (parse_item → get_item_info →
+    upload_photos → Shopify) і записує результати у власну папку queue_<черга>_<воркер>_<час>.
+    Кілька таких процесів можуть працювати одночасно з однією чергою.
+    max_items — обробити не більше стількох товарів (0 — до спорожніння черги);
+    wait — не завершуватися на порожній черзі, а чекати нових задач.
+    """
+    job_metrics = Metrics("worker")
+    metrics_token = metrics.activate(job_metrics)
+    job_queue = job_queue or JobQueue()
+    owner = f"{socket.gethostname()}-{os.getpid()}"
+    stop_heartbeat = threading.Event()
+    def heartbeat():
+        while not stop_heartbeat.wait(job_queue.lease / 3):
+            job_queue.extend_leases(owner)
+    heartbeat_thread = threading.Thread(target=heartbeat, daemon=True)
+    try:
+        log_message(f"=== Воркер {owner}, черга {queue_name}: {job_queue.stats(queue_name)} ===", log_callback)
+        heartbeat_thread.start()
+        def claimed_tasks():
+            taken = 0
+            while not max_items or taken < max_items:
+                limit = min(workers, max_items - taken) if max_items else workers
+                tasks = job_queue.claim(owner, limit, queue_name)
+                if not tasks:
+                    if not wait:
+                        return
+                    time.sleep(JOB_QUEUE_POLL)
+                    continue
+                taken += len(tasks)
+                for task_id, item_id in tasks:
+                    yield ItemTask(item_id, ref=task_id)
+        folder = f"queue_{queue_name}_{owner}_{datetime.now().strftime('%H_%M_%S')}"
+        failed = 0
+        with StreamExporter(folder) as exporter:
+            # Порядок товарів черги не важливий: результати записуються в міру готовності
+            for task in process_items(claimed_tasks(), workers, log_callback, ordered=False):
+                if task.ok:
+                    # Задача позначається виконаною лише після запису в каталог і у файли
+                    record_item(task.item_id, task.item_dict, task.shopify_rows)
+                    exporter.write(task.item_dict, task.shopify_rows)
+                    job_queue.complete(task.ref, owner)
+                else:
+                    failed += 1
+                    job_queue.fail(task.ref, owner, task.error or "не вдалося отримати дані товару")
+                    log_message(f"Товар {task.item_id} не оброблено: {task.error or 'немає даних'}", log_callback)
+        log_message(f"Воркер {owner}: збережено товарів {exporter.count}, помилок {failed}.", log_callback)
+        save_run_report(job_metrics, folder if exporter.count and exporter.files else None, log_callback)
+        log_message(f"Стан черги {queue_name}: {job_queue.stats(queue_name)}", log_callback)
+        return failed == 0
+    except Exception as e:
+        log_message(f"Помилка воркера черги: {e}", log_callback)
+        return False
+    finally:
+        stop_heartbeat.set()
+        # Задачі, які воркер узяв, але не завершив, одразу повертаються в чергу
+        job_queue.release(owner)
+        metrics.deactivate(metrics_token)
+
 def start_parsing(mode: str, link_or_links: str, limit: int = 0,
-                  log_callback=None, progress_callback=None):
+                  log_callback=None, progress_callback=None, workers: int = DEFAULT_WORKERS,
+                  resume_folder: str | None = None, sources: list[str] | None = None) -> bool:
+    """
+    Запускає парсинг у вибраному режимі; повертає True, якщо результат збережено.
+    resume_folder — папка незавершеного завдання (query/multiple), яке треба продовжити;
+    sources — файли зі списком товарів для режиму multiple.
+    Поза JobManager створює завдання для цього виклику, щоб повідомлення модулів
+    (ali_parse, hosting, data) теж потрапляли в log_callback, а не в stdout.
+    """
+    if jobs.current() is None:
+        job = jobs.Job(0, mode, log_callback, progress_callback)
+        with jobs.use(job):
+            try:
+                return start_parsing(mode, link_or_links, limit, log_callback, progress_callback, workers,
+                                     resume_folder, sources)
+            finally:
+                job.close()
     if mode == "single":
-        parse_single_product(link_or_links, log_callback, progress_callback)
+        return parse_single_product(link_or_links, log_callback, progress_callback)
     elif mode == "query":
-        parse_search_query(link_or_links, limit, log_callback, progress_callback)
+        return parse_search_query(link_or_links, limit, log_callback, progress_callback, workers, resume_folder)
     elif mode == "multiple":
-        parse_multiple_links(link_or_links, log_callback, progress_callback)
-    else:
-        log_message(f"Невідомий режим парсингу: {mode}", log_callback)
-
-def run_in_thread(target, *args, **kwargs):
-    th = threading.Thread(target=target, args=args, kwargs=kwargs, daemon=True)
-    th.start()
+        return parse_multiple_links(link_or_links, log_callback, progress_callback, workers, resume_folder,
+                                    sources)
+    log_message(f"Невідомий режим парсингу: {mode}", log_callback)
+    return False
@@ -1,35 +1,187 @@
+import hashlib
+import io
 import os
+import threading
 
-import cloudinary
-import cloudinary.uploader
-
+import jobs
+import metrics
+from concurrency import ordered_map
+from photo_index import index as photo_index, make_public_id
 from dotenv import load_dotenv
 
 # Налаштування Cloudinary
 # https://console.cloudinary.com/settings/c-6f5534e46e74f613fa802f99963078/api-keys
 load_dotenv()
 
+_cloudinary = None
+_cloudinary_lock = threading.Lock()
 
-cloudinary.config(
-    cloud_name=os.getenv("CLOUD_NAME"),
-    api_key=os.getenv("API_KEY"),
-    api_secret=os.getenv("API_SECRET"),
-    secure=True
-)
 
-def upload_photos(photo_links: list, folder_name: str) -> list[str]:
+def get_cloudinary():
     """
-    Завантажує фото на хостинг та повертає список посилань на завантажені фото.
+    Імпортує та налаштовує SDK Cloudinary під час першого використання,
+    щоб імпорт модуля (наприклад, з CLI) не завантажував SDK без потреби.
     """
-    photos_url = []
-    for photo_link in photo_links:
-        if not photo_link:
-            continue
+    global _cloudinary
+    if _cloudinary is None:
+        with _cloudinary_lock:
+            if _cloudinary is None:
+                import cloudinary
+                import cloudinary.api
+                import cloudinary.uploader
+                cloudinary.config(
+                    cloud_name=os.getenv("CLOUD_NAME"),
+                    api_key=os.getenv("API_KEY"),
+                    api_secret=os.getenv("API_SECRET"),
+                    secure=True,
+                    # Інша адреса Upload API (для навантажувальних тестів — benchmarks/fake_api.py)
+                    upload_prefix=os.getenv("CLOUDINARY_UPLOAD_PREFIX") or None,
+                )
+                _cloudinary = cloudinary
+    return _cloudinary
+
+
+def cloudinary_upload(source, **options) -> dict:
+    """Завантажує фото (посилання, файл або байти) у Cloudinary."""
+    return get_cloudinary().uploader.upload(source, **options)
+
+
+def cloudinary_resources(**params) -> dict:
+    """Повертає сторінку списку ресурсів Cloudinary (Admin API)."""
+    return get_cloudinary().api.resources(**params)
+
+# Кількість фото одного товару, що завантажуються одночасно
+UPLOAD_WORKERS = max(1, int(os.getenv("UPLOAD_WORKERS", "8")))
+# Індекс уже завантажених фото (повторно не завантажуються)
+PHOTO_INDEX_ENABLED = os.getenv("PHOTO_INDEX_ENABLED", "1") == "1"
+# Додатково порівнювати вміст фото (MD5) перед завантаженням — потребує завантаження фото з AliExpress
+PHOTO_INDEX_HASH_CONTENT = os.getenv("PHOTO_INDEX_HASH_CONTENT", "0") == "1"
+# Перед першим завантаженням за запуск один раз звірити індекс зі списком фото у Cloudinary
+PHOTO_INDEX_RECONCILE = os.getenv("PHOTO_INDEX_RECONCILE", "0") == "1"
+# Префікс public_id для звірки ("" — усі фото облікового запису; папки товарів — "<item_id>/...")
+PHOTO_INDEX_RECONCILE_PREFIX = os.getenv("PHOTO_INDEX_RECONCILE_PREFIX", "")
+
+_reconciled = False
+_reconcile_lock = threading.Lock()
+
+
+def reconcile(prefix: str = PHOTO_INDEX_RECONCILE_PREFIX) -> int:
+    """
+    Одним проходом отримує список фото у Cloudinary з public_id, що починається з prefix
+    ("" — усі фото), сторінками по 500 (Admin API), і додає їх до індексу.
+    Повертає кількість знайдених фото.
+    """
+    count = 0
+    next_cursor = None
+    while True:
+        params = {"type": "upload", "max_results": 500}
+        if prefix:
+            params["prefix"] = prefix
+        if next_cursor:
+            params["next_cursor"] = next_cursor
+        response = cloudinary_resources(**params)
+        resources = response.get("resources", [])
+        # Кожна сторінка записується одразу, щоб список усього облікового запису не тримати в пам'яті
+        photo_index.add_hosted_many(resources)
+        count += len(resources)
+        next_cursor = response.get("next_cursor")
+        if not next_cursor:
+            return count
+
+
+def _reconcile_once() -> None:
+    """
+    Звіряє індекс з Cloudinary не більше одного разу за запуск програми: один прохід
+    за спільним префіксом замість окремого запиту Admin API для папки кожного товару.
+    """
+    global _reconciled
+    with _reconcile_lock:
+        if _reconciled:
+            return
+        _reconciled = True
         try:
-            response = cloudinary.uploader.upload(photo_link, folder=folder_name)
-            secure_url = response.get("secure_url")
+            count = reconcile()
+            jobs.log(f"Індекс фото звірено з Cloudinary: {count} фото.")
+        except Exception as e:
+            jobs.log(f"Не вдалося звірити індекс фото з Cloudinary: {e}")
+
+def _download_photo(photo_link: str) -> bytes:
+    """Завантажує вміст фото за посиланням."""
+    import requests
+    response = requests.get(photo_link, timeout=20)
+    response.raise_for_status()
+    return response.content
+
+
+def _upload_photo(photo_link: str, folder_name: str) -> tuple[str | None, str | None]:
+    """
+    Завантажує одне фото. Повертає (secure_url, None) або (None, текст помилки).
+    Якщо фото з цього посилання (або з таким самим вмістом) вже є в індексі,
+    повертає наявне посилання без завантаження.
+    """
+    jobs.check_cancelled()
+    name = make_public_id(photo_link)
+    public_id = f"{folder_name}/{name}"
+    source = photo_link
+    try:
+        if PHOTO_INDEX_ENABLED:
+            secure_url = photo_index.find_by_source(photo_link) or photo_index.find_by_public_id(public_id)
             if secure_url:
-                photos_url.append(secure_url)
-        except Exception:
-            continue
+                metrics.incr("photos_reused")
+                return secure_url, None
+            if PHOTO_INDEX_HASH_CONTENT:
+                content = jobs.call_cancellable(_download_photo, photo_link)
+                known = photo_index.find_by_etag(hashlib.md5(content).hexdigest())
+                if known:
+                    photo_index.add_source(photo_link, known[0])
+                    metrics.incr("photos_reused")
+                    return known[1], None
+                source = io.BytesIO(content)
+        response = jobs.call_cancellable(cloudinary_upload, source, folder=folder_name, public_id=name,
+                                         overwrite=False, unique_filename=False)
+    except jobs.JobCancelled:
+        raise
+    except Exception as e:
+        return None, str(e) or type(e).__name__
+    secure_url = response.get("secure_url")
+    if not secure_url:
+        return None, "Cloudinary не повернув secure_url"
+    metrics.incr("photos_uploaded")
+    metrics.incr("bytes_uploaded", int(response.get("bytes") or 0))
+    if PHOTO_INDEX_ENABLED:
+        photo_index.add_hosted(response.get("public_id") or public_id, secure_url,
+                               response.get("etag"), photo_link)
+    return secure_url, None
+
+
+def upload_photos_report(photo_links: list, folder_name: str,
+                         workers: int = UPLOAD_WORKERS) -> tuple[list[str], list[tuple[str, str]]]:
+    """
+    Завантажує фото на хостинг (до workers одночасно).
+    Повертає список посилань у порядку вхідного списку та список невдалих фото (посилання, помилка).
+    """
+    links = [photo_link for photo_link in photo_links if photo_link]
+    if PHOTO_INDEX_ENABLED and PHOTO_INDEX_RECONCILE and links:
+        _reconcile_once()
+    photos_url = []
+    failures = []
+    results = ordered_map(lambda photo_link: _upload_photo(photo_link, folder_name), links, workers)
+    for photo_link, (secure_url, error) in zip(links, results):
+        if secure_url:
+            photos_url.append(secure_url)
+        else:
+            failures.append((photo_link, error))
+    if failures:
+        metrics.incr("upload_failures", len(failures))
+    return photos_url, failures
+
+
+def upload_photos(photo_links: list, folder_name: str, workers: int = UPLOAD_WORKERS) -> list[str]:
+    """
+    Завантажує фото на хостинг та повертає список посилань на завантажені фото.
+    Порядок посилань відповідає порядку photo_links (перше фото — головне).
+    """
+    photos_url, failures = upload_photos_report(photo_links, folder_name, workers)
+    for photo_link, error in failures:
+        jobs.log(f"Не вдалося завантажити фото {photo_link} у {folder_name}: {error}")
     return photos_url
@@ -0,0 +1,185 @@
+import csv
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import sys
+import tempfile
+from itertools import chain
+from typing import Iterable, Iterator
+
+import metrics
+from ali_parse import get_item_id_from_url
+
+from dotenv import load_dotenv
+load_dotenv()
+
+# disk — точна множина у тимчасовому файлі SQLite (за замовчуванням),
+# bloom — фільтр Блума без файлів (фіксований обсяг пам'яті, ймовірність хибного збігу INGEST_BLOOM_ERROR)
+INGEST_DEDUP = os.getenv("INGEST_DEDUP", "disk")
+INGEST_EXPECTED_ITEMS = int(os.getenv("INGEST_EXPECTED_ITEMS", "10000000"))
+INGEST_BLOOM_ERROR = float(os.getenv("INGEST_BLOOM_ERROR", "0.0001"))
+
+# Поля CSV / NDJSON, з яких береться посилання або ID товару (у порядку пріоритету)
+ID_FIELDS = ("item_id", "itemId", "ItemId", "id", "url", "link", "Link")
+
+
+class BloomFilter:
+    """Фільтр Блума: пам'ять не залежить від кількості ID, можливі рідкісні хибні «дублікати»."""
+
+    def __init__(self, capacity: int = INGEST_EXPECTED_ITEMS, error_rate: float = INGEST_BLOOM_ERROR):
+        capacity = max(1, capacity)
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def add(self, value: str) -> bool:
+        """Додає значення; повертає True, якщо його ще не було."""
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        bits = self.bits
+        is_new = False
+        for i in range(self.hash_count):
+            position = (first + i * second) % self.size
+            mask = 1 << (position & 7)
+            if not bits[position >> 3] & mask:
+                bits[position >> 3] |= mask
+                is_new = True
+        return is_new
+
+    def close(self) -> None:
+        pass
+
+
+class DiskSet:
+    """Точна множина ID у тимчасовому файлі SQLite (пам'ять не зростає, файл видаляється в close)."""
+
+    COMMIT_EVERY = 10000
+
+    def __init__(self, folder: str | None = None):
+        handle, self.path = tempfile.mkstemp(prefix="ingest_", suffix=".sqlite3", dir=folder)
+        os.close(handle)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode=OFF")
+        self.conn.execute("PRAGMA synchronous=OFF")
+        self.conn.execute("CREATE TABLE seen (id TEXT PRIMARY KEY) WITHOUT ROWID")
+        self.pending = 0
+
+    def add(self, value: str) -> bool:
+        cursor = self.conn.execute("INSERT OR IGNORE INTO seen (id) VALUES (?)", (value,))
+        self.pending += 1
+        if self.pending >= self.COMMIT_EVERY:
+            self.conn.commit()
+            self.pending = 0
+        return cursor.rowcount == 1
+
+    def close(self) -> None:
+        self.conn.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def make_dedup_filter(mode: str = INGEST_DEDUP) -> BloomFilter | DiskSet:
+    """Створює фільтр дублікатів: bloom або disk."""
+    if mode == "disk":
+        return DiskSet()
+    if mode == "bloom":
+        return BloomFilter()
+    raise ValueError(f"Невідомий режим дедуплікації: {mode}")
+
+
+def _value_from_record(record) -> str:
+    if isinstance(record, dict):
+        for field in ID_FIELDS:
+            if record.get(field):
+                return str(record[field])
+        return ""
+    return str(record)
+
+
+def _iter_file(file, file_format: str) -> Iterator[str]:
+    if file_format == "ndjson":
+        for line in file:
+            line = line.strip()
+            if line:
+                try:
+                    yield _value_from_record(json.loads(line))
+                except ValueError:
+                    metrics.incr("ingest_invalid")
+    elif file_format == "csv":
+        reader = csv.reader(file)
+        header = next(reader, None)
+        if header is None:
+            return
+        column = next((header.index(field) for field in ID_FIELDS if field in header), None)
+        if column is None:
+            # Файл без заголовка: перший рядок — теж дані
+            column = 0
+            yield header[0] if header else ""
+        for row in reader:
+            if len(row) > column:
+                yield row[column]
+    else:
+        for line in file:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield from line.split(",")
+
+
+def iter_source_values(source: str) -> Iterator[str]:
+    """
+    Лінива послідовність посилань / ID з файлу (або stdin для "-").
+    Формат визначається за розширенням: .csv, .ndjson / .jsonl, інакше — текст
+    (по одному значенню на рядок або через кому, рядки з # пропускаються).
+    """
+    extension = os.path.splitext(source)[1].lower()
+    file_format = "csv" if extension == ".csv" else "ndjson" if extension in (".ndjson", ".jsonl") else "text"
+    if source == "-":
+        yield from _iter_file(sys.stdin, file_format)
+        return
+    with open(source, encoding="utf-8", newline="") as file:
+        yield from _iter_file(file, file_format)
+
+
+def iter_item_ids(values: Iterable[str], dedup=None) -> Iterator[str]:
+    """
+    Перетворює посилання / ID на ID товарів через get_item_id_from_url,
+    пропускаючи некоректні значення та дублікати (ще до будь-якого запиту до API).
+    """
+    own_filter = dedup is None
+    dedup = make_dedup_filter() if own_filter else dedup
+    try:
+        for value in values:
+            item_id = get_item_id_from_url(value.strip())
+            if not item_id.isdigit():
+                if value.strip():
+                    metrics.incr("ingest_invalid")
+                continue
+            if not dedup.add(item_id):
+                metrics.incr("ingest_duplicates")
+                continue
+            yield item_id
+    finally:
+        if own_filter:
+            dedup.close()
+
+
+def iter_item_ids_from_sources(sources: list[str], links: Iterable[str] = (), dedup=None) -> Iterator[str]:
+    """Унікальні ID товарів із переданих посилань, а потім з усіх файлів sources."""
+    values = chain(links, chain.from_iterable(iter_source_values(source) for source in sources))
+    return iter_item_ids(values, dedup)
+
+
+def count_source_values(sources: list[str]) -> int:
+    """Кількість непорожніх рядків у файлах (верхня межа кількості товарів, для прогресу)."""
+    total = 0
+    for source in sources:
+        if source == "-":
+            continue
+        with open(source, "rb") as file:
+            total += sum(1 for line in file if line.strip())
+    return total
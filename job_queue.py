@@ -0,0 +1,152 @@
+import os
+import sqlite3
+import threading
+import time
+from itertools import islice
+from typing import Iterable
+
+from dotenv import load_dotenv
+load_dotenv()
+
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", ".job_queue.sqlite3")
+# Скільки секунд задача належить воркеру без продовження оренди (після цього її забирає інший воркер)
+JOB_QUEUE_LEASE = float(os.getenv("JOB_QUEUE_LEASE", "300"))
+# Скільки разів задачу можна взяти в роботу, перш ніж вона стане failed
+JOB_QUEUE_MAX_ATTEMPTS = int(os.getenv("JOB_QUEUE_MAX_ATTEMPTS", "3"))
+# WAL не працює на мережевих файлових системах: для спільної папки між машинами встановіть 0
+JOB_QUEUE_WAL = os.getenv("JOB_QUEUE_WAL", "1") == "1"
+# Пауза (секунди) між перевірками порожньої черги для воркера в режимі очікування
+JOB_QUEUE_POLL = float(os.getenv("JOB_QUEUE_POLL", "5"))
+
+ENQUEUE_BATCH = 5000
+STATUSES = ("pending", "leased", "done", "failed")
+
+
+class JobQueue:
+    """
+    Постійна черга ID товарів у SQLite з орендою задач (claim/lease).
+    Кілька процесів (або машин зі спільною папкою) можуть одночасно забирати задачі:
+    взяття задачі атомарне, а задача воркера, що завершився аварійно, повертається
+    в роботу після закінчення оренди. Кожен процес відкриває власне з'єднання.
+    """
+
+    def __init__(self, path: str = JOB_QUEUE_PATH, lease: float = JOB_QUEUE_LEASE,
+                 max_attempts: int = JOB_QUEUE_MAX_ATTEMPTS):
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        if JOB_QUEUE_WAL:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            "id INTEGER PRIMARY KEY, queue TEXT NOT NULL, item_id TEXT NOT NULL, "
+            "status TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0, "
+            "owner TEXT, lease_until REAL NOT NULL DEFAULT 0, error TEXT, updated REAL NOT NULL, "
+            "UNIQUE (queue, item_id))"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_claim ON tasks(queue, status, lease_until)")
+
+    def enqueue(self, item_ids: Iterable[str], queue: str = "default") -> int:
+        """Додає ID товарів у чергу (вже наявні пропускаються); повертає кількість доданих."""
+        added = 0
+        item_ids = iter(item_ids)
+        while True:
+            now = time.time()
+            batch = [(queue, item_id, now) for item_id in islice(item_ids, ENQUEUE_BATCH)]
+            if not batch:
+                return added
+            with self.lock:
+                self.conn.execute("BEGIN IMMEDIATE")
+                try:
+                    before = self.conn.total_changes
+                    self.conn.executemany(
+                        "INSERT OR IGNORE INTO tasks (queue, item_id, updated) VALUES (?, ?, ?)", batch)
+                    added += self.conn.total_changes - before
+                    self.conn.execute("COMMIT")
+                except BaseException:
+                    self.conn.execute("ROLLBACK")
+                    raise
+
+    def claim(self, owner: str, limit: int = 1, queue: str = "default") -> list[tuple[int, str]]:
+        """
+        Атомарно бере в оренду до limit задач: нові або ті, чия оренда закінчилася.
+        Повертає список (task_id, item_id).
+        """
+        now = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Прострочені задачі, що вичерпали спроби, більше не видаються
+                self.conn.execute(
+                    "UPDATE tasks SET status = 'failed', owner = NULL, error = COALESCE(error, 'lease expired'), "
+                    "updated = ? WHERE queue = ? AND status = 'leased' AND lease_until < ? AND attempts >= ?",
+                    (now, queue, now, self.max_attempts))
+                rows = self.conn.execute(
+                    "SELECT id, item_id FROM tasks WHERE queue = ? AND "
+                    "(status = 'pending' OR (status = 'leased' AND lease_until < ?)) "
+                    "ORDER BY id LIMIT ?", (queue, now, limit)).fetchall()
+                self.conn.executemany(
+                    "UPDATE tasks SET status = 'leased', owner = ?, lease_until = ?, attempts = attempts + 1, "
+                    "updated = ? WHERE id = ?", [(owner, now + self.lease, now, task_id) for task_id, _ in rows])
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        return rows
+
+    def extend_leases(self, owner: str) -> int:
+        """Продовжує оренду всіх задач воркера owner; повертає їх кількість."""
+        now = time.time()
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE tasks SET lease_until = ?, updated = ? WHERE status = 'leased' AND owner = ?",
+                (now + self.lease, now, owner))
+        return cursor.rowcount
+
+    def complete(self, task_id: int, owner: str) -> bool:
+        """Позначає задачу виконаною; False, якщо оренду вже забрав інший воркер."""
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE tasks SET status = 'done', owner = NULL, error = NULL, updated = ? "
+                "WHERE id = ? AND owner = ? AND status = 'leased'", (time.time(), task_id, owner))
+        return cursor.rowcount == 1
+
+    def fail(self, task_id: int, owner: str, error: str) -> None:
+        """Повертає задачу в чергу для повтору або позначає failed, якщо спроби вичерпано."""
+        with self.lock:
+            self.conn.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "owner = NULL, lease_until = 0, error = ?, updated = ? "
+                "WHERE id = ? AND owner = ? AND status = 'leased'",
+                (self.max_attempts, error, time.time(), task_id, owner))
+
+    def release(self, owner: str) -> None:
+        """Повертає в чергу незавершені задачі воркера (під час штатної зупинки), не витрачаючи спробу."""
+        with self.lock:
+            self.conn.execute(
+                "UPDATE tasks SET status = 'pending', owner = NULL, lease_until = 0, "
+                "attempts = MAX(attempts - 1, 0), updated = ? WHERE status = 'leased' AND owner = ?",
+                (time.time(), owner))
+
+    def retry_failed(self, queue: str = "default") -> int:
+        """Повертає всі failed задачі черги в роботу з новим лічильником спроб."""
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE tasks SET status = 'pending', attempts = 0, error = NULL, updated = ? "
+                "WHERE queue = ? AND status = 'failed'", (time.time(), queue))
+        return cursor.rowcount
+
+    def stats(self, queue: str = "default") -> dict:
+        """Кількість задач черги за статусами."""
+        counts = dict.fromkeys(STATUSES, 0)
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT status, COUNT(*) FROM tasks WHERE queue = ? GROUP BY status", (queue,)).fetchall()
+        for status, count in rows:
+            counts[status] = count
+        return counts
+
+    def close(self) -> None:
+        self.conn.close()
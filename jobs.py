@@ -0,0 +1,257 @@
+import os
+import sys
+import threading
+import time
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable
+
+from concurrency import submit_in_context
+
+from dotenv import load_dotenv
+load_dotenv()
+
+# Скільки завдань парсингу менеджер виконує одночасно (інші чекають у черзі)
+JOBS_MAX_CONCURRENT = max(1, int(os.getenv("JOBS_MAX_CONCURRENT", "3")))
+# Потоки одного завдання для мережевих викликів, які можна перервати скасуванням
+# (0 — без обмеження: одночасних викликів стільки, скільки потоків завдання їх чекає)
+JOBS_IO_THREADS = max(0, int(os.getenv("JOBS_IO_THREADS", "0")))
+# Як часто (секунди) очікування мережевого виклику перевіряє скасування
+CANCEL_POLL_INTERVAL = 0.1
+
+
+class JobCancelled(Exception):
+    """Завдання скасовано користувачем або вичерпано його час (deadline)."""
+
+
+class Job:
+    """
+    Одне завдання парсингу: власний лог, прогрес, скасування та обмеження часу.
+    Код завдання (у всіх його потоках) бачить його через current().
+    Мережеві виклики call_cancellable виконуються у власному пулі завдання, тому виклики,
+    покинуті скасованим завданням, не займають потоків інших завдань; close() закриває пул.
+    """
+
+    def __init__(self, job_id: int, name: str, log_callback=None, progress_callback=None,
+                 deadline: float | None = None):
+        self.job_id = job_id
+        self.name = name
+        self.log_callback = log_callback
+        self.progress_callback = progress_callback
+        self.deadline = time.monotonic() + deadline if deadline else None
+        self.cancel_event = threading.Event()
+        self.status = "queued"
+        self.result = None
+        self.progress_value = 0
+        self.future = None
+        self.io_lock = threading.Lock()
+        self.io_pool = None
+        self.io_closed = False
+
+    def log(self, message: str) -> None:
+        if self.log_callback:
+            self.log_callback(message)
+        else:
+            print(message)
+
+    def progress(self, value: int) -> None:
+        self.progress_value = value
+        if self.progress_callback:
+            self.progress_callback(value)
+
+    def cancel(self) -> None:
+        """Просить завдання зупинитися: очікування мережі та нові етапи перериваються."""
+        self.cancel_event.set()
+
+    def remaining(self) -> float | None:
+        """Секунди до deadline (None — без обмеження)."""
+        return None if self.deadline is None else self.deadline - time.monotonic()
+
+    def is_cancelled(self) -> bool:
+        return self.cancel_event.is_set() or (self.deadline is not None and time.monotonic() >= self.deadline)
+
+    def check(self) -> None:
+        """Кидає JobCancelled, якщо завдання скасовано або його час вичерпано."""
+        if self.cancel_event.is_set():
+            raise JobCancelled("Завдання скасовано")
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise JobCancelled("Час завдання вичерпано")
+
+    def io_executor(self) -> ThreadPoolExecutor:
+        """Пул завдання для мережевих викликів (потоки створюються лише тоді, коли потрібні)."""
+        with self.io_lock:
+            if self.io_closed:
+                # Потік етапу, що пережив завершення завдання, не створює нового пулу
+                raise JobCancelled("Завдання завершено")
+            if self.io_pool is None:
+                self.io_pool = ThreadPoolExecutor(max_workers=JOBS_IO_THREADS or sys.maxsize,
+                                                  thread_name_prefix=f"job{self.job_id}-io")
+            return self.io_pool
+
+    def close(self) -> None:
+        """
+        Закриває пул мережевих викликів завдання: виклики, що ще не почалися, скасовуються,
+        а покинуті після скасування завершуються у фоні (не довше за свій тайм-аут).
+        """
+        with self.io_lock:
+            pool, self.io_pool = self.io_pool, None
+            self.io_closed = True
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def sleep(self, seconds: float) -> None:
+        """Пауза, яку перериває скасування завдання."""
+        remaining = self.remaining()
+        if remaining is not None and seconds >= remaining:
+            self.cancel_event.wait(max(remaining, 0))
+            self.check()
+        if self.cancel_event.wait(seconds):
+            self.check()
+
+
+_current_job = ContextVar("current_job", default=None)
+
+
+def current() -> Job | None:
+    """Завдання, у контексті якого виконується код (None — поза завданням)."""
+    return _current_job.get()
+
+
+@contextmanager
+def use(job: Job):
+    """Робить job поточним завданням у межах блоку with (і в потоках, запущених через submit_in_context)."""
+    token = _current_job.set(job)
+    try:
+        yield job
+    finally:
+        _current_job.reset(token)
+
+
+def log(message: str) -> None:
+    """Пише повідомлення в лог поточного завдання (поза завданням — у stdout)."""
+    job = current()
+    if job is not None:
+        job.log(message)
+    else:
+        print(message)
+
+
+def check_cancelled() -> None:
+    job = current()
+    if job is not None:
+        job.check()
+
+
+def sleep(seconds: float) -> None:
+    """time.sleep, який перериває скасування поточного завдання."""
+    job = current()
+    if job is None:
+        time.sleep(seconds)
+    else:
+        job.sleep(seconds)
+
+
+def call_cancellable(func: Callable, *args, **kwargs):
+    """
+    Виконує блокуючий мережевий виклик так, щоб скасування завдання не чекало його завершення:
+    виклик іде в потоці пулу завдання (Job.io_executor), а поточний потік повертається
+    з JobCancelled одразу після скасування. Сам запит при цьому не переривається і завершується
+    у фоні в межах свого тайм-ауту. Поза завданням виконує func напряму.
+    """
+    job = current()
+    if job is None:
+        return func(*args, **kwargs)
+    job.check()
+    future = submit_in_context(job.io_executor(), func, *args, **kwargs)
+    while True:
+        try:
+            return future.result(timeout=CANCEL_POLL_INTERVAL)
+        except FutureTimeoutError:
+            if job.is_cancelled():
+                future.cancel()
+                job.check()
+
+
+class JobManager:
+    """
+    Запускає кілька завдань парсингу одночасно (не більше max_jobs, решта чекає).
+    Кожне завдання отримує власні log_callback / progress_callback і може бути скасоване.
+    Спільні для всіх завдань обробники log_callback(job, message) / progress_callback(job, value)
+    можна задати при створенні менеджера.
+    """
+
+    def __init__(self, max_jobs: int = JOBS_MAX_CONCURRENT, log_callback=None, progress_callback=None):
+        self.log_callback = log_callback
+        self.progress_callback = progress_callback
+        self.lock = threading.Lock()
+        self.jobs = {}
+        self.next_id = 1
+        self.executor = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix="job")
+
+    def submit(self, name: str, target: Callable, *args, deadline: float | None = None,
+               log_callback=None, progress_callback=None, on_done=None, **kwargs) -> Job:
+        """
+        Ставить target(*args, log_callback=..., progress_callback=..., **kwargs) у чергу завдань.
+        deadline — обмеження часу завдання в секундах; on_done(job) викликається після завершення.
+        """
+        with self.lock:
+            job = Job(self.next_id, name, log_callback, progress_callback, deadline)
+            if log_callback is None and self.log_callback:
+                job.log_callback = partial(self.log_callback, job)
+            if progress_callback is None and self.progress_callback:
+                job.progress_callback = partial(self.progress_callback, job)
+            self.jobs[job.job_id] = job
+            self.next_id += 1
+        job.future = self.executor.submit(self._run, job, target, args, kwargs, on_done)
+        return job
+
+    def _run(self, job: Job, target: Callable, args: tuple, kwargs: dict, on_done) -> None:
+        if job.is_cancelled():
+            job.status = "cancelled"
+        else:
+            job.status = "running"
+            with use(job):
+                try:
+                    job.result = target(*args, log_callback=job.log, progress_callback=job.progress, **kwargs)
+                    job.status = "done" if job.result is not False else "failed"
+                except JobCancelled as e:
+                    job.log(str(e))
+                    job.status = "cancelled"
+                except Exception as e:
+                    job.log(f"Помилка завдання: {e}")
+                    job.status = "failed"
+            if job.is_cancelled() and job.status != "done":
+                job.status = "cancelled"
+            job.close()
+        if on_done:
+            on_done(job)
+
+    def get(self, job_id: int) -> Job | None:
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def active(self) -> list[Job]:
+        with self.lock:
+            return [job for job in self.jobs.values() if job.status in ("queued", "running")]
+
+    def cancel(self, job_id: int) -> None:
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel()
+
+    def cancel_all(self) -> None:
+        for job in self.active():
+            job.cancel()
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Скасовує всі завдання й чекає до timeout секунд, поки вони зупиняться."""
+        self.cancel_all()
+        end = time.monotonic() + timeout
+        for job in list(self.jobs.values()):
+            if job.future is not None:
+                try:
+                    job.future.result(timeout=max(0.0, end - time.monotonic()))
+                except Exception:
+                    pass
@@ -0,0 +1,192 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from dotenv import load_dotenv
+load_dotenv()
+
+JOURNAL_FILE = "journal.jsonl"
+META_FILE = "job.json"
+# ID товарів, отримані пошуковим запитом (режим query): відновлення йде за цим списком, а не за новим пошуком
+IDS_FILE = "ids.txt"
+# fsync журналу (0 — швидше, але останні записи можуть зникнути при збої живлення)
+JOURNAL_FSYNC = os.getenv("JOURNAL_FSYNC", "1") == "1"
+# fsync виконується пакетно: не рідше ніж раз на стільки записів або секунд
+JOURNAL_FSYNC_EVERY = max(1, int(os.getenv("JOURNAL_FSYNC_EVERY", "100")))
+JOURNAL_FSYNC_INTERVAL = float(os.getenv("JOURNAL_FSYNC_INTERVAL", "1"))
+# Папка (всередині OUTPUT_DIR) для журналів завдань без файлів результатів (OUTPUT_FILES=0);
+# журнал завершеного завдання звідти видаляється
+JOB_STATE_DIR = os.getenv("JOB_STATE_DIR", ".jobs")
+
+
+def atomic_write_json(path: str, data) -> None:
+    """Записує JSON у тимчасовий файл і атомарно замінює ним path."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(data, file, ensure_ascii=False, indent=4)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+class JobJournal:
+    """
+    Журнал завдання у папці результатів: job.json (параметри завдання, записується атомарно)
+    та journal.jsonl (лише дописується): рядок "exported" зі станом файлів результатів після
+    кожного збереженого товару і рядок "failed" для товару, який не вдалося обробити.
+    Товари позначаються номером у вхідному списку (position), тому в пам'яті лише межа,
+    до якої всі товари завершено, і кілька завершених після неї — не множина всіх ID.
+    Після збою завдання продовжується з тим самим вхідним списком: збережені товари
+    пропускаються, невдалі обробляються ще раз, файли обрізаються до останнього стану з журналу.
+    Вхідний список, який не можна прочитати ще раз у тому самому порядку (результати пошуку),
+    дописується в ids.txt (spool_id) і під час відновлення читається звідти (read_ids).
+    """
+
+    def __init__(self, folder: str, fsync: bool = JOURNAL_FSYNC):
+        self.folder = folder
+        self.meta_path = os.path.join(folder, META_FILE)
+        self.journal_path = os.path.join(folder, JOURNAL_FILE)
+        self.ids_path = os.path.join(folder, IDS_FILE)
+        self.fsync = fsync
+        self.lock = threading.Lock()
+        self.file = None
+        self.ids_file = None
+        self.meta = {}
+        # Усі товари з position <= completed_until завершено; completed — завершені після цієї межі
+        self.completed_until = 0
+        self.completed = set()
+        self.failed = set()
+        self.exported = 0
+        self.last_checkpoint = None
+        self.unsynced = 0
+        self.synced_at = time.monotonic()
+
+    def exists(self) -> bool:
+        return os.path.exists(self.meta_path)
+
+    def start(self, meta: dict) -> None:
+        """Починає нове завдання: зберігає його параметри та очищає журнал."""
+        os.makedirs(self.folder, exist_ok=True)
+        self.meta = {**meta, "created": datetime.now().isoformat(timespec="seconds")}
+        atomic_write_json(self.meta_path, self.meta)
+        self.file = open(self.journal_path, "wb")
+
+    def load(self) -> dict:
+        """Відтворює журнал існуючого завдання і повертає його параметри."""
+        with open(self.meta_path, encoding="utf-8") as file:
+            self.meta = json.load(file)
+        valid_size = 0
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "rb") as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Недописаний останній рядок (збій під час запису) відкидаємо
+                        break
+                    if not line.endswith(b"\n"):
+                        break
+                    valid_size += len(line)
+                    self._apply(record)
+        self.file = open(self.journal_path, "ab")
+        self.file.truncate(valid_size)
+        return self.meta
+
+    def _apply(self, record: dict) -> None:
+        position = record["position"]
+        if record["stage"] == "exported":
+            self.exported += 1
+            self.failed.discard(position)
+            self.last_checkpoint = record.get("checkpoint")
+        else:
+            self.failed.add(position)
+        if position > self.completed_until:
+            self.completed.add(position)
+            while self.completed_until + 1 in self.completed:
+                self.completed_until += 1
+                self.completed.remove(self.completed_until)
+
+    def read_ids(self) -> list[str]:
+        """Повертає ID, збережені spool_id попередніми запусками (недописаний останній рядок відкидається)."""
+        ids, valid_size = [], 0
+        if os.path.exists(self.ids_path):
+            with open(self.ids_path, "rb") as file:
+                for line in file:
+                    if not line.endswith(b"\n"):
+                        break
+                    valid_size += len(line)
+                    ids.append(line.decode("utf-8").strip())
+            with open(self.ids_path, "ab") as file:
+                file.truncate(valid_size)
+        return ids
+
+    def spool_id(self, item_id: str) -> None:
+        """
+        Дописує ID наступного товару вхідного списку в ids.txt. Файл синхронізується разом із журналом
+        і перед ним, тому кожна позиція з журналу після збою є і в ids.txt.
+        """
+        with self.lock:
+            if self.ids_file is None:
+                self.ids_file = open(self.ids_path, "ab")
+            self.ids_file.write(f"{item_id}\n".encode("utf-8"))
+            self.ids_file.flush()
+
+    def sync_due(self) -> bool:
+        """Чи настав час пакетного fsync (тоді перед записом варто синхронізувати й файли результатів)."""
+        return self.fsync and (self.unsynced + 1 >= JOURNAL_FSYNC_EVERY
+                               or time.monotonic() - self.synced_at >= JOURNAL_FSYNC_INTERVAL)
+
+    def record(self, item_id: str, stage: str, position: int, sync: bool = False, **extra) -> None:
+        """
+        Дописує в журнал результат товару: stage "exported" (з checkpoint файлів) або "failed".
+        sync — одразу виконати fsync (разом з усіма попередніми записами).
+        """
+        record = {"item": item_id, "stage": stage, "position": position, **extra}
+        line = json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+        with self.lock:
+            self._apply(record)
+            if self.file is None:
+                return
+            self.file.write(line)
+            self.file.flush()
+            self.unsynced += 1
+            if sync:
+                self._sync()
+
+    def _sync(self) -> None:
+        if self.fsync and self.unsynced:
+            if self.ids_file is not None:
+                os.fsync(self.ids_file.fileno())
+            os.fsync(self.file.fileno())
+        self.unsynced = 0
+        self.synced_at = time.monotonic()
+
+    def sync(self) -> None:
+        """fsync усіх записів, ще не синхронізованих пакетно."""
+        with self.lock:
+            if self.file is not None:
+                self._sync()
+
+    def is_done(self, position: int) -> bool:
+        """Чи збережено товар з цим номером у вхідному списку попереднім запуском завдання."""
+        with self.lock:
+            if position in self.failed:
+                return False
+            return position <= self.completed_until or position in self.completed
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.sync()
+            self.file.close()
+            self.file = None
+        if self.ids_file is not None:
+            self.ids_file.close()
+            self.ids_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -1,10 +1,77 @@
 import sys
+import threading
+from collections import deque
 from PyQt5 import QtCore, QtWidgets
 from PyQt5.QtGui import QIcon, QIntValidator
-from funcionality import start_parsing, run_in_thread
+from funcionality import start_parsing
+from jobs import JobManager
 from qss import BRIGHT_QSS
 import resources_rc
 
+# Як часто (мс) накопичені логи та прогрес передаються у віджети
+GUI_FLUSH_INTERVAL_MS = 100
+# Скільки рядків логу зберігає вікно (старіші видаляються)
+GUI_LOG_MAX_LINES = 5000
+
+class UiUpdateBridge(QtCore.QObject):
+    """
+    Міст між потоками парсингу та інтерфейсом.
+    Потоки лише додають рядки логу, прогрес і завершені завдання в буфер (без подій Qt),
+    а таймер у потоці інтерфейсу раз на GUI_FLUSH_INTERVAL_MS передає їх у віджети одним оновленням.
+    Буфер обмежений: якщо інтерфейс не встигає, найстаріші рядки відкидаються.
+    """
+    def __init__(self, log_widget, on_progress=None, on_finished=None,
+                 interval_ms: int = GUI_FLUSH_INTERVAL_MS, max_lines: int = GUI_LOG_MAX_LINES, parent=None):
+        super().__init__(parent)
+        self.log_widget = log_widget
+        self.on_progress = on_progress
+        self.on_finished = on_finished
+        self.lock = threading.Lock()
+        self.lines = deque(maxlen=max_lines)
+        self.dropped = 0
+        self.progress = {}
+        self.finished = []
+        self.timer = QtCore.QTimer(self)
+        self.timer.timeout.connect(self.flush)
+        self.timer.start(interval_ms)
+
+    def log(self, message: str):
+        """Додає рядок логу (викликається з будь-якого потоку)."""
+        with self.lock:
+            if len(self.lines) == self.lines.maxlen:
+                self.dropped += 1
+            self.lines.append(message)
+
+    def set_progress(self, job_id: int, value: int):
+        """Запам'ятовує останнє значення прогресу завдання (викликається з будь-якого потоку)."""
+        with self.lock:
+            self.progress[job_id] = value
+
+    def job_finished(self, job):
+        """Повідомляє про завершення завдання (викликається з потоку завдання)."""
+        with self.lock:
+            self.finished.append(job)
+
+    @QtCore.pyqtSlot()
+    def flush(self):
+        """Передає накопичені логи, прогрес і статуси у віджети (потік інтерфейсу)."""
+        with self.lock:
+            if not self.lines and not self.progress and not self.finished:
+                return
+            lines = list(self.lines)
+            self.lines.clear()
+            dropped, self.dropped = self.dropped, 0
+            progress, self.progress = self.progress, {}
+            finished, self.finished = self.finished, []
+        if dropped:
+            lines.insert(0, f"... пропущено рядків логу: {dropped}")
+        if lines:
+            self.log_widget.appendPlainText("\n".join(lines))
+        if progress and self.on_progress:
+            self.on_progress(progress)
+        if finished and self.on_finished:
+            self.on_finished(finished)
+
 class ParserApp(QtWidgets.QWidget):
     """Основний клас додатку для парсингу."""
     def __init__(self, parent=None):
@@ -16,8 +83,12 @@ class ParserApp(QtWidgets.QWidget):
         self.selected_mode = "single"
         self.link_or_links = ""
         self.limit = 1
+        self.job_items = {}
+        self.job_progress = {}
+        self.last_job_id = None
 
         self._init_ui()
+        self.job_manager = JobManager(log_callback=self.add_log, progress_callback=self.update_progress)
         self.setStyleSheet(BRIGHT_QSS)
 
     def _init_ui(self):
@@ -63,9 +134,33 @@ class ParserApp(QtWidgets.QWidget):
         self.lbl_limit.setEnabled(False)
         self.edit_limit.setEnabled(False)
 
+        # Обмеження часу завдання
+        deadline_layout = QtWidgets.QHBoxLayout()
+        lbl_deadline = QtWidgets.QLabel("Deadline, s (0 = none):")
+        self.edit_deadline = QtWidgets.QLineEdit("0")
+        self.edit_deadline.setValidator(QIntValidator(0, 10 ** 6))
+        deadline_layout.addWidget(lbl_deadline)
+        deadline_layout.addWidget(self.edit_deadline)
+        layout.addLayout(deadline_layout)
+
+        # Список завдань (кілька завдань можуть виконуватися одночасно)
+        self.jobs_list = QtWidgets.QListWidget()
+        self.jobs_list.setMaximumHeight(110)
+        self.jobs_list.currentItemChanged.connect(self.on_job_selected)
+        layout.addWidget(self.jobs_list)
+        jobs_buttons = QtWidgets.QHBoxLayout()
+        self.btn_cancel = QtWidgets.QPushButton("Cancel Job")
+        self.btn_cancel.clicked.connect(self.cancel_selected_job)
+        self.btn_cancel_all = QtWidgets.QPushButton("Cancel All")
+        self.btn_cancel_all.clicked.connect(self.cancel_all_jobs)
+        jobs_buttons.addWidget(self.btn_cancel)
+        jobs_buttons.addWidget(self.btn_cancel_all)
+        layout.addLayout(jobs_buttons)
+
         # Текстове поле для логів
         self.log_text = QtWidgets.QPlainTextEdit()
         self.log_text.setReadOnly(True)
+        self.log_text.setMaximumBlockCount(GUI_LOG_MAX_LINES)
         self.log_text.setPlaceholderText("Логи виконання з'являться тут...")
         layout.addWidget(self.log_text)
 
@@ -81,6 +176,9 @@ class ParserApp(QtWidgets.QWidget):
         bottom_layout.addWidget(self.btn_start)
         layout.addLayout(bottom_layout)
 
+        self.ui_bridge = UiUpdateBridge(self.log_text, on_progress=self.on_jobs_progress,
+                                        on_finished=self.on_jobs_finished, parent=self)
+
     def on_mode_changed(self, mode: str):
         """Обробка зміни режиму парсингу."""
         self.selected_mode = mode
@@ -98,49 +196,83 @@ class ParserApp(QtWidgets.QWidget):
         if not self.link_or_links:
             QtWidgets.QMessageBox.warning(self, "Warning", "Будь ласка, введіть посилання або запит.")
             return
-        self.btn_start.setEnabled(True)
-        self.log_text.appendPlainText("==== Запуск процесу парсингу ====")
-        self.progress_bar.setValue(0)
-        run_in_thread(
-            target=start_parsing,
+        deadline = int(self.edit_deadline.text()) if self.edit_deadline.text().isdigit() else 0
+        job = self.job_manager.submit(
+            self.selected_mode,
+            start_parsing,
             mode=self.selected_mode,
             link_or_links=self.link_or_links,
             limit=self.limit,
-            log_callback=self.add_log,
-            progress_callback=self.update_progress,
+            deadline=deadline or None,
+            on_done=self.ui_bridge.job_finished,
         )
+        self.log_text.appendPlainText(f"==== Запуск завдання #{job.job_id} ({job.name}) ====")
+        item = QtWidgets.QListWidgetItem()
+        item.setData(QtCore.Qt.UserRole, job.job_id)
+        self.jobs_list.addItem(item)
+        self.job_items[job.job_id] = (item, job)
+        self.job_progress[job.job_id] = 0
+        self.last_job_id = job.job_id
+        self._refresh_job_item(job.job_id)
+        self.progress_bar.setValue(0)
 
-    def add_log(self, message: str):
-        """Callback для виводу логів."""
-        QtCore.QMetaObject.invokeMethod(
-            self,
-            "append_log_text",
-            QtCore.Qt.QueuedConnection,
-            QtCore.Q_ARG(str, message)
-        )
+    def _refresh_job_item(self, job_id: int):
+        item, job = self.job_items[job_id]
+        status = job.status if job.status not in ("queued", "running") or not job.cancel_event.is_set() else "cancelling"
+        item.setText(f"#{job_id} {job.name}: {status}, {self.job_progress.get(job_id, 0)}%")
 
-    @QtCore.pyqtSlot(str)
-    def append_log_text(self, message: str):
-        """Додавання повідомлення у текстове поле логів."""
-        self.log_text.appendPlainText(message)
-        if "завершено успішно" in message.lower() or "помилка" in message.lower():
-            self.btn_start.setEnabled(True)
-
-    def update_progress(self, value: int):
-        """Callback для оновлення прогрес-бару."""
-        QtCore.QMetaObject.invokeMethod(
-            self,
-            "set_progress_val",
-            QtCore.Qt.QueuedConnection,
-            QtCore.Q_ARG(int, value)
-        )
+    def _shown_job_id(self):
+        """Завдання, прогрес якого показує прогрес-бар: вибране у списку або останнє запущене."""
+        item = self.jobs_list.currentItem()
+        return item.data(QtCore.Qt.UserRole) if item is not None else self.last_job_id
+
+    def add_log(self, job, message: str):
+        """Callback для виводу логів завдання (з потоку парсингу)."""
+        self.ui_bridge.log(f"[#{job.job_id}] {message}")
+
+    def update_progress(self, job, value: int):
+        """Callback для оновлення прогресу завдання (з потоку парсингу)."""
+        self.ui_bridge.set_progress(job.job_id, value)
+
+    def on_jobs_progress(self, progress: dict):
+        """Нові значення прогресу завдань (потік інтерфейсу)."""
+        self.job_progress.update(progress)
+        for job_id in progress:
+            if job_id in self.job_items:
+                self._refresh_job_item(job_id)
+        shown = self._shown_job_id()
+        if shown in progress:
+            self.progress_bar.setValue(progress[shown])
+
+    def on_jobs_finished(self, finished: list):
+        """Завершені завдання (потік інтерфейсу)."""
+        for job in finished:
+            if job.status == "done":
+                self.job_progress[job.job_id] = 100
+            if job.job_id in self.job_items:
+                self._refresh_job_item(job.job_id)
+            self.log_text.appendPlainText(f"==== Завдання #{job.job_id} ({job.name}): {job.status} ====")
+
+    def on_job_selected(self, current, previous):
+        if current is not None:
+            self.progress_bar.setValue(self.job_progress.get(current.data(QtCore.Qt.UserRole), 0))
+
+    def cancel_selected_job(self):
+        """Скасовує вибране завдання (або останнє запущене)."""
+        job_id = self._shown_job_id()
+        if job_id is not None:
+            self.job_manager.cancel(job_id)
+            self._refresh_job_item(job_id)
+
+    def cancel_all_jobs(self):
+        self.job_manager.cancel_all()
+        for job_id in self.job_items:
+            self._refresh_job_item(job_id)
 
-    @QtCore.pyqtSlot(int)
-    def set_progress_val(self, value: int):
-        """Встановлення значення прогрес-бару."""
-        self.progress_bar.setValue(value)
-        if value >= 100:
-            self.btn_start.setEnabled(True)
+    def closeEvent(self, event):
+        """Під час закриття вікна зупиняє всі завдання (файли результатів і журнали закриваються коректно)."""
+        self.job_manager.shutdown()
+        super().closeEvent(event)
 
 def main():
     """Точка входу в додаток."""
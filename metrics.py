@@ -0,0 +1,186 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+
+from dotenv import load_dotenv
+load_dotenv()
+
+# Окрім JSON звіту, записувати метрики у текстовому форматі Prometheus (run_report.prom)
+METRICS_PROMETHEUS = os.getenv("METRICS_PROMETHEUS", "0") == "1"
+PROMETHEUS_PREFIX = "aliparser"
+
+
+def _counter_key(name: str, labels: dict) -> str:
+    """Ключ лічильника у стилі Prometheus: name{label="value"}."""
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{key}="{value}"' for key, value in sorted(labels.items())) + "}"
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Metrics:
+    """
+    Метрики одного завдання парсингу: тривалості етапів і лічильники
+    (запити API, влучання кешу, повтори, помилки, завантажені байти ...).
+    Потокобезпечний, може заповнюватися з усіх потоків завдання.
+    """
+
+    def __init__(self, job: str = ""):
+        self.job = job
+        self.started_at = datetime.now()
+        self.started = time.perf_counter()
+        self.finished = None
+        self.timings = defaultdict(list)
+        self.counters = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self.lock:
+            self.timings[stage].append(seconds)
+
+    def incr(self, name: str, value: int = 1, **labels) -> None:
+        key = _counter_key(name, labels)
+        with self.lock:
+            self.counters[key] += value
+
+    def get(self, name: str, **labels) -> int:
+        with self.lock:
+            return self.counters.get(_counter_key(name, labels), 0)
+
+    @contextmanager
+    def timer(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def finish(self) -> None:
+        self.finished = time.perf_counter()
+
+    def report(self) -> dict:
+        """Повертає звіт запуску у вигляді словника (для JSON)."""
+        with self.lock:
+            timings = {stage: sorted(values) for stage, values in self.timings.items()}
+            counters = dict(self.counters)
+        duration = (self.finished or time.perf_counter()) - self.started
+        stages = {}
+        for stage, values in timings.items():
+            stages[stage] = {
+                "count": len(values),
+                "total": round(sum(values), 6),
+                "p50": round(_percentile(values, 0.5), 6),
+                "p95": round(_percentile(values, 0.95), 6),
+                "p99": round(_percentile(values, 0.99), 6),
+                "max": round(values[-1], 6),
+            }
+        items = counters.get("items_processed", 0)
+        return {
+            "job": self.job,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "duration_seconds": round(duration, 3),
+            "items_per_second": round(items / duration, 3) if duration else 0.0,
+            "counters": counters,
+            "stages": stages,
+        }
+
+    def to_prometheus(self) -> str:
+        """Повертає метрики у текстовому форматі Prometheus."""
+        report = self.report()
+        job = report["job"]
+        lines = [
+            f"# TYPE {PROMETHEUS_PREFIX}_run_duration_seconds gauge",
+            f'{PROMETHEUS_PREFIX}_run_duration_seconds{{job="{job}"}} {report["duration_seconds"]}',
+            f"# TYPE {PROMETHEUS_PREFIX}_items_per_second gauge",
+            f'{PROMETHEUS_PREFIX}_items_per_second{{job="{job}"}} {report["items_per_second"]}',
+        ]
+        typed = set()
+        for key, value in sorted(report["counters"].items()):
+            name, _, labels = key.partition("{")
+            metric = f"{PROMETHEUS_PREFIX}_{name}_total"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            labels = f'job="{job}",' + labels.rstrip("}") if labels else f'job="{job}"'
+            lines.append(f"{metric}{{{labels}}} {value}")
+        metric = f"{PROMETHEUS_PREFIX}_stage_seconds"
+        if report["stages"]:
+            lines.append(f"# TYPE {metric} summary")
+        for stage, stats in sorted(report["stages"].items()):
+            labels = f'job="{job}",stage="{stage}"'
+            for quantile in ("p50", "p95", "p99"):
+                lines.append(f'{metric}{{{labels},quantile="0.{quantile[1:]}"}} {stats[quantile]}')
+            lines.append(f"{metric}_sum{{{labels}}} {stats['total']}")
+            lines.append(f"{metric}_count{{{labels}}} {stats['count']}")
+        return "\n".join(lines) + "\n"
+
+    def save(self, folder: str, prometheus: bool = METRICS_PROMETHEUS) -> str:
+        """Зберігає run_report.json (та run_report.prom) у папці завдання, повертає шлях до JSON."""
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, "run_report.json")
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.report(), file, ensure_ascii=False, indent=4)
+        if prometheus:
+            with open(os.path.join(folder, "run_report.prom"), "w", encoding="utf-8") as file:
+                file.write(self.to_prometheus())
+        return path
+
+
+# Метрики поточного завдання; потоки пулів отримують їх через copy_context (див. concurrency.py)
+_global_metrics = Metrics("global")
+_current_metrics = ContextVar("current_metrics", default=_global_metrics)
+
+
+def current() -> Metrics:
+    """Повертає метрики завдання, у контексті якого виконується код."""
+    return _current_metrics.get()
+
+
+def activate(job_metrics: Metrics):
+    """Робить job_metrics поточними метриками; повертає токен для deactivate."""
+    return _current_metrics.set(job_metrics)
+
+
+def deactivate(token) -> None:
+    """Завершує замір і повертає попередні поточні метрики."""
+    _current_metrics.get().finish()
+    _current_metrics.reset(token)
+
+
+@contextmanager
+def use(job_metrics: Metrics):
+    """Робить job_metrics поточними метриками в межах блоку with."""
+    token = activate(job_metrics)
+    try:
+        yield job_metrics
+    finally:
+        deactivate(token)
+
+
+def incr(name: str, value: int = 1, **labels) -> None:
+    current().incr(name, value, **labels)
+
+
+def timer(stage: str):
+    return current().timer(stage)
+
+
+def timed(stage: str):
+    """Декоратор: записує тривалість виклику функції як етап stage."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with current().timer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
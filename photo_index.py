@@ -0,0 +1,118 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from dotenv import load_dotenv
+load_dotenv()
+
+PHOTO_INDEX_PATH = os.getenv("PHOTO_INDEX_PATH", ".photo_index.sqlite3")
+
+
+def make_public_id(photo_link: str) -> str:
+    """Детермінований public_id для фото: однакове посилання завжди дає однакову назву."""
+    return hashlib.sha1(photo_link.encode("utf-8")).hexdigest()[:24]
+
+
+class PhotoIndex:
+    """
+    Постійний індекс завантажених фото у SQLite.
+    Зберігає відповідність посилання-джерела, public_id та хешу вмісту (etag, MD5)
+    до secure_url, щоб одне й те саме фото не завантажувалося на хостинг повторно.
+    """
+
+    def __init__(self, path: str = PHOTO_INDEX_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS hosted ("
+                "public_id TEXT PRIMARY KEY, secure_url TEXT NOT NULL, etag TEXT, updated REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_hosted_etag ON hosted(etag)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sources ("
+                "source_url TEXT PRIMARY KEY, public_id TEXT NOT NULL)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _query_one(self, sql: str, params: tuple) -> str | None:
+        try:
+            with self.lock:
+                row = self._connect().execute(sql, params).fetchone()
+        except sqlite3.Error:
+            return None
+        return row[0] if row else None
+
+    def find_by_source(self, source_url: str) -> str | None:
+        """Повертає secure_url фото, вже завантаженого з цього посилання."""
+        return self._query_one(
+            "SELECT h.secure_url FROM sources s JOIN hosted h ON h.public_id = s.public_id "
+            "WHERE s.source_url = ?", (source_url,))
+
+    def find_by_public_id(self, public_id: str) -> str | None:
+        """Повертає secure_url фото з таким public_id (наприклад, знайденого під час звірки папки)."""
+        return self._query_one("SELECT secure_url FROM hosted WHERE public_id = ?", (public_id,))
+
+    def find_by_etag(self, etag: str) -> tuple[str, str] | None:
+        """Повертає (public_id, secure_url) фото з таким самим вмістом (MD5)."""
+        try:
+            with self.lock:
+                row = self._connect().execute(
+                    "SELECT public_id, secure_url FROM hosted WHERE etag = ?", (etag,)).fetchone()
+        except sqlite3.Error:
+            return None
+        return (row[0], row[1]) if row else None
+
+    def add_hosted(self, public_id: str, secure_url: str, etag: str | None = None,
+                   source_url: str | None = None) -> None:
+        """Записує завантажене фото та (за наявності) посилання, з якого воно отримане."""
+        try:
+            with self.lock:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO hosted (public_id, secure_url, etag, updated) VALUES (?, ?, ?, ?)",
+                    (public_id, secure_url, etag, time.time()))
+                if source_url:
+                    conn.execute("INSERT OR REPLACE INTO sources (source_url, public_id) VALUES (?, ?)",
+                                 (source_url, public_id))
+                conn.commit()
+        except sqlite3.Error:
+            pass
+
+    def add_hosted_many(self, resources: list[dict]) -> None:
+        """Записує список ресурсів Cloudinary (public_id, secure_url, etag) однією транзакцією."""
+        now = time.time()
+        rows = [(res["public_id"], res["secure_url"], res.get("etag"), now)
+                for res in resources if res.get("public_id") and res.get("secure_url")]
+        try:
+            with self.lock:
+                conn = self._connect()
+                conn.executemany(
+                    "INSERT OR REPLACE INTO hosted (public_id, secure_url, etag, updated) VALUES (?, ?, ?, ?)",
+                    rows)
+                conn.commit()
+        except sqlite3.Error:
+            pass
+
+    def add_source(self, source_url: str, public_id: str) -> None:
+        """Прив'язує посилання-джерело до вже відомого фото."""
+        try:
+            with self.lock:
+                conn = self._connect()
+                conn.execute("INSERT OR REPLACE INTO sources (source_url, public_id) VALUES (?, ?)",
+                             (source_url, public_id))
+                conn.commit()
+        except sqlite3.Error:
+            pass
+
+
+index = PhotoIndex()
@@ -0,0 +1,263 @@
+import os
+import queue
+import threading
+from collections.abc import Callable, Iterable, Iterator
+from contextvars import copy_context
+
+import ali_parse
+import jobs
+import metrics
+from data import get_item_info, get_shopify_rows
+from hosting import upload_photos
+
+from dotenv import load_dotenv
+load_dotenv()
+
+# Потоки етапів обробки даних (transform, shopify); мережеві етапи отримують workers завдання
+PIPELINE_CPU_WORKERS = max(1, int(os.getenv("PIPELINE_CPU_WORKERS", "2")))
+# Окремий розмір мережевих етапів (0 — workers завдання)
+PIPELINE_FETCH_WORKERS = int(os.getenv("PIPELINE_FETCH_WORKERS", "0"))
+PIPELINE_UPLOAD_WORKERS = int(os.getenv("PIPELINE_UPLOAD_WORKERS", "0"))
+# Місткість черги перед етапом (0 — удвічі більше за кількість потоків етапу)
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "0"))
+# Віддавати результати в порядку вхідного списку (0 — у порядку готовності)
+PIPELINE_ORDERED = os.getenv("PIPELINE_ORDERED", "1") == "1"
+
+# Кроків прогресу на один товар: fetch, transform, 2 × upload, shopify та збереження у режимі
+ITEM_STEPS = 6
+
+_POLL_INTERVAL = 0.1
+
+
+class Stage:
+    """
+    Етап конвеєра: func(value) повертає значення для наступного етапу
+    (None — елемент далі не йде і видається як невдалий). Етап має власний пул
+    із workers потоків і обмежену чергу перед собою.
+    """
+
+    def __init__(self, name: str, func: Callable, workers: int = 1, queue_size: int = PIPELINE_QUEUE_SIZE):
+        self.name = name
+        self.func = func
+        self.workers = max(1, int(workers or 1))
+        self.queue_size = queue_size or self.workers * 2
+
+
+class Pipeline:
+    """
+    Конвеєр з етапів, що працюють одночасно: поки один товар завантажує фото, наступні вже отримують дані.
+    Черги між етапами обмежені, тому повільний етап пригальмовує попередні (backpressure),
+    і в роботі ніколи не більше елементів, ніж сумарна місткість черг і пулів.
+    Потоки етапів бачать контекст виклику run (поточне завдання, метрики).
+    """
+
+    def __init__(self, stages: list[Stage], ordered: bool = PIPELINE_ORDERED):
+        self.stages = stages
+        self.ordered = ordered
+        self.capacity = sum(stage.workers + stage.queue_size for stage in stages)
+
+    def run(self, items: Iterable) -> Iterator[tuple[object, object, str | None]]:
+        """
+        Проводить елементи через усі етапи й повертає (елемент, результат останнього етапу, помилка).
+        Вхідний ітератор читається в потоці виклику (тому може використовувати SQLite, stdin тощо).
+        JobCancelled з будь-якого етапу зупиняє конвеєр і передається далі.
+        """
+        stop = threading.Event()
+        # Перша черга не обмежена: скільки елементів подати, вирішує run (не більше capacity в роботі)
+        queues = [queue.Queue()] + [queue.Queue(maxsize=stage.queue_size) for stage in self.stages[1:]]
+        done = queue.Queue()
+        fatal = []
+        threads = []
+        for index, stage in enumerate(self.stages):
+            next_queue = queues[index + 1] if index + 1 < len(queues) else None
+            for number in range(stage.workers):
+                thread = threading.Thread(target=copy_context().run,
+                                          args=(self._work, stage, queues[index], next_queue, done, stop, fatal),
+                                          name=f"pipeline-{stage.name}-{number}", daemon=True)
+                thread.start()
+                threads.append(thread)
+        items = iter(items)
+        exhausted = False
+        in_flight = 0
+        fed = 0
+        next_seq = 0
+        finished = {}
+        try:
+            while True:
+                if fatal:
+                    raise fatal[0]
+                while not exhausted and in_flight < self.capacity:
+                    try:
+                        item = next(items)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    queues[0].put((fed, item, item))
+                    fed += 1
+                    in_flight += 1
+                if exhausted and in_flight == 0:
+                    return
+                try:
+                    seq, item, result, error = done.get(timeout=_POLL_INTERVAL)
+                except queue.Empty:
+                    jobs.check_cancelled()
+                    continue
+                if not self.ordered:
+                    in_flight -= 1
+                    yield item, result, error
+                    continue
+                finished[seq] = (item, result, error)
+                while next_seq in finished:
+                    in_flight -= 1
+                    yield finished.pop(next_seq)
+                    next_seq += 1
+        finally:
+            stop.set()
+
+    @staticmethod
+    def _work(stage: Stage, source: queue.Queue, target: queue.Queue | None, done: queue.Queue,
+              stop: threading.Event, fatal: list) -> None:
+        while not stop.is_set():
+            try:
+                seq, item, value = source.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            try:
+                value = stage.func(value)
+            except jobs.JobCancelled as e:
+                fatal.append(e)
+                stop.set()
+                return
+            except Exception as e:
+                done.put((seq, item, None, f"{stage.name}: {e}"))
+                continue
+            if value is None or target is None:
+                done.put((seq, item, value, None))
+                continue
+            # Наступний етап зайнятий — чекаємо місця в його черзі (backpressure)
+            while not stop.is_set():
+                try:
+                    target.put((seq, item, value), timeout=_POLL_INTERVAL)
+                    break
+                except queue.Full:
+                    continue
+
+
+class ItemTask:
+    """Стан одного товару між етапами конвеєра товарів."""
+
+    def __init__(self, item_id: str, index: int = 0, ref=None):
+        self.item_id = item_id
+        self.index = index
+        self.ref = ref
+        self.item_data = None
+        self.item_dict = None
+        self.main_photos_url = None
+        self.shopify_rows = None
+        self.error = None
+
+    @property
+    def ok(self) -> bool:
+        return self.shopify_rows is not None
+
+    @property
+    def result(self) -> tuple[dict, list[tuple]] | None:
+        return (self.item_dict, self.shopify_rows) if self.ok else None
+
+
+def item_stages(workers: int, log_callback=None, update_progress=None, total: int = 0,
+                headers: dict | None = None) -> list[Stage]:
+    """
+    Етапи обробки товару: fetch (parse_item) → transform (get_item_info) → upload (фото) → shopify.
+    Мережеві етапи мають workers потоків, етапи обробки даних — PIPELINE_CPU_WORKERS.
+    headers — заголовки RapidAPI (за замовчуванням ali_parse.headers).
+    """
+    headers = headers or ali_parse.headers
+    log = log_callback or jobs.log
+    progress = update_progress or (lambda: None)
+    cpu_workers = 1 if workers <= 1 else PIPELINE_CPU_WORKERS
+
+    def fetch(task: ItemTask) -> ItemTask | None:
+        jobs.check_cancelled()
+        if task.index:
+            log(f"--- Товар {task.index} з {total}, ID: {task.item_id} ---" if total
+                else f"--- Товар {task.index}, ID: {task.item_id} ---")
+        with metrics.timer("fetch"):
+            task.item_data = ali_parse.parse_item(headers, task.item_id)
+        progress()
+        if not task.item_data:
+            metrics.incr("items_failed")
+            log(f"Не вдалося отримати дані для товару {task.item_id}.")
+            return None
+        return task
+
+    def transform(task: ItemTask) -> ItemTask:
+        with metrics.timer("transform"):
+            task.item_dict = get_item_info(task.item_data)
+        task.item_data = None
+        log(f"Дані товару {task.item_id} сформовано.")
+        progress()
+        return task
+
+    def upload(task: ItemTask) -> ItemTask:
+        jobs.check_cancelled()
+        task.main_photos_url = []
+        if task.item_dict["MainPhotoLinks"]:
+            with metrics.timer("upload_main"):
+                task.main_photos_url = upload_photos(task.item_dict["MainPhotoLinks"],
+                                                     f"{task.item_id}/MainPhotos")
+            log(f"Завантажено фото товару {task.item_id}: {len(task.main_photos_url)}.")
+        progress()
+        if task.item_dict["ReviewsPhotoLinks"]:
+            with metrics.timer("upload_reviews"):
+                upload_photos(task.item_dict["ReviewsPhotoLinks"], f"{task.item_id}/PhotoReview")
+        progress()
+        return task
+
+    def shopify(task: ItemTask) -> ItemTask:
+        with metrics.timer("shopify"):
+            task.shopify_rows = get_shopify_rows(task.item_dict, task.main_photos_url)
+        progress()
+        metrics.incr("items_processed")
+        return task
+
+    return [
+        Stage("fetch", fetch, PIPELINE_FETCH_WORKERS or workers),
+        Stage("transform", transform, cpu_workers),
+        Stage("upload", upload, PIPELINE_UPLOAD_WORKERS or workers),
+        Stage("shopify", shopify, cpu_workers),
+    ]
+
+
+def process_items(items: Iterable[ItemTask | str], workers: int, log_callback=None, update_progress=None,
+                  total: int = 0, ordered: bool = PIPELINE_ORDERED,
+                  headers: dict | None = None) -> Iterator[ItemTask]:
+    """
+    Обробляє товари конвеєром item_stages і повертає ItemTask кожного товару
+    (task.ok — чи сформовано дані для Shopify, task.error — текст помилки етапу).
+    Збереження результатів — останній етап, який виконує код, що читає цей ітератор.
+    """
+    tasks = (item if isinstance(item, ItemTask) else ItemTask(item) for item in items)
+    pipeline = Pipeline(item_stages(workers, log_callback, update_progress, total, headers), ordered)
+    for task, _, error in pipeline.run(tasks):
+        task.error = error
+        yield task
+
+
+def process_item(item: ItemTask | str, log_callback=None, update_progress=None,
+                 headers: dict | None = None) -> ItemTask:
+    """
+    Обробляє один товар етапами item_stages по черзі в потоці виклику — без пулів і черг конвеєра.
+    Результат такий самий, як у process_items для одного товару.
+    """
+    task = item if isinstance(item, ItemTask) else ItemTask(item)
+    for stage in item_stages(1, log_callback, update_progress, headers=headers):
+        try:
+            if stage.func(task) is None:
+                break
+        except jobs.JobCancelled:
+            raise
+        except Exception as e:
+            task.error = f"{stage.name}: {e}"
+            break
+    return task
@@ -0,0 +1,434 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from dotenv import load_dotenv
+load_dotenv()
+
+# Обмеження запитів на один ключ RapidAPI (0 = без обмеження), сумарно для всіх процесів зі спільним станом
+RAPID_API_RPS = float(os.getenv("RAPID_API_RPS", "5"))
+RAPID_API_BURST = float(os.getenv("RAPID_API_BURST", "0")) or max(1.0, RAPID_API_RPS)
+RAPID_API_MONTHLY_QUOTA = int(os.getenv("RAPID_API_MONTHLY_QUOTA", "0"))
+# Спільний для всіх процесів (воркерів черги) стан ключів у SQLite: token bucket, місячні лічильники,
+# паузи після 429. Порожнє значення — стан лише в пам'яті процесу
+RAPID_API_STATE_PATH = os.getenv("RAPID_API_STATE_PATH", ".rapidapi_state.sqlite3")
+# На скільки секунд ключ, відхилений з кодом 401/403, знімається з ротації (лише в поточному процесі)
+RAPID_API_REJECT_COOLDOWN = float(os.getenv("RAPID_API_REJECT_COOLDOWN", "600"))
+
+# Адаптивна кількість одночасних запитів до одного ендпоінта (API_ADAPTIVE=0 — завжди API_CONCURRENCY_MAX)
+API_ADAPTIVE = os.getenv("API_ADAPTIVE", "1") == "1"
+API_CONCURRENCY_INITIAL = int(os.getenv("API_CONCURRENCY_INITIAL", "8"))
+API_CONCURRENCY_MIN = int(os.getenv("API_CONCURRENCY_MIN", "1"))
+API_CONCURRENCY_MAX = int(os.getenv("API_CONCURRENCY_MAX", "32"))
+# Відповідь, повільніша за цей час (секунди), вважається ознакою перевантаження API
+API_LATENCY_TARGET = float(os.getenv("API_LATENCY_TARGET", "5"))
+# Запобіжник: скільки збоїв поспіль призупиняють ендпоінт і на скільки секунд
+API_BREAKER_FAILURES = int(os.getenv("API_BREAKER_FAILURES", "5"))
+API_BREAKER_COOLDOWN = float(os.getenv("API_BREAKER_COOLDOWN", "30"))
+API_BREAKER_MAX_COOLDOWN = float(os.getenv("API_BREAKER_MAX_COOLDOWN", "300"))
+# Дублюючі запити (hedging): якщо відповідь не прийшла за API_HEDGE_PERCENTILE перцентиль
+# недавніх затримок, надсилається один дубль; дублів не більше API_HEDGE_MAX_RATIO від усіх запитів
+API_HEDGE = os.getenv("API_HEDGE", "0") == "1"
+API_HEDGE_ENDPOINTS = {name.strip() for name in os.getenv("API_HEDGE_ENDPOINTS", "item_detail_7").split(",") if name.strip()}
+API_HEDGE_PERCENTILE = float(os.getenv("API_HEDGE_PERCENTILE", "95"))
+API_HEDGE_MAX_RATIO = float(os.getenv("API_HEDGE_MAX_RATIO", "0.05"))
+API_HEDGE_MIN_DELAY = float(os.getenv("API_HEDGE_MIN_DELAY", "0.5"))
+API_HEDGE_WINDOW = int(os.getenv("API_HEDGE_WINDOW", "200"))
+
+
+def load_api_keys() -> list[str]:
+    """Повертає список ключів RapidAPI з RAPID_API_KEYS (через кому) та RAPID_API_KEY."""
+    keys = [key.strip() for key in os.getenv("RAPID_API_KEYS", "").split(",") if key.strip()]
+    single_key = os.getenv("RAPID_API_KEY", "").strip()
+    if single_key and single_key not in keys:
+        keys.insert(0, single_key)
+    return keys
+
+
+class TokenBucket:
+    """Потокобезпечний token bucket: rate токенів за секунду, не більше capacity одночасно."""
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self) -> float:
+        """Забирає токен і повертає 0 або повертає час (с), через який токен з'явиться."""
+        if self.rate <= 0:
+            return 0.0
+        with self.lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self) -> None:
+        """Чекає, доки не з'явиться вільний токен."""
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return
+            time.sleep(wait)
+
+
+class KeyState:
+    """
+    Стан ключів RapidAPI у SQLite, спільний для всіх процесів, що відкривають той самий файл:
+    token bucket кожного ключа, місячні лічильники запитів, пауза після 429 і позначка вичерпаної квоти.
+    Токен і лічильник змінюються в одній транзакції (BEGIN IMMEDIATE), тому кілька воркерів
+    разом не перевищують ліміт запитів на ключ, а запити жодного процесу не губляться.
+    """
+
+    def __init__(self, path: str = RAPID_API_STATE_PATH):
+        self.path = path or ":memory:"
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            "key_id TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, "
+            "cooldown_until REAL NOT NULL DEFAULT 0)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS usage ("
+            "month TEXT NOT NULL, key_id TEXT NOT NULL, requests INTEGER NOT NULL DEFAULT 0, "
+            "exhausted INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (month, key_id))"
+        )
+
+    def _transaction(self, func, *args):
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = func(*args)
+                self.conn.execute("COMMIT")
+                return result
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def acquire(self, key_ids: list[str], rate: float, capacity: float, monthly_quota: int,
+                month: str) -> tuple[int | None, float | None]:
+        """
+        Забирає токен першого доступного ключа з key_ids і рахує йому запит.
+        Повертає (індекс ключа, 0) або (None, секунди до появи токена);
+        (None, None) — квоту всіх ключів вичерпано.
+        """
+        return self._transaction(self._acquire, key_ids, rate, capacity, monthly_quota, month)
+
+    def _acquire(self, key_ids, rate, capacity, monthly_quota, month):
+        now = time.time()
+        wait = None
+        for index, key_id in enumerate(key_ids):
+            row = self.conn.execute("SELECT requests, exhausted FROM usage WHERE month = ? AND key_id = ?",
+                                    (month, key_id)).fetchone()
+            requests, exhausted = row or (0, 0)
+            if exhausted or (monthly_quota and requests >= monthly_quota):
+                continue
+            row = self.conn.execute("SELECT tokens, updated, cooldown_until FROM buckets WHERE key_id = ?",
+                                    (key_id,)).fetchone()
+            tokens, updated, cooldown_until = row or (capacity, now, 0.0)
+            if cooldown_until > now:
+                wait = cooldown_until - now if wait is None else min(wait, cooldown_until - now)
+                continue
+            if rate > 0:
+                tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+                if tokens < 1:
+                    bucket_wait = (1 - tokens) / rate
+                    wait = bucket_wait if wait is None else min(wait, bucket_wait)
+                    continue
+                tokens -= 1
+            self.conn.execute(
+                "INSERT INTO buckets (key_id, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key_id) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key_id, tokens, now))
+            self.conn.execute(
+                "INSERT INTO usage (month, key_id, requests) VALUES (?, ?, 1) "
+                "ON CONFLICT(month, key_id) DO UPDATE SET requests = requests + 1", (month, key_id))
+            return index, 0.0
+        return None, wait
+
+    def set_cooldown(self, key_id: str, until: float) -> None:
+        """Знімає ключ з ротації до unix-часу until (для всіх процесів)."""
+        self._transaction(lambda: self.conn.execute(
+            "INSERT INTO buckets (key_id, tokens, updated, cooldown_until) VALUES (?, 0, ?, ?) "
+            "ON CONFLICT(key_id) DO UPDATE SET cooldown_until = MAX(cooldown_until, excluded.cooldown_until)",
+            (key_id, time.time(), until)))
+
+    def set_exhausted(self, key_id: str, month: str) -> None:
+        self._transaction(lambda: self.conn.execute(
+            "INSERT INTO usage (month, key_id, exhausted) VALUES (?, ?, 1) "
+            "ON CONFLICT(month, key_id) DO UPDATE SET exhausted = 1", (month, key_id)))
+
+    def reset(self, month: str) -> int:
+        """Знімає позначки вичерпаної квоти за місяць і паузи всіх ключів; повертає кількість змінених записів."""
+        def reset():
+            changed = self.conn.execute("UPDATE usage SET exhausted = 0 WHERE month = ? AND exhausted = 1",
+                                        (month,)).rowcount
+            return changed + self.conn.execute("UPDATE buckets SET cooldown_until = 0 WHERE cooldown_until > ?",
+                                               (time.time(),)).rowcount
+        return self._transaction(reset)
+
+    def usage(self, month: str) -> dict[str, int]:
+        """Кількість запитів кожного ключа за місяць (усіма процесами)."""
+        with self.lock:
+            return dict(self.conn.execute("SELECT key_id, requests FROM usage WHERE month = ?", (month,)))
+
+
+class ApiKeyPool:
+    """
+    Набір ключів RapidAPI з ротацією.
+    Кожен ключ має token bucket і місячний лічильник запитів у KeyState (спільні для всіх
+    процесів із тим самим RAPID_API_STATE_PATH, тому N воркерів разом надсилають не більше rps на ключ).
+    Ключ, що отримав 429, відпочиває до кінця Retry-After;
+    ключ із вичерпаною місячною квотою не використовується до наступного місяця;
+    ключ, відхилений з кодом 401/403, не використовується цим процесом reject_cooldown секунд.
+    """
+
+    def __init__(self, keys: list[str], rps: float = RAPID_API_RPS, burst: float = RAPID_API_BURST,
+                 monthly_quota: int = RAPID_API_MONTHLY_QUOTA, state_path: str = RAPID_API_STATE_PATH,
+                 reject_cooldown: float = RAPID_API_REJECT_COOLDOWN):
+        self.keys = list(keys)
+        self.key_ids = [self._key_id(key) for key in self.keys]
+        self.rps = rps
+        self.burst = burst or max(1.0, rps)
+        self.monthly_quota = monthly_quota
+        self.state_path = state_path
+        self.reject_cooldown = reject_cooldown
+        # Відхилені ключі (401/403) — лише в пам'яті процесу, у файл стану не потрапляють
+        self.rejected_until: dict[int, float] = {}
+        self.lock = threading.Lock()
+        self.next_index = 0
+        self._state = None
+
+    @staticmethod
+    def _key_id(key: str) -> str:
+        """Ідентифікатор ключа для файлу стану (сам ключ не зберігається)."""
+        return hashlib.sha256(key.encode()).hexdigest()[:12]
+
+    @staticmethod
+    def _month() -> str:
+        return datetime.now().strftime("%Y-%m")
+
+    @property
+    def state(self) -> KeyState:
+        # Файл стану відкривається лише під час першого запиту
+        with self.lock:
+            if self._state is None:
+                self._state = KeyState(self.state_path)
+            return self._state
+
+    def acquire(self) -> str | None:
+        """
+        Повертає ключ для наступного запиту з урахуванням ліміту запитів за секунду.
+        Якщо всі ключі тимчасово заблоковані — чекає; якщо всі вичерпані або відхилені — повертає None.
+        """
+        while True:
+            now = time.monotonic()
+            with self.lock:
+                start = self.next_index
+                rejected = {index for index, until in self.rejected_until.items() if until > now}
+            # Ротація: пошук починається з ключа, наступного за останнім використаним
+            order = [(start + offset) % len(self.keys) for offset in range(len(self.keys))]
+            order = [index for index in order if index not in rejected]
+            if not order:
+                return None
+            index, wait = self.state.acquire([self.key_ids[i] for i in order], self.rps, self.burst,
+                                             self.monthly_quota, self._month())
+            if index is not None:
+                with self.lock:
+                    self.next_index = (order[index] + 1) % len(self.keys)
+                return self.keys[order[index]]
+            if wait is None:
+                return None
+            time.sleep(max(wait, 0.01))
+
+    def mark_throttled(self, key: str, delay: float) -> None:
+        """Тимчасово знімає ключ з ротації після відповіді 429."""
+        if key in self.keys:
+            self.state.set_cooldown(self._key_id(key), time.time() + delay)
+
+    def mark_rejected(self, key: str) -> None:
+        """Знімає ключ з ротації цього процесу на reject_cooldown секунд (відповідь 401/403)."""
+        if key in self.keys:
+            with self.lock:
+                self.rejected_until[self.keys.index(key)] = time.monotonic() + self.reject_cooldown
+
+    def reset(self) -> int:
+        """Повертає в ротацію всі ключі: вичерпані в цьому місяці, на паузі після 429 та відхилені."""
+        with self.lock:
+            self.rejected_until.clear()
+        return self.state.reset(self._month())
+
+    def mark_exhausted(self, key: str) -> None:
+        """Знімає ключ з ротації до кінця місяця (вичерпано місячну квоту)."""
+        if key in self.keys:
+            self.state.set_exhausted(self._key_id(key), self._month())
+
+
+class AdaptiveLimiter:
+    """
+    Адаптивне обмеження кількості одночасних запитів (AIMD).
+    Поки запити успішні й швидші за latency_target, ліміт повільно зростає (+1 за «раунд» запитів);
+    після збою, 429 або повільної відповіді ліміт зменшується вдвічі (не частіше ніж раз за середній час запиту).
+    """
+
+    def __init__(self, initial: float = API_CONCURRENCY_INITIAL, min_limit: int = API_CONCURRENCY_MIN,
+                 max_limit: int = API_CONCURRENCY_MAX, latency_target: float = API_LATENCY_TARGET,
+                 adaptive: bool = API_ADAPTIVE):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(self.max_limit, max(self.min_limit, initial))) if adaptive else float(self.max_limit)
+        self.latency_target = latency_target
+        self.adaptive = adaptive
+        self.in_flight = 0
+        self.latency = None
+        self.last_decrease = 0.0
+        self.condition = threading.Condition()
+
+    def acquire(self, timeout: float | None = None) -> bool:
+        """Займає місце для запиту; False, якщо за timeout секунд місце не звільнилося."""
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.in_flight < int(self.limit), timeout):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, latency: float, outcome: bool | None) -> bool:
+        """
+        Звільняє місце і коригує ліміт: outcome True — успіх, False — збій або перевантаження,
+        None — результат нічого не говорить про стан API (скасування, помилка клієнта).
+        Повертає True, якщо ліміт зменшено.
+        """
+        decreased = False
+        with self.condition:
+            self.in_flight -= 1
+            if self.adaptive and outcome is not None:
+                self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+                now = time.monotonic()
+                if outcome is False or latency > self.latency_target:
+                    if now - self.last_decrease >= max(self.latency, 0.1):
+                        self.limit = max(float(self.min_limit), self.limit / 2)
+                        self.last_decrease = now
+                        decreased = True
+                else:
+                    self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+            self.condition.notify_all()
+        return decreased
+
+
+class CircuitBreaker:
+    """
+    Запобіжник для одного ендпоінта: після failure_threshold збоїв поспіль запити призупиняються
+    на cooldown секунд (open). Потім проходить один пробний запит (half_open):
+    успіх відновлює роботу, збій знову призупиняє запити на вдвічі довший час (до max_cooldown).
+    """
+
+    PROBE_POLL = 0.5
+
+    def __init__(self, failure_threshold: int = API_BREAKER_FAILURES, cooldown: float = API_BREAKER_COOLDOWN,
+                 max_cooldown: float = API_BREAKER_MAX_COOLDOWN):
+        self.failure_threshold = max(1, failure_threshold)
+        self.base_cooldown = cooldown
+        self.max_cooldown = max(cooldown, max_cooldown)
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.open_until = 0.0
+        self.probe_in_flight = False
+        self.lock = threading.Lock()
+
+    def try_acquire(self) -> float:
+        """Дозволяє запит і повертає 0 або повертає час (с), через який варто спробувати знову."""
+        with self.lock:
+            if self.state == "closed":
+                return 0.0
+            now = time.monotonic()
+            if self.state == "open":
+                if now < self.open_until:
+                    return self.open_until - now
+                self.state = "half_open"
+            if self.probe_in_flight:
+                return self.PROBE_POLL
+            self.probe_in_flight = True
+            return 0.0
+
+    def record(self, outcome: bool | None) -> str | None:
+        """Враховує результат запиту; повертає новий стан ("open" / "closed"), якщо він змінився."""
+        with self.lock:
+            if outcome is None:
+                if self.state == "half_open":
+                    self.probe_in_flight = False
+                return None
+            if outcome:
+                self.failures = 0
+                if self.state == "closed":
+                    return None
+                self.state = "closed"
+                self.cooldown = self.base_cooldown
+                self.probe_in_flight = False
+                return "closed"
+            self.failures += 1
+            if self.state == "half_open":
+                self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+            elif self.state == "open" or self.failures < self.failure_threshold:
+                return None
+            self.state = "open"
+            self.open_until = time.monotonic() + self.cooldown
+            self.probe_in_flight = False
+            return "open"
+
+
+class HedgePolicy:
+    """
+    Коли надсилати дублюючий запит: після percentile-го перцентиля недавніх затримок
+    (не раніше min_delay і лише коли накопичено min_samples вимірів).
+    Бюджет: дублів не більше max_ratio від кількості основних запитів.
+    """
+
+    def __init__(self, percentile: float = API_HEDGE_PERCENTILE, max_ratio: float = API_HEDGE_MAX_RATIO,
+                 min_delay: float = API_HEDGE_MIN_DELAY, window: int = API_HEDGE_WINDOW, min_samples: int = 20):
+        self.percentile = min(100.0, max(0.0, percentile))
+        self.max_ratio = max_ratio
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.latencies = deque(maxlen=max(1, window))
+        self.requests = 0
+        self.hedges = 0
+        self.lock = threading.Lock()
+
+    def observe(self, latency: float) -> None:
+        """Додає затримку успішної відповіді у вікно недавніх вимірів."""
+        with self.lock:
+            self.latencies.append(latency)
+
+    def delay(self) -> float | None:
+        """Рахує основний запит і повертає, через скільки секунд слати дубль (None — не слати)."""
+        with self.lock:
+            self.requests += 1
+            if len(self.latencies) < self.min_samples:
+                return None
+            ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return max(self.min_delay, ordered[index])
+
+    def try_fire(self) -> bool:
+        """Бере дубль із бюджету; False, якщо бюджет дублів вичерпано."""
+        with self.lock:
+            if self.hedges + 1 > self.max_ratio * self.requests:
+                return False
+            self.hedges += 1
+            return True